@@ -0,0 +1,55 @@
+"""Add parse_jobs queue table
+
+Revision ID: 7c2e4b9d1a3f
+Revises: 39c6922aaba0
+Create Date: 2026-01-12 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e4b9d1a3f'
+down_revision: Union[str, Sequence[str], None] = '39c6922aaba0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('parse_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('pdf', sa.LargeBinary(), nullable=False),
+    sa.Column('method', sa.String(), nullable=True),
+    sa.Column('use_cache', sa.Boolean(), nullable=False),
+    sa.Column('refresh_cache', sa.Boolean(), nullable=False),
+    sa.Column('progress', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('worker_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    schema='public'
+    )
+    op.create_index(op.f('ix_public_parse_jobs_id'), 'parse_jobs', ['id'], unique=False, schema='public')
+    op.create_index(op.f('ix_public_parse_jobs_status'), 'parse_jobs', ['status'], unique=False, schema='public')
+    # Queue scans: oldest queued job first
+    op.create_index('ix_public_parse_jobs_queued', 'parse_jobs', ['created_at'], unique=False, schema='public',
+                    postgresql_where=sa.text("status = 'queued'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_public_parse_jobs_queued', table_name='parse_jobs', schema='public')
+    op.drop_index(op.f('ix_public_parse_jobs_status'), table_name='parse_jobs', schema='public')
+    op.drop_index(op.f('ix_public_parse_jobs_id'), table_name='parse_jobs', schema='public')
+    op.drop_table('parse_jobs', schema='public')
@@ -0,0 +1,37 @@
+"""Add pg_trgm indexes on parts designation and name
+
+Revision ID: 9b4e2f6c1d80
+Revises: 7c2e4b9d1a3f
+Create Date: 2026-02-02 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4e2f6c1d80'
+down_revision: Union[str, Sequence[str], None] = '7c2e4b9d1a3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # ILIKE '%...%' and similarity (%) filters in the parts search
+    op.create_index('ix_public_parts_designation_trgm', 'parts', ['designation'], unique=False, schema='public',
+                    postgresql_using='gin', postgresql_ops={'designation': 'gin_trgm_ops'})
+    op.create_index('ix_public_parts_name_trgm', 'parts', ['name'], unique=False, schema='public',
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    # Nearest designations (ORDER BY designation <-> :query) for fuzzy invoice matching
+    op.create_index('ix_public_parts_designation_trgm_knn', 'parts', ['designation'], unique=False, schema='public',
+                    postgresql_using='gist', postgresql_ops={'designation': 'gist_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_public_parts_designation_trgm_knn', table_name='parts', schema='public')
+    op.drop_index('ix_public_parts_name_trgm', table_name='parts', schema='public')
+    op.drop_index('ix_public_parts_designation_trgm', table_name='parts', schema='public')
+    # The pg_trgm extension is left installed: other objects may depend on it
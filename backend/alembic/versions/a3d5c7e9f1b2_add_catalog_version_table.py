@@ -0,0 +1,34 @@
+"""Add catalog_version counter table
+
+Revision ID: a3d5c7e9f1b2
+Revises: 9b4e2f6c1d80
+Create Date: 2026-02-09 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d5c7e9f1b2'
+down_revision: Union[str, Sequence[str], None] = '9b4e2f6c1d80'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    schema='public'
+    )
+    # Single row, bumped by every parts write
+    op.bulk_insert(catalog_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_version', schema='public')
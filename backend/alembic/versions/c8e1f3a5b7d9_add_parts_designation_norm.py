@@ -0,0 +1,55 @@
+"""Add normalized designation column to parts
+
+Revision ID: c8e1f3a5b7d9
+Revises: a3d5c7e9f1b2
+Create Date: 2026-02-16 14:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1f3a5b7d9'
+down_revision: Union[str, Sequence[str], None] = 'a3d5c7e9f1b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 1000
+
+
+def normalize_designation(value: str) -> str:
+    """Frozen copy of app.core.designation.normalize_designation as of this revision."""
+    return "".join(c.lower() for c in value or "" if c.isalnum())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('parts', sa.Column('designation_norm', sa.String(), nullable=True), schema='public')
+
+    # Backfill with the application's normalizer (Unicode-aware, unlike SQL regexes), frozen above
+    parts = sa.table('parts', sa.column('id', sa.Integer()), sa.column('designation', sa.String()),
+                     sa.column('designation_norm', sa.String()), schema='public')
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(parts.c.id, parts.c.designation)).all()
+    update = (
+        parts.update()
+        .where(parts.c.id == sa.bindparam('part_id'))
+        .values(designation_norm=sa.bindparam('norm'))
+    )
+    for start in range(0, len(rows), BACKFILL_BATCH):
+        bind.execute(update, [
+            {'part_id': part_id, 'norm': normalize_designation(designation) or None}
+            for part_id, designation in rows[start:start + BACKFILL_BATCH]
+        ])
+
+    # Not unique: "R1.003" and "R1-003" may both exist and share a key
+    op.create_index(op.f('ix_public_parts_designation_norm'), 'parts', ['designation_norm'], unique=False,
+                    schema='public')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_public_parts_designation_norm'), table_name='parts', schema='public')
+    op.drop_column('parts', 'designation_norm', schema='public')
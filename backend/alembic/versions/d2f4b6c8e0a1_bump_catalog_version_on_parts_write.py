@@ -0,0 +1,40 @@
+"""Bump catalog_version from a trigger on every parts write
+
+Revision ID: d2f4b6c8e0a1
+Revises: c8e1f3a5b7d9
+Create Date: 2026-02-20 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f4b6c8e0a1'
+down_revision: Union[str, Sequence[str], None] = 'c8e1f3a5b7d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Every writer (API, importer, tools, plain SQL) invalidates the catalog snapshots in its own transaction
+    op.execute("""
+        CREATE OR REPLACE FUNCTION public.bump_catalog_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE public.catalog_version SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER parts_bump_catalog_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.parts
+        FOR EACH STATEMENT EXECUTE FUNCTION public.bump_catalog_version()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS parts_bump_catalog_version ON public.parts')
+    op.execute('DROP FUNCTION IF EXISTS public.bump_catalog_version()')
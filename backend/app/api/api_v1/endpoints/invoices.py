@@ -1,182 +1,82 @@
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from app.db.session import get_db
-from app.db.models import Part
-from app.services.parser import parse_invoice
+from app.db.session import AsyncSessionLocal, get_db
+from app.core.config import settings
+from app.services.invoice_matcher import (
+    create_matcher,
+    dedupe_items,
+    match_parsed_items,
+    merge_items,
+)
+from app.services.key_pool import key_pool
+from app.services.parser import attach_images, parse_invoice_async
 from app.services.generator import generate_technical_description
+from app.services.metrics import DOCX_GENERATE_SECONDS
 import shutil
 import os
 import tempfile
 import logging
-from typing import List, Any, Dict
-from app.schemas.invoice import InvoiceItem, InvoiceUploadResponse, DebugUploadRequest, GenerateRequest
+import asyncio
+import hashlib
+import json
+import time
+from typing import List, Any, Dict, Tuple
+from app.schemas.invoice import (
+    InvoiceUploadResponse, DebugUploadRequest, GenerateRequest, ParseJobStatus,
+    BatchInvoiceResult, BatchUploadResponse
+)
+from app.services import job_queue
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-async def _find_part_async(designation: str, db: AsyncSession, all_parts: List[Part]) -> Part | None:
-    """Find a part by designation using Exact Match -> Base Part -> Fuzzy Match strategy."""
-    if not designation:
-        return None
-        
-    # 1. Exact Match
-    # Check in pre-fetched list first to save DB query if possible? 
-    # Actually, all_parts might be huge, but iterating in memory is fast.
-    # But `process_invoice_contents` does `await db.execute(select(Part).filter(Part.designation == designation))`
-    # Let's keep the logic consistent with original but encapsulated.
-    
-    # 1. Exact Match (DB Query for up-to-date data or use passed all_parts?)
-    # Original used DB query for exact match.
-    part_result = await db.execute(select(Part).filter(Part.designation == designation))
-    part = part_result.scalars().first()
-    if part:
-        return part, "exact"
-
-    # 2. Base Part Lookup
-    if '-' in designation:
-        base_des = designation.rsplit('-', 1)[0]
-        base_part_result = await db.execute(select(Part).filter(Part.designation == base_des))
-        base_part = base_part_result.scalars().first()
-        if base_part:
-            return base_part, f"base:{base_des}"
-
-    # 3. Fuzzy Matching
-    import difflib
-    all_designations = [p.designation for p in all_parts]
-    matches = difflib.get_close_matches(designation, all_designations, n=1, cutoff=0.8)
-    if matches:
-        fuzzy_des = matches[0]
-        # Find the part object
-        fuzzy_part = next((p for p in all_parts if p.designation == fuzzy_des), None)
-        if fuzzy_part:
-            return fuzzy_part, f"fuzzy:{fuzzy_des}"
-
-    return None, None
-
-
-def _populate_item_from_part(item: InvoiceItem, part: Part, match_type: str):
-    """Populate InvoiceItem fields from a Part database object."""
-    item.found_in_db = True
-    item.name = part.name
-    
-    # Only overwrite material if not already present
-    if not item.material:
-        item.material = part.material
-        
-    item.weight = part.weight
-    item.weight_unit = getattr(part, 'weight_unit', None)
-    item.dimensions = part.dimensions
-    item.description = part.description
-    item.image_path = part.image_path
-    
-    # Overwrite manufacturer if it's electronics or if not present?
-    # Original logic: "Force overwrite manufacturer from DB ONLY if electronics"
-    # But also: "res_item.manufacturer = base_part.manufacturer" unconditionally in Base/Fuzzy match block in original code.
-    # In Exact match block: only if electronics.
-    # Let's preserve specific behavior:
-    
-    is_electronics = (getattr(part, 'component_type', None) == 'electronics') or \
-                     ('электро' in (item.material or '').lower()) or \
-                     (getattr(part, 'specs', None) is not None)
-                     
-    if is_electronics and part.manufacturer:
-        item.manufacturer = part.manufacturer
-    elif not item.manufacturer:
-        # If not electronics, still useful to set if missing?
-        # Original exact match block didn't set it if not electronics.
-        # But Base/Fuzzy match blocks DID set it unconditionally.
-        # This inconsistency suggests we should probably set it if missing.
-        item.manufacturer = part.manufacturer
-
-    item.condition = part.condition
-    
-    # Electronics fields
-    item.component_type = getattr(part, 'component_type', None)
-    item.specs = getattr(part, 'specs', None)
-    
-    # Legacy fields
-    item.current_type = getattr(part, 'current_type', None)
-    item.input_voltage = getattr(part, 'input_voltage', None)
-    item.input_current = getattr(part, 'input_current', None)
-    item.processor = getattr(part, 'processor', None)
-    item.ram_kb = getattr(part, 'ram_kb', None)
-    item.rom_mb = getattr(part, 'rom_mb', None)
-    item.tnved_code = getattr(part, 'tnved_code', None)
-    item.tnved_description = getattr(part, 'tnved_description', None)
-    
-    # Update description with match info
-    if match_type.startswith("base:"):
-        base_des = match_type.split(":")[1]
-        if not item.description: item.description = ""
-        item.description += f" [Base Match: {base_des}]"
-    elif match_type.startswith("fuzzy:"):
-        fuzzy_des = match_type.split(":")[1]
-        if not item.description: item.description = ""
-        item.description += f" [Fuzzy Match: {fuzzy_des}]"
-
-
-async def process_invoice_contents(contents: bytes, filename: str, method: str, api_key: str, db: AsyncSession):
-    # Save temp file
+
+def _save_temp_file(contents: bytes, filename: str) -> str:
     temp_dir = os.path.join(os.getcwd(), "temp")
     os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, filename)
-    
+    temp_path = os.path.join(temp_dir, os.path.basename(filename))
+
     with open(temp_path, "wb") as f:
         f.write(contents)
+    return temp_path
+
+
+def _remove_temp_file(temp_path: str) -> None:
+    if os.path.exists(temp_path):
+        try:
+            os.unlink(temp_path)
+        except Exception as e:
+            print(f"Warning: Could not delete temp file {temp_path}: {e}")
+
+
+async def process_invoice_contents(
+    contents: bytes,
+    filename: str,
+    method: str,
+    api_key: str,
+    db: AsyncSession,
+    use_cache: bool = True,
+    refresh_cache: bool = False
+):
+    # Save temp file
+    temp_path = _save_temp_file(contents, filename)
         
     try:
         # Parse invoice
-        parsed_items, debug_info = await run_in_threadpool(parse_invoice, pdf_path=temp_path, method=method, api_key=api_key)
+        parsed_items, debug_info = await parse_invoice_async(
+            pdf_path=temp_path,
+            method=method,
+            api_key=api_key,
+            use_cache=use_cache,
+            refresh_cache=refresh_cache
+        )
         print(f"Parsed items: {parsed_items}")
         
         # Match with DB
-        results = []
-        
-        # Prefetch all parts for fuzzy matching later
-        all_parts_result = await db.execute(select(Part))
-        all_parts = all_parts_result.scalars().all()
-        
-        for item in parsed_items:
-            designation = item['designation']
-            
-            res_item = InvoiceItem(
-                designation=designation,
-                raw_description=item['raw_description'],
-                parsing_method=item.get('parsing_method'),
-                quantity=item.get('quantity', 1),
-                manufacturer=item.get('manufacturer'),
-                condition=item.get('condition')
-            )
-            
-            # Prioritize invoice material if found
-            if item.get('material'):
-                res_item.material = item['material']
-            
-            # Find in DB (Exact -> Base -> Fuzzy)
-            found_part, match_type = await _find_part_async(designation, db, all_parts)
-            
-            if found_part:
-                _populate_item_from_part(res_item, found_part, match_type)
-            
-            results.append(res_item)
-            
-        # Extract metadata from debug_info if available
-        invoice_metadata = debug_info.get("invoice_metadata") if debug_info else None
-        
-        # Failsafe Deduplication of results
-        unique_results = []
-        seen_designations = set()
-        for res in results:
-            if res.designation not in seen_designations:
-                seen_designations.add(res.designation)
-                unique_results.append(res)
-        results = unique_results
-
-        return InvoiceUploadResponse(items=results, debug_info=debug_info, metadata=invoice_metadata)
+        return await match_parsed_items(parsed_items, debug_info, db)
         
     except Exception as e:
         import traceback
@@ -185,25 +85,330 @@ async def process_invoice_contents(contents: bytes, filename: str, method: str,
         raise HTTPException(status_code=500, detail=str(e))
         
     finally:
-        if os.path.exists(temp_path):
+        _remove_temp_file(temp_path)
+
+
+async def process_invoice_batch(
+    files: List[Tuple[str, bytes]],
+    method: str,
+    api_key: str,
+    db: AsyncSession,
+    use_cache: bool = True,
+    refresh_cache: bool = False
+) -> BatchUploadResponse:
+    """
+    Parse and match several invoices of one shipment.
+
+    Identical files (same SHA-256) are parsed once. All pages of all invoices
+    share one page request budget, bounded by the healthy keys of the pool.
+    """
+    started = time.perf_counter()
+
+    entries = []  # (filename, sha256) in upload order
+    unique = {}  # sha256 -> (filename, contents)
+    for filename, contents in files:
+        sha = hashlib.sha256(contents).hexdigest()
+        entries.append((filename, sha))
+        unique.setdefault(sha, (filename, contents))
+
+    page_budget = max(1, min(settings.BATCH_PAGE_CONCURRENCY, key_pool.healthy_count()))
+    page_semaphore = asyncio.Semaphore(page_budget)
+    invoice_slots = asyncio.Semaphore(max(1, settings.BATCH_PARALLEL_INVOICES))
+
+    async def parse_one(sha: str, filename: str, contents: bytes):
+        async with invoice_slots:
+            temp_path = _save_temp_file(contents, f"{sha[:12]}_{os.path.basename(filename)}")
             try:
-                os.unlink(temp_path)
-            except Exception as e:
-                print(f"Warning: Could not delete temp file {temp_path}: {e}")
+                return await parse_invoice_async(
+                    pdf_path=temp_path,
+                    method=method,
+                    api_key=api_key,
+                    use_cache=use_cache,
+                    refresh_cache=refresh_cache,
+                    page_semaphore=page_semaphore
+                )
+            finally:
+                _remove_temp_file(temp_path)
+
+    print(f"Batch upload: {len(files)} files, {len(unique)} unique, page budget {page_budget}")
+    outcomes = await asyncio.gather(
+        *(parse_one(sha, filename, contents) for sha, (filename, contents) in unique.items()),
+        return_exceptions=True
+    )
+
+    # Match sequentially (one DB session), sharing lookups and the parts list for fuzzy matching
+    matcher = await create_matcher(db)
+    results = {}
+    for (sha, (filename, _)), outcome in zip(unique.items(), outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Batch file {filename} failed: {outcome}")
+            results[sha] = BatchInvoiceResult(filename=filename, sha256=sha, error=str(outcome))
+            continue
+        parsed_items, debug_info = outcome
+        response = await match_parsed_items(parsed_items, debug_info, db, matcher=matcher)
+        results[sha] = BatchInvoiceResult(
+            filename=filename,
+            sha256=sha,
+            items=response.items,
+            debug_info=response.debug_info,
+            metadata=response.metadata,
+            error=(debug_info or {}).get("error")
+        )
+
+    invoices = []
+    seen = set()
+    for filename, sha in entries:
+        result = results[sha]
+        if sha in seen:
+            result = result.model_copy(update={"filename": filename, "duplicate_of": result.filename})
+        seen.add(sha)
+        invoices.append(result)
+
+    stats = {
+        "files": len(files),
+        "unique_files": len(unique),
+        "duplicates": len(files) - len(unique),
+        "failed": sum(1 for r in results.values() if r.error),
+        "page_concurrency": page_budget,
+        "pages": sum((r.debug_info or {}).get("page_count", 0) for r in results.values()),
+        "cached_files": sum(1 for r in results.values() if (r.debug_info or {}).get("cache") == "hit"),
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+    merged = merge_items([results[sha].items for sha in unique])
+    return BatchUploadResponse(invoices=invoices, items=merged, stats=stats)
+
+
+def _ndjson(event: Dict) -> str:
+    return json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+
+async def stream_invoice_events(
+    contents: bytes,
+    filename: str,
+    method: str,
+    api_key: str,
+    db: AsyncSession,
+    use_cache: bool = True,
+    refresh_cache: bool = False
+):
+    """
+    Parse and match an invoice, yielding NDJSON progress events as they happen.
+
+    Events (one JSON object per line, `event` field gives the type):
+    - page_rendered: {"page"}
+    - page_parsed: {"page", "source", "items": count}
+    - item: {"page", "item": InvoiceItem} - matched against the DB, with its
+      image, one per new designation
+    - result: the full InvoiceUploadResponse (deduplicated, page order)
+    - error: {"detail"}
+
+    If the client disconnects, the generator is closed and parsing is cancelled.
+    """
+    temp_path = _save_temp_file(contents, filename)
+    events: asyncio.Queue = asyncio.Queue()
+    parse_task = None
+    sent_designations = set()
+
+    try:
+        parse_task = asyncio.ensure_future(parse_invoice_async(
+            pdf_path=temp_path,
+            method=method,
+            api_key=api_key,
+            use_cache=use_cache,
+            refresh_cache=refresh_cache,
+            on_event=events.put_nowait
+        ))
+        matcher = await create_matcher(db)
+
+        async def item_events(page, page_items):
+            new_items = []
+            for item in page_items:
+                if item["designation"] not in sent_designations:
+                    sent_designations.add(item["designation"])
+                    new_items.append(item)
+            if not new_items:
+                return
+            # Same image lookup the final result gets; one bulk DB lookup per page
+            new_items = [dict(item) for item in new_items]
+            await asyncio.to_thread(attach_images, new_items)
+            await matcher.resolve(item["designation"] for item in new_items)
+            for item in new_items:
+                res_item = await matcher.match_item(item)
+                yield _ndjson({"event": "item", "page": page, "item": res_item.model_dump(mode="json")})
+
+        while not (parse_task.done() and events.empty()):
+            if not events.empty():
+                event = events.get_nowait()
+            else:
+                get_event = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({get_event, parse_task}, return_when=asyncio.FIRST_COMPLETED)
+                if get_event not in done:
+                    get_event.cancel()
+                    continue
+                event = get_event.result()
+
+            if event["event"] == "page_parsed":
+                yield _ndjson({
+                    "event": "page_parsed",
+                    "page": event["page"],
+                    "source": event["source"],
+                    "items": len(event["items"])
+                })
+                async for line in item_events(event["page"], event["items"]):
+                    yield line
+            else:
+                yield _ndjson(event)
+
+        parsed_items, debug_info = parse_task.result()
+
+        # Whole-file cache hits produce no page events: stream the items now
+        async for line in item_events(None, parsed_items):
+            yield line
+
+        results = dedupe_items(await matcher.match_items(parsed_items))
+        invoice_metadata = debug_info.get("invoice_metadata") if debug_info else None
+        response = InvoiceUploadResponse(items=results, debug_info=debug_info, metadata=invoice_metadata)
+        yield _ndjson({"event": "result", **response.model_dump(mode="json")})
+
+    except Exception as e:
+        logger.error(f"ERROR in stream_invoice_events: {str(e)}", exc_info=True)
+        yield _ndjson({"event": "error", "detail": str(e)})
+
+    finally:
+        if parse_task is not None and not parse_task.done():
+            parse_task.cancel()
+            await asyncio.gather(parse_task, return_exceptions=True)
+        _remove_temp_file(temp_path)
+
 
 @router.post("/upload", response_model=InvoiceUploadResponse)
 async def upload_invoice(
     file: UploadFile = File(...),
     method: str = Form("auto"),
     api_key: str = Form(None),
+    use_cache: bool = Form(True),
+    refresh_cache: bool = Form(False),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Uploads a PDF invoice, parses it (Gemini or OCR), and matches items with the database.
+
+    Identical PDFs are served from the parse cache; pass `use_cache=false` to
+    bypass it or `refresh_cache=true` to re-parse and overwrite the entry.
     """
     print(f"Received file upload: {file.filename}, method={method}")
     contents = await file.read()
-    return await process_invoice_contents(contents, file.filename, method, api_key, db)
+    return await process_invoice_contents(
+        contents, file.filename, method, api_key, db,
+        use_cache=use_cache, refresh_cache=refresh_cache
+    )
+
+@router.post("/upload/batch", response_model=BatchUploadResponse)
+async def upload_invoice_batch(
+    files: List[UploadFile] = File(...),
+    method: str = Form("auto"),
+    api_key: str = Form(None),
+    use_cache: bool = Form(True),
+    refresh_cache: bool = Form(False),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Uploads several PDF invoices (e.g. all invoices of one shipment) at once.
+
+    Identical files are parsed once; pages of all invoices are scheduled
+    through one shared key/concurrency budget. Returns per-invoice results
+    and a merged item list (quantities summed per designation).
+    """
+    if len(files) > settings.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files: {len(files)} (max {settings.BATCH_MAX_FILES})"
+        )
+    contents = [(file.filename, await file.read()) for file in files]
+    try:
+        return await process_invoice_batch(
+            contents, method, api_key, db,
+            use_cache=use_cache, refresh_cache=refresh_cache
+        )
+    except Exception as e:
+        logger.error(f"ERROR in upload_invoice_batch: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/upload/stream")
+async def upload_invoice_stream(
+    file: UploadFile = File(...),
+    method: str = Form("auto"),
+    api_key: str = Form(None),
+    use_cache: bool = Form(True),
+    refresh_cache: bool = Form(False)
+):
+    """
+    Streaming variant of /upload: returns NDJSON progress events
+    (page_rendered, page_parsed, item, result, error) so the UI can render
+    rows as soon as the first page is parsed.
+
+    NDJSON over a POST response is used instead of SSE because EventSource
+    cannot send file uploads; read it with fetch() and a stream reader.
+    """
+    print(f"Received streaming upload: {file.filename}, method={method}")
+    contents = await file.read()
+
+    async def body():
+        # The response outlives request dependencies, so open a dedicated session
+        async with AsyncSessionLocal() as db:
+            async for line in stream_invoice_events(
+                contents, file.filename, method, api_key, db,
+                use_cache=use_cache, refresh_cache=refresh_cache
+            ):
+                yield line
+
+    # Content-Encoding: identity keeps GZipMiddleware from buffering the events
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+    )
+
+@router.post("/jobs", response_model=ParseJobStatus, status_code=202)
+async def submit_parse_job(
+    file: UploadFile = File(...),
+    method: str = Form("auto"),
+    use_cache: bool = Form(True),
+    refresh_cache: bool = Form(False),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Queue a PDF invoice for background parsing (processed by `python -m app.worker`).
+
+    Returns the job immediately; poll GET /jobs/{id} for progress and fetch
+    GET /jobs/{id}/result once the status is 'done'.
+    """
+    contents = await file.read()
+    job = await job_queue.submit_job(
+        db, contents, file.filename, method=method,
+        use_cache=use_cache, refresh_cache=refresh_cache
+    )
+    return job
+
+@router.get("/jobs/{job_id}", response_model=ParseJobStatus)
+async def get_parse_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Get status and progress of a background parse job."""
+    job = await job_queue.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@router.get("/jobs/{job_id}/result", response_model=InvoiceUploadResponse)
+async def get_parse_job_result(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Get the parsed and matched items of a finished job (409 while it is still running)."""
+    job = await job_queue.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job.status == job_queue.JOB_FAILED:
+        raise HTTPException(status_code=500, detail=job.error or "Job failed")
+    if job.status != job_queue.JOB_DONE:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+    return job.result
 
 @router.post("/debug_upload", response_model=InvoiceUploadResponse)
 async def debug_upload_invoice(
@@ -222,7 +427,10 @@ async def debug_upload_invoice(
             contents = f.read()
             
         filename = os.path.basename(request.file_path)
-        return await process_invoice_contents(contents, filename, request.method, request.api_key, db)
+        return await process_invoice_contents(
+            contents, filename, request.method, request.api_key, db,
+            use_cache=request.use_cache, refresh_cache=request.refresh_cache
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -280,47 +488,50 @@ async def generate_report(
     # 1. Technical Description
     if request.gen_tech_desc:
         tmp_tech = tempfile.NamedTemporaryFile(delete=False, suffix=".docx").name
-        await run_in_threadpool(
-            generate_technical_description,
-            parts_to_gen, 
-            tmp_tech,
-            country_of_origin=request.country_of_origin,
-            contract_no=request.contract_no,
-            contract_date=request.contract_date,
-            supplier=request.supplier,
-            add_facsimile=request.add_facsimile
-        )
+        with DOCX_GENERATE_SECONDS.time(document="technical_description"):
+            await run_in_threadpool(
+                generate_technical_description,
+                parts_to_gen,
+                tmp_tech,
+                country_of_origin=request.country_of_origin,
+                contract_no=request.contract_no,
+                contract_date=request.contract_date,
+                supplier=request.supplier,
+                add_facsimile=request.add_facsimile
+            )
         generated_files.append({"path": tmp_tech, "name": "Technical_Description.docx"})
 
     # 2. Non-Insurance Letter
     if request.gen_non_insurance:
         tmp_ins = tempfile.NamedTemporaryFile(delete=False, suffix=".docx").name
-        await run_in_threadpool(
-            generate_non_insurance_letter,
-            parts_to_gen,
-            tmp_ins,
-            contract_no=request.contract_no or "",
-            contract_date=request.contract_date or "",
-            invoice_no=request.invoice_no or "",
-            invoice_date=request.invoice_date or "",
-            waybill_no=request.waybill_no or "",
-            add_facsimile=request.add_facsimile
-        )
+        with DOCX_GENERATE_SECONDS.time(document="non_insurance_letter"):
+            await run_in_threadpool(
+                generate_non_insurance_letter,
+                parts_to_gen,
+                tmp_ins,
+                contract_no=request.contract_no or "",
+                contract_date=request.contract_date or "",
+                invoice_no=request.invoice_no or "",
+                invoice_date=request.invoice_date or "",
+                waybill_no=request.waybill_no or "",
+                add_facsimile=request.add_facsimile
+            )
         generated_files.append({"path": tmp_ins, "name": "Non_Insurance_Letter.docx"})
 
     # 3. Decision 130 Notification
     if request.gen_decision_130:
         tmp_130 = tempfile.NamedTemporaryFile(delete=False, suffix=".docx").name
-        await run_in_threadpool(
-            generate_decision_130_notification,
-            parts_to_gen,
-            tmp_130,
-            contract_no=request.contract_no or "",
-            contract_date=request.contract_date or "",
-            invoice_no=request.invoice_no or "",
-            invoice_date=request.invoice_date or "",
-            add_facsimile=request.add_facsimile
-        )
+        with DOCX_GENERATE_SECONDS.time(document="decision_130"):
+            await run_in_threadpool(
+                generate_decision_130_notification,
+                parts_to_gen,
+                tmp_130,
+                contract_no=request.contract_no or "",
+                contract_date=request.contract_date or "",
+                invoice_no=request.invoice_no or "",
+                invoice_date=request.invoice_date or "",
+                add_facsimile=request.add_facsimile
+            )
         generated_files.append({"path": tmp_130, "name": "Decision_130_Notification.docx"})
 
     if not generated_files:
@@ -1,10 +1,12 @@
-from typing import Any, List
+from typing import Any, List, Literal
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.db.session import get_db
 from app.db.models import Part
 from app.schemas.part import PartSchema, PartCreate, PartUpdate
+from app.services.catalog import part_catalog, written_version
+from app.services.part_search import search_parts
 
 router = APIRouter()
 
@@ -13,23 +15,16 @@ async def read_parts(
     skip: int = 0,
     limit: int = 100,
     search: str | None = None,
+    mode: Literal["contains", "similar"] = "contains",
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Retrieve parts.
+
+    mode=contains matches `search` as a substring of designation or name;
+    mode=similar also returns near misses (typos, OCR confusions), most similar first.
     """
-    query = select(Part)
-    
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Part.designation.ilike(search_filter)) | 
-            (Part.name.ilike(search_filter))
-        )
-        
-    result = await db.execute(query.offset(skip).limit(limit))
-    parts = result.scalars().all()
-    return parts
+    return await search_parts(db, search, skip, limit, mode)
 
 @router.put("/{part_id}", response_model=PartSchema)
 async def update_part(
@@ -45,13 +40,16 @@ async def update_part(
     if not part:
         raise HTTPException(status_code=404, detail="Part not found")
     
+    previous_designation = part.designation
     update_data = part_in.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(part, field, value)
         
     db.add(part)
+    version = await written_version(db)
     await db.commit()
     await db.refresh(part)
+    part_catalog.patch(part, version, previous_designation)
     return part
 
 @router.post("/", response_model=PartSchema)
@@ -72,13 +70,17 @@ async def create_part(
         for field, value in update_data.items():
             setattr(existing, field, value)
         db.add(existing)
+        version = await written_version(db)
         await db.commit()
         await db.refresh(existing)
+        part_catalog.patch(existing, version)
         return existing
     else:
         # Create new
         part = Part(**part_in.dict())
         db.add(part)
+        version = await written_version(db)
         await db.commit()
         await db.refresh(part)
+        part_catalog.patch(part, version)
         return part
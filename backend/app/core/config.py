@@ -15,6 +15,65 @@ class Settings(BaseSettings):
     OPENROUTER_API_KEY: str | None = None
     SILICONFLOW_API_KEY: str | None = None
     GROQ_API_KEY: str | None = None
+    GROQ_API_KEYS: str | None = None  # Comma-separated extra keys for rotation
+    GROQ_KEY_RPM: int = 30  # Requests per minute allowed per key
+    KEY_POOL_STATE_FILE: str | None = None  # Shares key cooldowns between workers
+
+    # Invoice parser settings
+    PARSER_MAX_CONCURRENCY: int = 4  # Max pages sent to the LLM in parallel (1 = sequential)
+    GROQ_BASE_URL: str = "https://api.groq.com/openai/v1"  # Point at tools/mock_groq_server.py for load tests
+    LLM_TIMEOUT: float = 60  # Seconds per LLM request
+    LLM_MAX_CONNECTIONS: int = 20  # Pooled keep-alive connections to the LLM API
+    LLM_HTTP2: bool = False  # Requires the 'h2' package
+    BATCH_MAX_FILES: int = 50  # Max PDFs per batch upload
+    BATCH_PAGE_CONCURRENCY: int = 8  # Pages in flight across all invoices of a batch
+    BATCH_PARALLEL_INVOICES: int = 4  # Invoices rendered/parsed at the same time in a batch
+    PARSE_CACHE_ENABLED: bool = True  # Reuse results for identical PDFs
+    PARSE_CACHE_DIR: str | None = None  # Defaults to backend/.cache
+    PARSE_CACHE_MAX_MB: int = 200
+    PAGE_CACHE_MAX_MB: int = 100  # Per-page results keyed by rendered bitmap hash
+
+    # Page payload optimizer (0 / false disables a stage)
+    PAGE_MAX_LONG_EDGE: int = 0  # Downscale pages to this long edge in pixels
+    PAGE_GRAYSCALE: bool = False
+    PAGE_TRIM_MARGINS: bool = False
+    PAGE_BYTE_BUDGET_KB: int = 0  # Lower JPEG quality/size until the page fits
+    PAGE_JPEG_QUALITY: int = 75
+    PAGE_LAYOUT_CROP: bool = False  # Crop to the item table (and the header block on page 1)
+
+    # Text-layer fast path (pdfplumber) before the vision model
+    TEXT_LAYER_ENABLED: bool = True
+    TEXT_LAYER_MIN_CONFIDENCE: float = 0.9
+
+    # Skip pages without line items (bank details, terms) before calling the LLM
+    PAGE_CLASSIFIER_ENABLED: bool = True
+
+    # Multi-page requests: several pages per vision request (1 = one page per request)
+    PAGE_BATCH_SIZE: int = 1
+    PAGE_BATCH_MAX_KB: int = 3000  # Base64 image bytes per batched request
+
+    # Hedged requests: duplicate a page request on another key when it is slower than recent p90
+    HEDGE_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 90
+    HEDGE_MIN_SAMPLES: int = 20  # Page latencies needed before hedging starts
+    HEDGE_MIN_DELAY: float = 5  # Never hedge earlier than this (seconds)
+    HEDGE_MAX_DELAY: float = 60
+    HEDGE_BUDGET_RATIO: float = 0.1  # Extra requests allowed per page request (0.1 = at most +10%)
+
+    # pg_trgm parts search and fuzzy matching in PostgreSQL (needs the trigram migration)
+    PG_TRGM_ENABLED: bool = True
+
+    # In-process parts catalog snapshot for invoice matching (reloaded when catalog_version changes)
+    CATALOG_SNAPSHOT_ENABLED: bool = True
+    CATALOG_VERSION_CHECK_SECONDS: float = 0  # Min seconds between version checks (0 = every upload)
+    CATALOG_FILE: str | None = None  # Memory-mapped catalog shared by all workers of a host, e.g. /tmp/parts.catalog
+    CATALOG_REFRESH_SECONDS: float = 30  # Background rebuild/remap check interval when CATALOG_FILE is set
+
+    # Background parse jobs (python -m app.worker)
+    JOB_WORKER_CONCURRENCY: int = 2  # Jobs processed in parallel per worker process
+    JOB_POLL_INTERVAL: float = 2  # Seconds between queue polls when idle
+    JOB_STALE_SECONDS: int = 300  # Running jobs without a heartbeat for this long are re-queued
+    JOB_MAX_ATTEMPTS: int = 3
 
     # S3 / R2 Settings
     S3_ENDPOINT: str | None = None
@@ -23,4 +82,10 @@ class Settings(BaseSettings):
     S3_BUCKET_NAME: str | None = None
     S3_PUBLIC_DOMAIN: str | None = None
 
+    # Designation -> image index (local images dir + S3 listing)
+    IMAGE_INDEX_S3_ENABLED: bool = True  # Also index objects that only exist in the bucket
+    IMAGE_INDEX_S3_REFRESH_SECONDS: int = 300
+    IMAGE_CONVERT_BACKGROUND: bool = True  # Convert matched images to WebP off the request path
+    IMAGE_CONVERT_WORKERS: int = 2
+
 settings = Settings()
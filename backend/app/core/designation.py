@@ -0,0 +1,33 @@
+"""
+Helpers for comparing part designations.
+
+Invoices, Excel catalogs and image filenames spell the same designation
+differently ("R1.01.00.001", "r1 01 00 001", "R1.01.00.001 Пластина"),
+so lookups compare normalized forms.
+"""
+from typing import List
+
+
+def normalize_designation(value: str) -> str:
+    """Lowercase alphanumerics only: 'R1.01-00 A' -> 'r10100a'."""
+    return "".join(c.lower() for c in value or "" if c.isalnum())
+
+
+def first_token(value: str) -> str:
+    """Designation part of 'R1.301 Пластина' -> 'R1.301'."""
+    parts = (value or "").split()
+    return parts[0] if parts else ""
+
+
+def base_designations(designation: str) -> List[str]:
+    """
+    Candidate base designations of a variant, most specific first.
+
+    'R1.01.00.001a' -> ['R1.01.00.001'], 'R1.003-01' -> ['R1.003'].
+    """
+    candidates = []
+    if len(designation) > 1 and designation[-1].isalpha():
+        candidates.append(designation[:-1])
+    if '-' in designation:
+        candidates.append(designation.rsplit('-', 1)[0])
+    return candidates
@@ -1,15 +1,41 @@
-from sqlalchemy import Column, Float, Integer, String, Text
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    func,
+    text,
+)
 from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred, validates
 
+from app.core.designation import normalize_designation
 from app.db.base import Base
 
 
 class Part(Base):
     __tablename__ = "parts"
-    __table_args__ = {"schema": "public"}
+    __table_args__ = (
+        # pg_trgm: substring/similarity search (GIN) and nearest designations (GiST)
+        Index("ix_public_parts_designation_trgm", "designation",
+              postgresql_using="gin", postgresql_ops={"designation": "gin_trgm_ops"}),
+        Index("ix_public_parts_name_trgm", "name",
+              postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_public_parts_designation_trgm_knn", "designation",
+              postgresql_using="gist", postgresql_ops={"designation": "gist_trgm_ops"}),
+        {"schema": "public"},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     designation = Column(String, unique=True, index=True, nullable=False)  # Обозначение
+    designation_norm = Column(String, index=True, nullable=True)  # normalize_designation(designation), set on assignment
     name = Column(String, nullable=True)  # Наименование
     material = Column(String, nullable=True)  # Материал
     weight = Column(Float, nullable=True)  # Масса (кг или г)
@@ -35,3 +61,46 @@ class Part(Base):
     tnved_code = Column(String, nullable=True)
     tnved_description = Column(Text, nullable=True)
 
+    @validates("designation")
+    def _sync_designation_norm(self, key, value):
+        """Keep designation_norm in step with every designation write (API, importer, tools)."""
+        self.designation_norm = normalize_designation(value) or None
+        return value
+
+
+class CatalogVersion(Base):
+    """Single-row parts catalog version, bumped by a trigger on every parts write (see services/catalog.py)."""
+    __tablename__ = "catalog_version"
+    __table_args__ = {"schema": "public"}
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class ParseJob(Base):
+    """Invoice parsing job, processed by `python -m app.worker`."""
+    __tablename__ = "parse_jobs"
+    __table_args__ = (
+        # Queue scans: oldest queued job first
+        Index("ix_public_parse_jobs_queued", "created_at", postgresql_where=text("status = 'queued'")),
+        {"schema": "public"},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued / running / done / failed
+    filename = Column(String, nullable=False)
+    pdf = deferred(Column(LargeBinary, nullable=False))  # Uploaded file; cleared once the job finishes
+    method = Column(String, nullable=True)
+    use_cache = Column(Boolean, nullable=False, default=True)
+    refresh_cache = Column(Boolean, nullable=False, default=False)
+
+    progress = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)  # {"pages_rendered", "pages_parsed", "items"}
+    result = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)  # InvoiceUploadResponse
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
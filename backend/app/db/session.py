@@ -7,13 +7,14 @@ Features:
 - Automatic connection recycling
 """
 import logging
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Callable, Optional
 
 from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core.config import settings
 
@@ -25,10 +26,35 @@ MAX_OVERFLOW = 10       # Max additional connections above pool_size
 POOL_RECYCLE = 3600     # Recycle connections after 1 hour
 POOL_PRE_PING = True    # Check connection health before use
 
+# Called with the seconds each checkout waited for a connection (see set_pool_wait_observer)
+_pool_wait_observer: Optional[Callable[[float], None]] = None
+
+
+def set_pool_wait_observer(observer: Optional[Callable[[float], None]]) -> None:
+    """Report connection wait times to `observer` (app.main registers the metrics histogram)."""
+    global _pool_wait_observer
+    _pool_wait_observer = observer
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long callers wait for a connection."""
+
+    def _do_get(self):
+        observer = _pool_wait_observer
+        if observer is None:
+            return super()._do_get()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observer(time.perf_counter() - started)
+
+
 # Async engine with pooling
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False,
+    poolclass=TimedAsyncQueuePool,
     pool_size=POOL_SIZE,
     max_overflow=MAX_OVERFLOW,
     pool_recycle=POOL_RECYCLE,
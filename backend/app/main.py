@@ -35,8 +35,17 @@ async def lifespan(app: FastAPI):
     else:
         print("GROQ_API_KEY IS MISSING!")
     print("----------------------------")
+    refresher = None
+    if settings.CATALOG_SNAPSHOT_ENABLED and settings.CATALOG_FILE:
+        import asyncio
+        from app.services.catalog import refresh_catalog_forever
+        refresher = asyncio.create_task(refresh_catalog_forever(settings.CATALOG_REFRESH_SECONDS))
     yield
     # Shutdown
+    if refresher is not None:
+        refresher.cancel()
+    from app.services.llm_client import llm_client
+    await llm_client.aclose()
 
 app = FastAPI(
     title="Генератор технических описаний",
@@ -123,12 +132,11 @@ async def get_image(filename: str):
             headers=cache_headers
         )
 
-    # Fallback to local if needed
-    if os.path.exists(os.path.join(IMAGES_DIR, filename)):
-        return FileResponse(
-            os.path.join(IMAGES_DIR, filename),
-            headers=cache_headers
-        )
+    # Fallback to local if needed (including WebP conversions, see image_processor)
+    from app.services.image_processor import find_local_image
+    local_path = find_local_image(filename, IMAGES_DIR)
+    if local_path:
+        return FileResponse(local_path, headers=cache_headers)
 
     raise HTTPException(status_code=404, detail="Image not found")
 
@@ -139,6 +147,59 @@ async def get_cache_stats():
     return s3_service.cache_stats
 
 
+@app.get("/api/parse-cache-stats")
+async def get_parse_cache_stats():
+    """Get invoice parse cache statistics for monitoring."""
+    from app.services.parse_cache import page_cache, parse_cache
+    return {"invoices": parse_cache.stats, "pages": page_cache.stats}
+
+
+@app.get("/api/key-pool-stats")
+async def get_key_pool_stats():
+    """Get Groq API key scheduler statistics for monitoring."""
+    from app.services.key_pool import key_pool
+    return key_pool.stats
+
+
+@app.get("/api/llm-client-stats")
+async def get_llm_client_stats():
+    """Get pooled LLM HTTP client statistics for monitoring."""
+    from app.services.llm_client import llm_client
+    return llm_client.stats
+
+
+@app.get("/api/image-index-stats")
+async def get_image_index_stats():
+    """Get designation -> image index statistics for monitoring."""
+    from app.services.image_index import image_index
+    return image_index.stats
+
+
+def _collect_pool_metrics() -> None:
+    from app.db.session import get_pool_status
+    from app.services.metrics import DB_POOL_CONNECTIONS
+
+    status = get_pool_status()
+    for state in ("checked_in", "checked_out", "overflow"):
+        DB_POOL_CONNECTIONS.set(status[state], state=state)
+
+
+# DB pool metrics are wired up here, so app.db does not depend on app.services
+from app.db.session import set_pool_wait_observer
+from app.services.metrics import DB_POOL_WAIT_SECONDS, registry
+
+set_pool_wait_observer(DB_POOL_WAIT_SECONDS.observe)
+registry.add_collector(_collect_pool_metrics)
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Pipeline metrics (render/encode/LLM/match/DOCX timings, caches, DB pool) in Prometheus text format."""
+    from fastapi.responses import PlainTextResponse
+    from app.services.metrics import registry
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/db-pool-stats")
 async def get_db_pool_stats():
     """Get database connection pool statistics for monitoring."""
@@ -4,6 +4,7 @@ Pydantic schemas for Invoice-related API endpoints.
 These schemas define request/response models for PDF parsing
 and document generation operations.
 """
+from datetime import datetime
 from pydantic import BaseModel, Field
 from typing import List, Any, Dict, Optional
 
@@ -26,7 +27,7 @@ class InvoiceItem(BaseModel):
     parsing_method: Optional[str] = Field(None, description="Method used for parsing")
     manufacturer: Optional[str] = Field(None, description="Manufacturer name")
     condition: Optional[str] = Field(None, description="Condition: 'Новое' or 'Б/У'")
-    quantity: Optional[int | str] = Field(1, description="Item quantity")
+    quantity: Optional[int | float | str] = Field(1, description="Item quantity")
     price: Optional[float] = Field(None, description="Unit price")
     amount: Optional[float] = Field(None, description="Total amount")
     currency: Optional[str] = Field("USD", description="Currency code")
@@ -63,12 +64,50 @@ class InvoiceUploadResponse(BaseModel):
     metadata: Optional[Dict[str, Any]] = Field(None, description="Parsing metadata")
 
 
+class BatchInvoiceResult(BaseModel):
+    """Result for one file of a batch upload."""
+    
+    filename: str = Field(..., description="Uploaded file name")
+    sha256: str = Field(..., description="SHA-256 of the file contents")
+    duplicate_of: Optional[str] = Field(None, description="File with identical contents that was parsed instead")
+    items: List[InvoiceItem] = Field(default_factory=list, description="Items of this invoice")
+    debug_info: Optional[Dict[str, Any]] = Field(None, description="Debugging information")
+    metadata: Optional[Dict[str, Any]] = Field(None, description="Parsing metadata")
+    error: Optional[str] = Field(None, description="Error if this file could not be processed")
+
+
+class BatchUploadResponse(BaseModel):
+    """Response from the batch upload endpoint."""
+    
+    invoices: List[BatchInvoiceResult] = Field(..., description="Per-file results in upload order")
+    items: List[InvoiceItem] = Field(..., description="Items of all unique invoices merged by designation")
+    stats: Dict[str, Any] = Field(default_factory=dict, description="Batch statistics")
+
+
 class DebugUploadRequest(BaseModel):
     """Request for debug file upload (server-side file path)."""
     
     file_path: str = Field(..., description="Absolute path to PDF on server")
     method: str = Field("groq", description="Parsing method: 'groq'")
     api_key: Optional[str] = Field(None, description="Optional API key override")
+    use_cache: bool = Field(True, description="Use the parse result cache")
+    refresh_cache: bool = Field(False, description="Re-parse and overwrite the cached result")
+
+
+class ParseJobStatus(BaseModel):
+    """Status of a background parse job."""
+    
+    model_config = {"from_attributes": True}
+    
+    id: int = Field(..., description="Job id")
+    status: str = Field(..., description="'queued', 'running', 'done' or 'failed'")
+    filename: str = Field(..., description="Uploaded file name")
+    progress: Optional[Dict[str, Any]] = Field(None, description="Pages rendered/parsed and items found so far")
+    error: Optional[str] = Field(None, description="Last error, if any")
+    attempts: int = Field(0, description="Processing attempts so far")
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 class GenerateRequest(BaseModel):
@@ -0,0 +1,238 @@
+"""
+In-process, read-only snapshot of the parts catalog for invoice matching.
+
+Matching needs every designation (for fuzzy matching) and the fields copied
+into matched items, but not ORM objects: loading the table with
+select(Part) builds an identity-mapped, change-tracked instance per part on
+every upload. The snapshot is loaded once per process as plain column rows
+into __slots__ records, together with its trigram index, and reused until
+the catalog changes:
+
+- Every write to public.parts bumps public.catalog_version in the same
+  transaction (a statement-level trigger, so the API, importer, tools and
+  plain SQL are all covered); the parts API also patches the local snapshot
+- Readers compare the snapshot version with the database counter (one
+  primary-key lookup, at most every CATALOG_VERSION_CHECK_SECONDS) and
+  reload when another process changed the catalog
+
+With CATALOG_FILE set, the snapshot is a memory-mapped file shared by all
+workers on the host instead (catalog_file.py): the first worker that sees
+a new version rebuilds it, the others map the result.
+
+Usage:
+    snapshot = await part_catalog.snapshot(db)
+    part = snapshot.get("R1.003")
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.designation import normalize_designation
+from app.db.models import CatalogVersion, Part
+from app.services.fuzzy_matcher import FuzzyMatcher
+from app.services.metrics import CATALOG_PARTS, CATALOG_RELOADS_TOTAL
+
+CATALOG_FIELDS = tuple(column.name for column in Part.__table__.columns)
+CATALOG_COLUMNS = tuple(Part.__table__.columns)
+
+class CatalogPart:
+    """Slim read-only copy of a Part row (same attribute names, no ORM state)."""
+
+    __slots__ = CATALOG_FIELDS
+
+    def __init__(self, *values):
+        for field, value in zip(CATALOG_FIELDS, values):
+            setattr(self, field, value)
+
+    @classmethod
+    def from_part(cls, part: Part) -> "CatalogPart":
+        return cls(*(getattr(part, field, None) for field in CATALOG_FIELDS))
+
+    def __repr__(self) -> str:
+        return f"CatalogPart({self.designation!r})"
+
+
+class CatalogSnapshot:
+    """Immutable designation -> CatalogPart table; patches return a new snapshot."""
+
+    def __init__(self, version: int, records: Iterable[CatalogPart] = (), fuzzy: Optional[FuzzyMatcher] = None):
+        self.version = version
+        self.parts: Dict[str, CatalogPart] = {}
+        for record in records:
+            self.parts.setdefault(record.designation, record)
+        self._fuzzy = fuzzy
+        self._by_norm: Optional[Dict[str, CatalogPart]] = None
+
+    def __len__(self) -> int:
+        return len(self.parts)
+
+    def get(self, designation: str) -> Optional[CatalogPart]:
+        return self.parts.get(designation)
+
+    def get_normalized(self, designation: str) -> Optional[CatalogPart]:
+        """First part (by designation) with the same normalized designation."""
+        if self._by_norm is None:
+            self._by_norm = {}
+            for key in sorted(self.parts):
+                record = self.parts[key]
+                norm = record.designation_norm or normalize_designation(key)
+                if norm:
+                    self._by_norm.setdefault(norm, record)
+        norm = normalize_designation(designation)
+        return self._by_norm.get(norm) if norm else None
+
+    @property
+    def fuzzy(self) -> FuzzyMatcher:
+        """Trigram index over the designations, built on first use (once per snapshot)."""
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyMatcher(self.parts)
+        return self._fuzzy
+
+    def patched(self, record: CatalogPart, version: int, previous_designation: Optional[str] = None) -> "CatalogSnapshot":
+        """Copy with `record` inserted or replaced (a renamed part drops its old designation)."""
+        parts = dict(self.parts)
+        if previous_designation and previous_designation != record.designation:
+            parts.pop(previous_designation, None)
+        parts[record.designation] = record
+        # Field-only updates keep the designation set, so the trigram index stays valid
+        fuzzy = self._fuzzy if parts.keys() == self.parts.keys() else None
+        snapshot = CatalogSnapshot(version, fuzzy=fuzzy)
+        snapshot.parts = parts
+        return snapshot
+
+
+async def current_version(db: AsyncSession) -> int:
+    """Catalog version counter in the database (0 before the first write)."""
+    result = await db.execute(select(CatalogVersion.version).filter(CatalogVersion.id == 1))
+    return result.scalars().first() or 0
+
+
+async def written_version(db: AsyncSession) -> int:
+    """Flush pending parts writes and return the catalog version the trigger bumped them to."""
+    await db.flush()
+    return await current_version(db)
+
+
+class PartCatalog:
+    """
+    Process-wide catalog snapshot, reloaded when the database version changes.
+
+    Checks and reloads run under a lock, so concurrent uploads after a
+    change trigger one reload.
+    """
+
+    def __init__(self, check_interval: float = 0, path: Optional[str] = None):
+        self.check_interval = check_interval
+        self.path = path
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self.reloads = 0
+
+    async def _load(self, db: AsyncSession, version: int) -> CatalogSnapshot:
+        if self.path:
+            snapshot = await self._load_file(db, version)
+        else:
+            result = await db.execute(select(*CATALOG_COLUMNS))
+            snapshot = CatalogSnapshot(version, (CatalogPart(*row) for row in result.all()))
+        self.reloads += 1
+        CATALOG_RELOADS_TOTAL.inc()
+        CATALOG_PARTS.set(len(snapshot))
+        return snapshot
+
+    async def _load_file(self, db: AsyncSession, version: int):
+        """Map the shared catalog file, rebuilding it first if it is older than `version`."""
+        from app.services.catalog_file import BuildLock, open_catalog_file, write_catalog_file
+
+        mapped = await asyncio.to_thread(open_catalog_file, self.path)
+        if mapped is not None and mapped.version == version:
+            return mapped
+
+        lock = await asyncio.to_thread(BuildLock(self.path).acquire)
+        try:
+            # Another worker may have rebuilt it while we waited for the lock
+            mapped = await asyncio.to_thread(open_catalog_file, self.path)
+            if mapped is None or mapped.version != version:
+                result = await db.execute(select(*CATALOG_COLUMNS))
+                count = await asyncio.to_thread(write_catalog_file, self.path, version, result.all())
+                print(f"Catalog file {self.path} rebuilt: version {version}, {count} parts")
+                mapped = await asyncio.to_thread(open_catalog_file, self.path)
+        finally:
+            await asyncio.to_thread(lock.release)
+        if mapped is None:
+            raise RuntimeError(f"Catalog file {self.path} could not be built")
+        return mapped
+
+    async def snapshot(self, db: AsyncSession) -> CatalogSnapshot:
+        """Current snapshot, reloaded first if another process changed the catalog."""
+        snapshot = self._snapshot
+        if snapshot is not None and self._checked_at is not None \
+                and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+
+        async with self._lock:
+            version = await current_version(db)
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._snapshot = await self._load(db, version)
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def patch(self, part: Part, version: Optional[int], previous_designation: Optional[str] = None) -> None:
+        """
+        Apply a committed write of this process to the snapshot.
+
+        `version` is the value returned by written_version(); if other writes
+        happened in between, or the snapshot is a shared file, it is dropped
+        and reloaded on next use.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        if self.path or version is None or version != snapshot.version + 1:
+            self.invalidate()
+            return
+        self._snapshot = snapshot.patched(CatalogPart.from_part(part), version, previous_designation)
+        CATALOG_PARTS.set(len(self._snapshot))
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; the next snapshot() call reloads it."""
+        self._snapshot = None
+        self._checked_at = None
+
+    @property
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "parts": len(snapshot) if snapshot else 0,
+            "reloads": self.reloads,
+        }
+
+
+async def refresh_catalog_forever(interval: float) -> None:
+    """
+    Background refresher: keep the catalog current outside the upload path.
+
+    Run one per worker (see app.main); with CATALOG_FILE only the first
+    worker to notice a new version rebuilds the file.
+    """
+    from app.db.session import AsyncSessionLocal
+
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await part_catalog.snapshot(db)
+        except Exception as e:
+            print(f"Catalog refresh failed: {e}")
+        await asyncio.sleep(interval)
+
+
+part_catalog = PartCatalog(
+    check_interval=settings.CATALOG_VERSION_CHECK_SECONDS,
+    path=settings.CATALOG_FILE,
+)
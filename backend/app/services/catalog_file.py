@@ -0,0 +1,294 @@
+"""
+Immutable, memory-mapped parts catalog file shared by all workers of a host.
+
+With several workers per container every process would otherwise hold its
+own catalog snapshot and trigram index. The file is written once per
+catalog version and mapped read-only by every worker, so the pages live in
+the OS page cache once and worker RSS stays flat as the catalog grows.
+
+Layout (native byte order, the file is built and read on the same host):
+
+    header   HEADER: magic, format, catalog version, counts, section offsets
+    entries  ENTRY per part, sorted by designation: designation, normalized
+             key and JSON record (CATALOG_FIELDS values, incl. specs) as
+             (offset, length) pairs into the blob
+    norm     uint32 entry indexes sorted by normalized key
+    grams    GRAM per trigram, sorted: trigram in the blob, postings slice
+    postings uint32 entry indexes per trigram (FuzzyMatcher index)
+    blob     UTF-8 strings and JSON records
+
+Lookups binary-search the mapped tables and decode only the records they
+return. Writers build into a temporary file and os.replace() it, so readers
+see either the old or the new file; old mappings stay valid until dropped.
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Iterable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no build lock, concurrent rebuilds just replace each other
+    fcntl = None
+
+from app.core.designation import normalize_designation
+from app.services.catalog import CATALOG_FIELDS, CatalogPart
+from app.services.fuzzy_matcher import FuzzyMatcher
+
+MAGIC = b"PCAT"
+FORMAT_VERSION = 1
+
+# magic, format, catalog version, parts, trigrams, fields (blob offset, length),
+# then file offsets of entries, norm, grams, postings and blob
+HEADER = struct.Struct("=4sIQIIIIQQQQQ")
+ENTRY = struct.Struct("=IIIIII")
+GRAM = struct.Struct("=IIII")
+UINT32 = "I"
+
+DESIGNATION_INDEX = CATALOG_FIELDS.index("designation")
+
+
+def write_catalog_file(path: str, version: int, rows: Iterable[Sequence]) -> int:
+    """
+    Build the catalog file for `rows` (CATALOG_FIELDS values) and swap it in atomically.
+
+    Returns the number of parts written.
+    """
+    records = {}
+    for row in rows:
+        designation = row[DESIGNATION_INDEX]
+        if designation:
+            records.setdefault(designation, row)
+    designations = sorted(records)
+
+    blob = bytearray()
+
+    def put(data: bytes):
+        offset = len(blob)
+        blob.extend(data)
+        return offset, len(data)
+
+    fields_span = put(json.dumps(list(CATALOG_FIELDS)).encode())
+    entries = bytearray()
+    norms = []
+    for designation in designations:
+        norm = normalize_designation(designation)
+        norms.append(norm)
+        record = json.dumps(list(records[designation]), ensure_ascii=False, default=str).encode()
+        entries.extend(ENTRY.pack(*put(designation.encode()), *put(norm.encode()), *put(record)))
+    norm_index = array(UINT32, sorted(range(len(designations)), key=lambda idx: (norms[idx], idx)))
+
+    # Same index FuzzyMatcher builds in memory; values are the (unique, sorted) designations
+    fuzzy = FuzzyMatcher(designations)
+    grams = bytearray()
+    postings = array(UINT32)
+    for gram in sorted(fuzzy.postings):
+        indexes = fuzzy.postings[gram]
+        grams.extend(GRAM.pack(*put(gram.encode()), len(postings), len(indexes)))
+        postings.extend(indexes)
+
+    entries_off = HEADER.size
+    norm_off = entries_off + len(entries)
+    grams_off = norm_off + norm_index.itemsize * len(norm_index)
+    postings_off = grams_off + len(grams)
+    blob_off = postings_off + postings.itemsize * len(postings)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, version, len(designations), len(grams) // GRAM.size, *fields_span,
+        entries_off, norm_off, grams_off, postings_off, blob_off
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        for section in (header, entries, norm_index.tobytes(), grams, postings.tobytes(), blob):
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(designations)
+
+
+class _Designations(Sequence):
+    """Designations in entry order (FuzzyMatcher values)."""
+
+    def __init__(self, catalog: "MappedCatalog"):
+        self._catalog = catalog
+
+    def __len__(self) -> int:
+        return len(self._catalog)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        return self._catalog._string(idx, 0)
+
+
+class _Parts(Mapping):
+    """designation -> CatalogPart, read from the mapped file on access."""
+
+    def __init__(self, catalog: "MappedCatalog"):
+        self._catalog = catalog
+
+    def __getitem__(self, designation: str) -> CatalogPart:
+        idx = self._catalog._find(designation)
+        if idx is None:
+            raise KeyError(designation)
+        return self._catalog._record(idx)
+
+    def __contains__(self, designation) -> bool:
+        return isinstance(designation, str) and self._catalog._find(designation) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._catalog.designations)
+
+    def __len__(self) -> int:
+        return len(self._catalog)
+
+
+class _Postings(Mapping):
+    """trigram -> entry indexes (memoryview slices of the mapped postings)."""
+
+    def __init__(self, catalog: "MappedCatalog"):
+        self._catalog = catalog
+
+    def __getitem__(self, gram: str):
+        catalog = self._catalog
+        lo, hi = 0, catalog.gram_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset, length, start, count = GRAM.unpack_from(catalog._mm, catalog._grams_off + mid * GRAM.size)
+            value = catalog._blob_str(offset, length)
+            if value == gram:
+                return catalog._postings[start:start + count]
+            if value < gram:
+                lo = mid + 1
+            else:
+                hi = mid
+        raise KeyError(gram)
+
+    def __iter__(self) -> Iterator[str]:
+        catalog = self._catalog
+        for idx in range(catalog.gram_count):
+            offset, length, _, _ = GRAM.unpack_from(catalog._mm, catalog._grams_off + idx * GRAM.size)
+            yield catalog._blob_str(offset, length)
+
+    def __len__(self) -> int:
+        return self._catalog.gram_count
+
+
+class MappedCatalog:
+    """
+    Read-only view of a catalog file; same interface as CatalogSnapshot.
+
+    Raises ValueError for files of another format or field layout
+    (rebuild them with write_catalog_file).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size < HEADER.size:
+                raise ValueError(f"Catalog file {path} is truncated")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        (magic, file_format, self.version, self.count, self.gram_count, fields_offset, fields_length,
+         self._entries_off, self._norm_off, self._grams_off, postings_off, self._blob_off) = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or file_format != FORMAT_VERSION:
+            raise ValueError(f"Catalog file {path} has an unknown format")
+        if tuple(json.loads(self._blob_str(fields_offset, fields_length))) != CATALOG_FIELDS:
+            raise ValueError(f"Catalog file {path} was built for other part fields")
+
+        view = memoryview(self._mm)
+        self._norm = view[self._norm_off:self._grams_off].cast(UINT32)
+        self._postings = view[postings_off:self._blob_off].cast(UINT32)
+
+        self.parts = _Parts(self)
+        self.designations = _Designations(self)
+        self.fuzzy = FuzzyMatcher.from_index(self.designations, _Postings(self))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _blob_str(self, offset: int, length: int) -> str:
+        start = self._blob_off + offset
+        return self._mm[start:start + length].decode()
+
+    def _entry(self, idx: int):
+        return ENTRY.unpack_from(self._mm, self._entries_off + idx * ENTRY.size)
+
+    def _string(self, idx: int, field: int) -> str:
+        """Designation (field 0) or normalized key (field 1) of entry `idx`."""
+        if not 0 <= idx < self.count:
+            raise IndexError(idx)
+        entry = self._entry(idx)
+        return self._blob_str(entry[field * 2], entry[field * 2 + 1])
+
+    def _record(self, idx: int) -> CatalogPart:
+        entry = self._entry(idx)
+        return CatalogPart(*json.loads(self._blob_str(entry[4], entry[5])))
+
+    def _find(self, designation: str) -> Optional[int]:
+        idx = bisect.bisect_left(self.designations, designation)
+        if idx < self.count and self._string(idx, 0) == designation:
+            return idx
+        return None
+
+    def get(self, designation: str) -> Optional[CatalogPart]:
+        idx = self._find(designation)
+        return self._record(idx) if idx is not None else None
+
+    def get_normalized(self, designation: str) -> Optional[CatalogPart]:
+        """First part (by designation) whose normalized key equals that of `designation`."""
+        key = normalize_designation(designation)
+        if not key:
+            return None
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string(self._norm[mid], 1) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._string(self._norm[lo], 1) == key:
+            return self._record(self._norm[lo])
+        return None
+
+
+def open_catalog_file(path: str) -> Optional[MappedCatalog]:
+    """Map the catalog file, None when it is missing or unusable."""
+    try:
+        return MappedCatalog(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Ignoring catalog file {path}: {e}")
+        return None
+
+
+class BuildLock:
+    """Exclusive lock (flock on `<path>.lock`) so one worker rebuilds the file at a time."""
+
+    def __init__(self, path: str):
+        self.path = f"{path}.lock"
+        self._file = None
+
+    def acquire(self) -> "BuildLock":
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def release(self) -> None:
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
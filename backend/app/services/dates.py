@@ -0,0 +1,47 @@
+"""
+Date helpers shared by the invoice parser, the text layer extractor and the document generator.
+"""
+import re
+from datetime import datetime
+
+
+def normalize_date(date_str: str) -> str:
+    """
+    Normalizes a date string to DD.MM.YYYY format.
+    Supports formats like:
+    - YYYY-MM-DD
+    - DD.MM.YYYY
+    - Oct.16th, 2023
+    - 2025-Oct-24
+    """
+    if not date_str:
+        return ""
+
+    date_str = date_str.strip()
+
+    # Pre-processing: remove "th", "st", "nd", "rd" suffixes after digits
+    clean_str = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str)
+
+    formats = [
+        "%Y-%m-%d",       # 2025-10-24
+        "%d.%m.%Y",       # 24.10.2025
+        "%Y/%m/%d",       # 2025/10/24
+        "%d/%m/%Y",       # 24/10/2025
+        "%b.%d, %Y",      # Oct.16, 2023
+        "%B %d, %Y",      # October 16, 2023
+        "%d-%b-%Y",       # 24-Oct-2025
+        "%Y-%b-%d",       # 2025-Oct-24
+        "%b %d, %Y",      # Oct 16, 2023
+        "%d %b. %Y",      # 23 Oct. 2025
+        "%d %b %Y",       # 23 Oct 2025
+        "%d %B %Y",       # 23 October 2025
+    ]
+
+    for fmt in formats:
+        try:
+            dt = datetime.strptime(clean_str, fmt)
+            return dt.strftime("%d.%m.%Y")
+        except ValueError:
+            continue
+
+    return date_str  # Return original if parsing fails
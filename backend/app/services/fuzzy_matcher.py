@@ -0,0 +1,115 @@
+"""
+Fuzzy designation matching with a character-trigram candidate index.
+
+difflib.get_close_matches scores every catalog entry for every query,
+which is O(items x catalog) with a slow pure-Python scorer. FuzzyMatcher
+indexes the trigrams of normalized designations once, collects the entries
+that share the most (rarest) trigrams with a query, and scores only those
+with difflib, so results keep the get_close_matches top-1/cutoff semantics:
+
+    matcher = FuzzyMatcher(part.designation for part in parts)
+    matcher.best("R1.0O3")  # -> "R1.003"
+"""
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set
+
+from app.core.designation import normalize_designation
+
+DEFAULT_CUTOFF = 0.8
+# Entries scored per query (those sharing the most trigrams)
+MAX_CANDIDATES = 50
+# Trigrams found in more than this share of the catalog carry little signal and
+# are only used when a query has no rarer ones
+COMMON_TRIGRAM_SHARE = 0.05
+
+
+def trigrams(value: str) -> Set[str]:
+    """Trigrams of the normalized designation, padded so short values still get some."""
+    normalized = normalize_designation(value) or value.casefold()
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def best_match(query: str, candidates: Iterable[str], cutoff: float = DEFAULT_CUTOFF) -> Optional[str]:
+    """Best of `candidates` by difflib ratio (>= cutoff), ties broken like get_close_matches."""
+    scorer = SequenceMatcher()
+    scorer.set_seq2(query)  # difflib caches details about the second sequence
+    best = None
+    for value in candidates:
+        scorer.set_seq1(value)
+        if scorer.real_quick_ratio() >= cutoff and scorer.quick_ratio() >= cutoff:
+            score = scorer.ratio()
+            if score >= cutoff and (best is None or (score, value) > best):
+                best = (score, value)
+                if score == 1.0:
+                    break  # Identical, nothing can score higher
+    return best[1] if best else None
+
+
+def trigram_similarity(a: str, b: str) -> float:
+    """Shared trigrams over all trigrams, like pg_trgm similarity() (on normalized values)."""
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    union = grams_a | grams_b
+    return len(grams_a & grams_b) / len(union) if union else 0.0
+
+
+class FuzzyMatcher:
+    """Trigram inverted index over designations, scored with difflib on candidates."""
+
+    def __init__(self, values: Iterable[str], max_candidates: int = MAX_CANDIDATES):
+        self.values: Sequence[str] = list(dict.fromkeys(value for value in values if value))
+        self.max_candidates = max_candidates
+        postings = defaultdict(list)
+        for idx, value in enumerate(self.values):
+            for gram in trigrams(value):
+                postings[gram].append(idx)
+        self._postings: Mapping[str, Sequence[int]] = dict(postings)
+        self._common_limit = max(50, int(COMMON_TRIGRAM_SHARE * len(self.values)))
+
+    @classmethod
+    def from_index(
+        cls,
+        values: Sequence[str],
+        postings: Mapping[str, Sequence[int]],
+        max_candidates: int = MAX_CANDIDATES
+    ) -> "FuzzyMatcher":
+        """Matcher over a prebuilt index (trigram -> value indexes), e.g. a memory-mapped catalog file."""
+        matcher = cls.__new__(cls)
+        matcher.values = values
+        matcher.max_candidates = max_candidates
+        matcher._postings = postings
+        matcher._common_limit = max(50, int(COMMON_TRIGRAM_SHARE * len(values)))
+        return matcher
+
+    @property
+    def postings(self) -> Mapping[str, Sequence[int]]:
+        """Trigram -> indexes into values."""
+        return self._postings
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def candidates(self, query: str) -> List[str]:
+        """Entries sharing the most trigrams with `query` (at most max_candidates)."""
+        found = (self._postings.get(gram) for gram in trigrams(query))
+        lists = sorted((postings for postings in found if postings), key=len)
+        rare = [postings for postings in lists if len(postings) <= self._common_limit]
+        counts = Counter()
+        for postings in rare or lists[:1]:
+            counts.update(postings)
+        return [self.values[idx] for idx, _ in counts.most_common(self.max_candidates)]
+
+    def best(self, query: str, cutoff: float = DEFAULT_CUTOFF) -> Optional[str]:
+        """
+        Closest entry with a difflib ratio >= cutoff, or None.
+
+        Same scoring and tie-breaking as get_close_matches(query, values, n=1, cutoff).
+        """
+        if not query:
+            return None
+        return best_match(query, self.candidates(query), cutoff)
+
+    def best_many(self, queries: Iterable[str], cutoff: float = DEFAULT_CUTOFF) -> Dict[str, Optional[str]]:
+        """best() for several queries (each distinct query is scored once)."""
+        return {query: self.best(query, cutoff) for query in dict.fromkeys(queries)}
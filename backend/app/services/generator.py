@@ -14,7 +14,8 @@ import os
 from datetime import datetime
 
 from app.db.models import Part
-from app.services.parser import normalize_date
+from app.services.dates import normalize_date
+from app.services.image_processor import find_local_image
 from app.services.s3 import s3_service
 from app.services.docx_helpers import (
     set_font,
@@ -546,10 +547,10 @@ def generate_technical_description(items: list, output_path: str, country_of_ori
             set_font(run, bold=True)
         
         if hasattr(part, 'image_path') and part.image_path:
-            image_full_path = os.path.join(IMAGES_DIR, part.image_path)
+            image_full_path = find_local_image(part.image_path, IMAGES_DIR)
             
             image_stream = None
-            if os.path.exists(image_full_path):
+            if image_full_path:
                 image_stream = open(image_full_path, 'rb')
             else:
                 # Try S3
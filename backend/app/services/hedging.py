@@ -0,0 +1,138 @@
+"""
+Hedged requests for tail-latency pages.
+
+A page whose LLM request has not finished by the recent p90 page latency
+gets a duplicate request (on another key); the first valid result wins and
+the other request is cancelled. A credit budget caps the extra requests:
+every page earns `ratio` credits and every hedge spends one, so hedges can
+never exceed `ratio` times the number of pages.
+"""
+import asyncio
+import math
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.services.metrics import HEDGE_REQUESTS_TOTAL
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Rolling window of recent page latencies (seconds)."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, None without samples."""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+
+class HedgeBudget:
+    """Extra-request budget: `ratio` credits per page, one credit per hedge."""
+
+    def __init__(self, ratio: float, max_credits: float = 5.0):
+        self.ratio = ratio
+        self.max_credits = max_credits
+        self.credits = 0.0
+        self.earned = 0
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self.earned += 1
+            self.credits = min(self.max_credits, self.credits + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.credits < 1:
+                return False
+            self.credits -= 1
+            self.spent += 1
+            return True
+
+
+def hedge_delay(tracker: LatencyTracker) -> Optional[float]:
+    """Seconds to wait before hedging, None while there are too few samples."""
+    if len(tracker) < settings.HEDGE_MIN_SAMPLES:
+        return None
+    threshold = tracker.percentile(settings.HEDGE_PERCENTILE)
+    return min(settings.HEDGE_MAX_DELAY, max(settings.HEDGE_MIN_DELAY, threshold))
+
+
+async def _cancel(*tasks: asyncio.Future) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _valid(task: asyncio.Future, is_valid: Callable[[T], bool]) -> bool:
+    return not task.cancelled() and task.exception() is None and is_valid(task.result())
+
+
+async def run_hedged(
+    primary: Callable[[], Awaitable[T]],
+    hedge: Callable[[], Awaitable[T]],
+    delay: Optional[float],
+    is_valid: Callable[[T], bool],
+    budget: HedgeBudget,
+) -> Tuple[T, Optional[str]]:
+    """
+    Run `primary`; if it is still running after `delay`, also run `hedge`.
+
+    Returns (result, winner) where winner is None when no hedge was issued,
+    otherwise "primary" or "hedge". The first valid result wins and the other
+    task is cancelled; when neither is valid the primary result is returned.
+    Cancelling the call cancels both requests.
+    """
+    budget.earn()
+    first = asyncio.ensure_future(primary())
+    second = None
+    try:
+        if delay is None:
+            return await first, None
+
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result(), None
+        if not budget.try_spend():
+            HEDGE_REQUESTS_TOTAL.inc(outcome="budget_exhausted")
+            return await first, None
+
+        second = asyncio.ensure_future(hedge())
+        pending = {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in (first, second):
+                if task in done and _valid(task, is_valid):
+                    await _cancel(*pending)
+                    winner = "primary" if task is first else "hedge"
+                    HEDGE_REQUESTS_TOTAL.inc(outcome="won" if winner == "hedge" else "lost")
+                    return task.result(), winner
+
+        HEDGE_REQUESTS_TOTAL.inc(outcome="failed")
+        return first.result(), "primary"
+    except BaseException:
+        await _cancel(*(task for task in (first, second) if task is not None))
+        raise
+
+
+# Shared across invoices so the threshold reflects recent traffic
+page_latency = LatencyTracker()
+hedge_budget = HedgeBudget(settings.HEDGE_BUDGET_RATIO)
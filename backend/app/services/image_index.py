@@ -0,0 +1,205 @@
+"""
+Designation -> image filename index over the local images directory and the S3 bucket.
+
+Replaces the per-call os.listdir() + linear startswith() scans in the
+parser, importer and tools. Lookup order for a designation:
+
+1. Exact filename stem ("R1.003" -> "R1.003.webp")
+2. First token of the stem ("R1.301 Пластина.jpg" matches "R1.301")
+3. Normalized stem (lowercase alphanumerics, see core/designation.py)
+4. Base designation of a variant ("R1.003a", "R1.003-01" -> "R1.003")
+5. Prefix of a stem (binary search over sorted stems)
+
+WebP files win over other formats, local files over S3 objects.
+The local directory is re-scanned only when its mtime changes, the S3
+listing is refreshed after IMAGE_INDEX_S3_REFRESH_SECONDS.
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.designation import base_designations, first_token, normalize_designation
+
+# Preference order when several files share a stem
+IMAGE_EXTENSIONS = ('.webp', '.jpg', '.jpeg', '.png')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_IMAGES_DIR = "/app/images" if os.path.exists("/app/images") else os.path.join(BASE_DIR, "images")
+
+
+class _Snapshot:
+    """Immutable lookup tables; replaced as a whole on refresh so readers need no lock."""
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        def rank(entry):
+            filename, source = entry
+            ext = os.path.splitext(filename)[1].lower()
+            return IMAGE_EXTENSIONS.index(ext), source != "local", filename
+
+        self.sources: Dict[str, str] = {}
+        self.exact: Dict[str, str] = {}
+        self.tokens: Dict[str, str] = {}
+        self.normalized: Dict[str, str] = {}
+        for filename, source in sorted(entries, key=rank):
+            self.sources.setdefault(filename, source)
+            stem = os.path.splitext(os.path.basename(filename))[0]
+            self.exact.setdefault(stem, filename)
+            self.tokens.setdefault(first_token(stem), filename)
+            self.normalized.setdefault(normalize_designation(stem), filename)
+        self.stems: List[str] = sorted(self.exact)
+
+    def prefix(self, designation: str) -> Optional[str]:
+        idx = bisect.bisect_left(self.stems, designation)
+        if idx < len(self.stems) and self.stems[idx].startswith(designation):
+            return self.exact[self.stems[idx]]
+        return None
+
+
+class ImageIndex:
+    """
+    Shared image lookup for invoice items and imported parts.
+
+    Usage:
+        image_index.refresh()
+        filename = image_index.lookup("R1.01.00.001a")
+        path = image_index.local_path(filename)  # None for S3-only images
+    """
+
+    def __init__(
+        self,
+        local_dir: Optional[str] = DEFAULT_IMAGES_DIR,
+        use_s3: bool = False,
+        s3_refresh_seconds: float = 300,
+        s3_prefix: str = "",
+        extensions: Tuple[str, ...] = IMAGE_EXTENSIONS
+    ):
+        self.local_dir = local_dir
+        self.use_s3 = use_s3
+        self.s3_refresh_seconds = s3_refresh_seconds
+        self.s3_prefix = s3_prefix
+        self.extensions = extensions
+        self._lock = threading.Lock()
+        self._local: List[str] = []
+        self._local_mtime: Optional[int] = None
+        self._s3: List[str] = []
+        self._s3_listed_at: Optional[float] = None
+        self._snapshot = _Snapshot([])
+        self.rebuilds = 0
+
+    def _scan_local(self) -> bool:
+        """Re-list the local directory if its mtime changed. Returns True if the image files changed."""
+        if not self.local_dir:
+            return False
+        try:
+            mtime = os.stat(self.local_dir).st_mtime_ns
+        except OSError:
+            changed = bool(self._local)
+            self._local, self._local_mtime = [], None
+            return changed
+        if mtime == self._local_mtime:
+            return False
+        with os.scandir(self.local_dir) as entries:
+            local = sorted(
+                entry.name for entry in entries
+                if entry.is_file() and entry.name.lower().endswith(self.extensions)
+            )
+        self._local_mtime = mtime
+        # Other changes to the directory (subdirectories, non-image files) keep the snapshot
+        changed = local != self._local
+        self._local = local
+        return changed
+
+    def _scan_s3(self, force: bool) -> bool:
+        """Re-list the bucket when the listing is older than s3_refresh_seconds."""
+        if not self.use_s3:
+            return False
+        if not force and self._s3_listed_at is not None \
+                and time.monotonic() - self._s3_listed_at < self.s3_refresh_seconds:
+            return False
+        from app.services.s3 import s3_service
+
+        keys = s3_service.list_objects(self.s3_prefix)
+        self._s3_listed_at = time.monotonic()
+        if keys is None:
+            # Keep the previous listing, retry after the refresh interval
+            return False
+        self._s3 = [key for key in keys if key.lower().endswith(self.extensions)]
+        return True
+
+    def refresh(self, force: bool = False) -> None:
+        """Bring the index up to date (cheap when nothing changed)."""
+        with self._lock:
+            if force:
+                self._local_mtime = None
+            local_changed = self._scan_local()
+            s3_changed = self._scan_s3(force)
+            if local_changed or s3_changed:
+                entries = [(name, "local") for name in self._local] + [(key, "s3") for key in self._s3]
+                self._snapshot = _Snapshot(entries)
+                self.rebuilds += 1
+
+    def lookup(self, designation: str, strict: bool = False) -> Optional[str]:
+        """
+        Find the image filename (or S3 key) for a designation.
+
+        strict: exact, token and normalized matches only (no base-part or
+        prefix match, which may belong to another part).
+        """
+        if not designation:
+            return None
+        snapshot = self._snapshot
+        designation = designation.strip()
+
+        found = snapshot.exact.get(designation) or snapshot.tokens.get(designation)
+        if not found and ' ' in designation:
+            found = snapshot.exact.get(first_token(designation))
+        if not found:
+            normalized = normalize_designation(designation)
+            found = snapshot.normalized.get(normalized) if normalized else None
+        if strict:
+            return found
+        if not found:
+            for base in base_designations(designation):
+                found = snapshot.exact.get(base)
+                if found:
+                    break
+        if not found:
+            found = snapshot.prefix(designation)
+        return found
+
+    def local_path(self, filename: str) -> Optional[str]:
+        """Absolute path of an indexed local file, None for S3-only images."""
+        if self._snapshot.sources.get(filename) != "local":
+            return None
+        return os.path.join(self.local_dir, filename)
+
+    @property
+    def stats(self) -> dict:
+        """Get index statistics."""
+        return {
+            "local_dir": self.local_dir,
+            "local_files": len(self._local),
+            "s3_objects": len(self._s3),
+            "stems": len(self._snapshot.stems),
+            "rebuilds": self.rebuilds,
+        }
+
+
+image_index = ImageIndex(
+    use_s3=settings.IMAGE_INDEX_S3_ENABLED and bool(settings.S3_BUCKET_NAME),
+    s3_refresh_seconds=settings.IMAGE_INDEX_S3_REFRESH_SECONDS,
+)
+
+
+def get_image_index(local_dir: Optional[str] = None) -> ImageIndex:
+    """Shared index for the default images dir, a separate one (same S3 settings) for other dirs."""
+    if local_dir is None or os.path.abspath(local_dir) == os.path.abspath(image_index.local_dir):
+        return image_index
+    return ImageIndex(
+        local_dir=local_dir,
+        use_s3=image_index.use_s3,
+        s3_refresh_seconds=image_index.s3_refresh_seconds,
+    )
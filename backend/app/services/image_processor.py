@@ -1,36 +1,136 @@
+import hashlib
 import os
-import uuid
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional
 
 from PIL import Image
 
+from app.core.config import settings
+
 # Define constants
 MAX_IMAGE_DIMENSION = 1024
 IMAGE_QUALITY = 80
 IMAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "images")
 
+# Conversions are written below IMAGES_DIR, outside the directory the image index scans:
+# hash filenames must not match designation lookups, and new files must not trigger re-indexing
+CONVERTED_SUBDIR = "converted"
+# Source files whose converted filename is remembered (avoids re-hashing unchanged files)
+CONVERTED_CACHE_SIZE = 4096
+
 if not os.path.exists(IMAGES_DIR):
     os.makedirs(IMAGES_DIR)
 
-def process_and_save_image(pil_image: Image.Image) -> str:
-    """
-    Resizes image if too large, converts to WebP, saves to disk, and returns the filename.
-    """
-    # Resize if needed
+# Conversions queued or running in the background pool, by target filename
+_pending: Dict[str, Future] = {}
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _target_filename(digest_source: bytes) -> str:
+    """WebP filename derived from the source content and the conversion parameters."""
+    digest = hashlib.sha256(digest_source)
+    digest.update(f"|{MAX_IMAGE_DIMENSION}|{IMAGE_QUALITY}".encode())
+    return f"{digest.hexdigest()[:32]}.webp"
+
+
+def _converted_dir() -> str:
+    path = os.path.join(IMAGES_DIR, CONVERTED_SUBDIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _save_webp(pil_image: Image.Image, filename: str) -> None:
+    """Resize if too large and write atomically (readers never see a partial file)."""
     width, height = pil_image.size
     if width > MAX_IMAGE_DIMENSION or height > MAX_IMAGE_DIMENSION:
         ratio = min(MAX_IMAGE_DIMENSION / width, MAX_IMAGE_DIMENSION / height)
         new_size = (int(width * ratio), int(height * ratio))
         pil_image = pil_image.resize(new_size, Image.Resampling.LANCZOS)
 
-    # Generate filename
-    filename = f"{uuid.uuid4()}.webp"
-    filepath = os.path.join(IMAGES_DIR, filename)
+    filepath = os.path.join(_converted_dir(), filename)
+    tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pil_image.save(tmp_path, "WEBP", quality=IMAGE_QUALITY)
+    os.replace(tmp_path, filepath)
+
+
+def process_and_save_image(pil_image: Image.Image) -> str:
+    """
+    Resizes image if too large, converts to WebP, saves to disk, and returns the filename.
+
+    The filename is derived from the pixel data, so saving the same image
+    twice reuses the existing file.
+    """
+    header = f"{pil_image.mode}|{pil_image.size}|".encode()
+    filename = _target_filename(header + pil_image.tobytes())
+    if not os.path.exists(get_image_path(filename)):
+        _save_webp(pil_image, filename)
+    return filename
+
+
+@lru_cache(maxsize=CONVERTED_CACHE_SIZE)
+def _file_target(source_path: str, mtime_ns: int, size: int) -> str:
+    """Converted filename of a source file version (LRU-cached by path, mtime and size)."""
+    with open(source_path, "rb") as f:
+        return _target_filename(f.read())
+
 
-    # Save as WebP
-    pil_image.save(filepath, "WEBP", quality=IMAGE_QUALITY)
+def converted_filename(source_path: str) -> str:
+    """WebP filename for a source image file (whether or not it was converted yet)."""
+    stat = os.stat(source_path)
+    return _file_target(os.path.abspath(source_path), stat.st_mtime_ns, stat.st_size)
 
+
+def convert_image_file(source_path: str) -> str:
+    """Convert a source image file to WebP once; later calls return the existing file."""
+    filename = converted_filename(source_path)
+    if not os.path.exists(get_image_path(filename)):
+        with Image.open(source_path) as img:
+            _save_webp(img, filename)
     return filename
 
+
+def get_converted_image(source_path: str) -> Optional[str]:
+    """
+    Return the WebP filename if the source was already converted.
+
+    Otherwise schedule the conversion in the background pool and return
+    None, so the caller can use the source image for now.
+    """
+    global _executor
+
+    filename = converted_filename(source_path)
+    if os.path.exists(get_image_path(filename)):
+        return filename
+
+    with _lock:
+        if filename not in _pending:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_CONVERT_WORKERS, thread_name_prefix="image-convert"
+                )
+            future = _executor.submit(convert_image_file, source_path)
+            _pending[filename] = future
+            future.add_done_callback(lambda _: _pending.pop(filename, None))
+    return None
+
+
+def wait_for_conversions(timeout: Optional[float] = None) -> None:
+    """Block until queued background conversions finish (tools, tests, shutdown)."""
+    for future in list(_pending.values()):
+        future.exception(timeout=timeout)
+
+
 def get_image_path(filename: str) -> str:
-    """Returns absolute path for a given filename"""
-    return os.path.join(IMAGES_DIR, filename)
+    """Returns absolute path for a given converted filename"""
+    return os.path.join(IMAGES_DIR, CONVERTED_SUBDIR, filename)
+
+
+def find_local_image(filename: str, images_dir: str) -> Optional[str]:
+    """Local file for a stored image_path: the images directory first, then WebP conversions."""
+    for path in (os.path.join(images_dir, filename), get_image_path(os.path.basename(filename))):
+        if os.path.exists(path):
+            return path
+    return None
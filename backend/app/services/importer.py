@@ -3,7 +3,9 @@ import os
 import pandas as pd
 from sqlalchemy.orm import Session
 
+from app.core.designation import normalize_designation
 from app.db.models import Part
+from app.services.image_index import get_image_index
 
 
 def clean_float(value):
@@ -26,8 +28,6 @@ def clean_str(value):
     return str(value).strip()
 
 def import_parts_from_excel(file_path: str, db: Session):
-    # Image mapping logic
-    image_map = {}
     # In Docker, images are mounted to /app/images
     # Fallback to local dev path if needed
     if os.path.exists("/app/images"):
@@ -40,44 +40,11 @@ def import_parts_from_excel(file_path: str, db: Session):
              # Try project root _изображения
              image_dir = os.path.abspath(os.path.join(BASE_DIR, "../_изображения"))
 
-    def normalize_name(name):
-        return "".join(c.lower() for c in name if c.isalnum())
-
-    if os.path.exists(image_dir):
-        print(f"Scanning images in {image_dir}...")
-        for filename in os.listdir(image_dir):
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-                name_part = os.path.splitext(filename)[0]
-                ext = os.path.splitext(filename)[1].lower()
-
-                # Exact match logic
-                # Prioritize WebP
-                current_val = image_map.get(name_part)
-                if current_val:
-                    current_ext = os.path.splitext(current_val)[1].lower()
-                    if current_ext != '.webp' and ext == '.webp':
-                        image_map[name_part] = filename
-                else:
-                    image_map[name_part] = filename
-
-                # Also try to map just the designation part if it has extra text
-                parts = name_part.split(' ')
-                if parts:
-                    des = parts[0]
-                    current_val_des = image_map.get(des)
-                    if current_val_des:
-                        current_ext_des = os.path.splitext(current_val_des)[1].lower()
-                        if current_ext_des != '.webp' and ext == '.webp':
-                            image_map[des] = filename
-                    else:
-                        image_map[des] = filename
-
-                # Fuzzy match map (normalized -> filename)
-                norm_name = normalize_name(name_part)
-                if norm_name not in image_map: # Don't overwrite exact matches
-                     image_map[norm_name] = filename
-    else:
+    if not os.path.exists(image_dir):
         print(f"Image directory not found: {image_dir}")
+    image_index = get_image_index(image_dir)
+    image_index.refresh()
+    print(f"Indexed images: {image_index.stats}")
 
     print(f"Reading Excel file: {file_path}")
     try:
@@ -168,14 +135,6 @@ def import_parts_from_excel(file_path: str, db: Session):
                 designation = clean_designation
                 print(f"Using cleaned designation: {original_designation} -> {designation}")
 
-        if 'R1.301' in designation:
-            print(f"Processing R1.301: {repr(designation)} (Original: {repr(original_designation)})")
-
-            if original_designation in image_map:
-                print(f"  Found full name in image_map: {image_map[original_designation]}")
-            if designation in image_map:
-                 print(f"  Found cleaned name in image_map: {image_map[designation]}")
-
         try:
             # Check if exists
             existing = db.query(Part).filter(Part.designation == designation).first()
@@ -188,6 +147,15 @@ def import_parts_from_excel(file_path: str, db: Session):
                     print(f"Found existing part by cleaned designation: {designation} -> {clean_designation}")
                     designation = clean_designation
 
+            # Same designation spelled differently ("R1.003" vs "r1 003"): update it instead of adding a duplicate
+            if not existing and normalize_designation(designation):
+                existing = db.query(Part).filter(
+                    Part.designation_norm == normalize_designation(designation)
+                ).order_by(Part.designation).first()
+                if existing:
+                    print(f"Found existing part by normalized designation: {designation} -> {existing.designation}")
+                    designation = existing.designation
+
             name = clean_str(get_val('Наименование'))
             material = clean_str(get_val('Материал'))
 
@@ -200,28 +168,8 @@ def import_parts_from_excel(file_path: str, db: Session):
             description = clean_str(get_val('Спецификация'))
             section = clean_str(get_val('Раздел'))
 
-            # Find image
-            image_filename = image_map.get(designation)
-
-            # If not exact match, try fuzzy match
-            if not image_filename:
-                norm_des = normalize_name(designation)
-                image_filename = image_map.get(norm_des)
-
-            # Try splitting by space for image lookup (e.g. "R1.301 Name" -> "R1.301")
-            if not image_filename and ' ' in designation:
-                 clean_des = designation.split(' ')[0]
-                 image_filename = image_map.get(clean_des)
-                 if image_filename:
-                     print(f"Found image for cleaned designation: {designation} -> {clean_des}")
-                     designation = clean_des
-
-            # If still not found, try prefix match
-            if not image_filename:
-                 for key, val in image_map.items():
-                     if key.startswith(designation):
-                         image_filename = val
-                         break
+            # Find image (exact -> designation token -> normalized -> base -> prefix)
+            image_filename = image_index.lookup(designation) or image_index.lookup(original_designation)
 
             if not image_filename:
                 print(f"Skipping {designation}: No image found.")
@@ -261,5 +209,6 @@ def import_parts_from_excel(file_path: str, db: Session):
             db.rollback()
             continue
 
+    # The parts trigger bumped catalog_version: running workers reload on the next upload
     db.commit()
     print(f"Imported/Updated {count} parts.")
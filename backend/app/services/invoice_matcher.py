@@ -0,0 +1,385 @@
+"""
+Matching of parsed invoice items against the parts database.
+
+Lookup order per designation: Exact Match -> Base Part -> Normalized Match
+(same designation with other case/separators, see core/designation.py) -> Fuzzy Match.
+With the in-process catalog snapshot (catalog.py, the default for the
+upload endpoints and the worker) all lookups are dictionary and trigram
+index hits, without ORM objects. Without it, exact and base candidates are
+resolved in bulk (one query per invoice) and leftovers are fuzzy matched
+against the nearest designations found by pg_trgm in PostgreSQL
+(part_search.py), or a trigram index over the loaded parts list
+(fuzzy_matcher.py) on other databases.
+Shared by the upload endpoints and the background parse worker.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.designation import normalize_designation
+from app.db.models import Part
+from app.services.catalog import CatalogSnapshot, part_catalog
+from app.services.fuzzy_matcher import FuzzyMatcher, best_match
+from app.services.part_search import nearest_parts
+from app.services.metrics import INVOICE_MATCH_SECONDS
+from app.schemas.invoice import InvoiceItem, InvoiceUploadResponse
+
+
+# Designations per bulk query (keeps the bound parameter count well below driver limits)
+BULK_CHUNK_SIZE = 1000
+
+
+def base_designation(designation: str) -> Optional[str]:
+    """Base part designation ("R1.003-01" -> "R1.003"), None without a suffix."""
+    if '-' in designation:
+        return designation.rsplit('-', 1)[0]
+    return None
+
+
+async def find_parts_bulk(designations: Iterable[str], db: AsyncSession) -> Dict[str, Part]:
+    """Parts by designation for all `designations`, one query per BULK_CHUNK_SIZE."""
+    wanted = sorted(set(designations))
+    found = {}
+    for start in range(0, len(wanted), BULK_CHUNK_SIZE):
+        chunk = wanted[start:start + BULK_CHUNK_SIZE]
+        result = await db.execute(select(Part).filter(Part.designation.in_(chunk)))
+        for part in result.scalars().all():
+            found.setdefault(part.designation, part)
+    return found
+
+
+async def find_parts_by_norm(keys: Iterable[str], db: AsyncSession) -> Dict[str, Part]:
+    """Parts by normalized designation (first by designation per key), via the designation_norm index."""
+    wanted = sorted(set(keys))
+    found = {}
+    for start in range(0, len(wanted), BULK_CHUNK_SIZE):
+        chunk = wanted[start:start + BULK_CHUNK_SIZE]
+        result = await db.execute(
+            select(Part).filter(Part.designation_norm.in_(chunk)).order_by(Part.designation)
+        )
+        for part in result.scalars().all():
+            found.setdefault(part.designation_norm, part)
+    return found
+
+
+class PartMatcher:
+    """
+    Matches parsed invoice items against the parts table.
+
+    Lookup order per designation: Exact Match -> Base Part -> Normalized
+    Match -> Fuzzy Match. Exact and base candidates of all pending
+    designations are fetched with one bulk query, normalized ones of the
+    rest with one indexed query. Leftovers are matched against KNN candidates from
+    PostgreSQL; elsewhere the full parts list and its trigram index are
+    built only when designations are left over, and at most once per matcher.
+    With a `catalog` snapshot, lookups never query the database.
+    Share a matcher between invoices of one request to reuse its lookups.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        all_parts: Optional[List[Part]] = None,
+        lookups: Optional[Dict] = None,
+        catalog: Optional[CatalogSnapshot] = None
+    ):
+        self.db = db
+        self.all_parts = all_parts
+        self.catalog = catalog
+        # designation -> (part, match_type) or (None, None)
+        self.lookups = {} if lookups is None else lookups
+        self._fuzzy: Optional[FuzzyMatcher] = None
+        self._by_designation: Dict[str, Part] = {}
+
+    async def _fuzzy_matcher(self) -> FuzzyMatcher:
+        """Trigram index over all parts, built on first use."""
+        if self.catalog is not None:
+            self._by_designation = self.catalog.parts
+            return self.catalog.fuzzy
+        if self._fuzzy is None:
+            if self.all_parts is None:
+                self.all_parts = await load_all_parts(self.db)
+            self._by_designation = {}
+            for part in self.all_parts:
+                self._by_designation.setdefault(part.designation, part)
+            self._fuzzy = FuzzyMatcher(self._by_designation)
+        return self._fuzzy
+
+    async def resolve(self, designations: Iterable[str]) -> None:
+        """Look up every designation not resolved yet."""
+        pending = {d for d in designations if d and d not in self.lookups}
+        if not pending:
+            return
+
+        bases = {d: base_designation(d) for d in pending}
+        wanted = pending | {b for b in bases.values() if b}
+        if self.catalog is not None:
+            found = {d: self.catalog.parts[d] for d in wanted if d in self.catalog.parts}
+        else:
+            found = await find_parts_bulk(wanted, self.db)
+
+        unresolved = []
+        for designation in pending:
+            base = bases[designation]
+            if designation in found:
+                self.lookups[designation] = (found[designation], "exact")
+            elif base and base in found:
+                self.lookups[designation] = (found[base], f"base:{base}")
+            else:
+                unresolved.append(designation)
+
+        # Same designation spelled with other case, spaces, dots or dashes
+        keys = {d: normalize_designation(d) for d in unresolved}
+        base_keys = {d: normalize_designation(bases[d] or "") for d in unresolved}
+        normalized = await self._find_normalized({k for k in (*keys.values(), *base_keys.values()) if k})
+
+        leftovers = []
+        for designation in unresolved:
+            key, base_key = keys[designation], base_keys[designation]
+            if key in normalized:
+                part = normalized[key]
+                self.lookups[designation] = (part, f"normalized:{part.designation}")
+            elif base_key in normalized:
+                part = normalized[base_key]
+                self.lookups[designation] = (part, f"base:{part.designation}")
+            else:
+                leftovers.append(designation)
+
+        if leftovers:
+            in_db = self.all_parts is None and self.catalog is None
+            matches = await self._fuzzy_in_db(leftovers) if in_db else None
+            if matches is None:
+                fuzzy = await self._fuzzy_matcher()
+                matches = {
+                    designation: self._by_designation[fuzzy_des] if fuzzy_des else None
+                    for designation, fuzzy_des in fuzzy.best_many(leftovers).items()
+                }
+            for designation, part in matches.items():
+                if part is not None:
+                    self.lookups[designation] = (part, f"fuzzy:{part.designation}")
+                else:
+                    self.lookups[designation] = (None, None)
+
+    async def _find_normalized(self, keys: Set[str]) -> Dict[str, Part]:
+        """Parts by normalized designation key."""
+        if not keys:
+            return {}
+        if self.catalog is not None:
+            found = {key: self.catalog.get_normalized(key) for key in keys}
+            return {key: part for key, part in found.items() if part is not None}
+        return await find_parts_by_norm(keys, self.db)
+
+    async def _fuzzy_in_db(self, designations: List[str]) -> Optional[Dict[str, Optional[Part]]]:
+        """Fuzzy matches scored on pg_trgm KNN candidates, None when unavailable."""
+        candidates = await nearest_parts(self.db, designations)
+        if candidates is None:
+            return None
+        matches = {}
+        for designation in designations:
+            by_designation = {}
+            for part in candidates.get(designation, []):
+                by_designation.setdefault(part.designation, part)
+            fuzzy_des = best_match(designation, by_designation)
+            matches[designation] = by_designation[fuzzy_des] if fuzzy_des else None
+        return matches
+
+    async def match_item(self, item: Dict) -> InvoiceItem:
+        """Build an InvoiceItem for a parsed item and enrich it from the database."""
+        designation = item['designation']
+
+        res_item = InvoiceItem(
+            designation=designation,
+            raw_description=item['raw_description'],
+            parsing_method=item.get('parsing_method'),
+            quantity=item.get('quantity', 1),
+            manufacturer=item.get('manufacturer'),
+            condition=item.get('condition'),
+            image_path=item.get('image_path')
+        )
+
+        # Prioritize invoice material if found
+        if item.get('material'):
+            res_item.material = item['material']
+
+        await self.resolve([designation])
+        found_part, match_type = self.lookups.get(designation, (None, None))
+
+        if found_part:
+            populate_item_from_part(res_item, found_part, match_type)
+
+        return res_item
+
+    async def match_items(self, items: List[Dict]) -> List[InvoiceItem]:
+        """Match several items with one bulk lookup."""
+        await self.resolve(item['designation'] for item in items)
+        return [await self.match_item(item) for item in items]
+
+
+async def create_matcher(db: AsyncSession) -> PartMatcher:
+    """PartMatcher on the current catalog snapshot (CATALOG_SNAPSHOT_ENABLED) or on the database."""
+    if settings.CATALOG_SNAPSHOT_ENABLED:
+        return PartMatcher(db, catalog=await part_catalog.snapshot(db))
+    return PartMatcher(db)
+
+
+async def find_part(
+    designation: str, db: AsyncSession, all_parts: List[Part]
+) -> Tuple[Optional[Part], Optional[str]]:
+    """
+    Find a part by designation using Exact Match -> Base Part -> Normalized Match -> Fuzzy Match strategy.
+
+    Returns: (part, match_type) such as (part, "exact") or (part, "fuzzy:R1.003"),
+    (None, None) when nothing matches.
+    """
+    if not designation:
+        return None, None
+    matcher = PartMatcher(db, all_parts)
+    await matcher.resolve([designation])
+    return matcher.lookups[designation]
+
+
+def populate_item_from_part(item: InvoiceItem, part: Part, match_type: str):
+    """Populate InvoiceItem fields from a Part database object."""
+    item.found_in_db = True
+    item.name = part.name
+    
+    # Only overwrite material if not already present
+    if not item.material:
+        item.material = part.material
+        
+    item.weight = part.weight
+    item.weight_unit = getattr(part, 'weight_unit', None)
+    item.dimensions = part.dimensions
+    item.description = part.description
+    # Only the catalog image: the parser's lookup may have found another part's image
+    item.image_path = part.image_path
+    
+    # Overwrite manufacturer if it's electronics or if not present?
+    # Original logic: "Force overwrite manufacturer from DB ONLY if electronics"
+    # But also: "res_item.manufacturer = base_part.manufacturer" unconditionally in Base/Fuzzy match block in original code.
+    # In Exact match block: only if electronics.
+    # Let's preserve specific behavior:
+    
+    is_electronics = (getattr(part, 'component_type', None) == 'electronics') or \
+                     ('электро' in (item.material or '').lower()) or \
+                     (getattr(part, 'specs', None) is not None)
+                     
+    if is_electronics and part.manufacturer:
+        item.manufacturer = part.manufacturer
+    elif not item.manufacturer:
+        # If not electronics, still useful to set if missing?
+        # Original exact match block didn't set it if not electronics.
+        # But Base/Fuzzy match blocks DID set it unconditionally.
+        # This inconsistency suggests we should probably set it if missing.
+        item.manufacturer = part.manufacturer
+
+    item.condition = part.condition
+    
+    # Electronics fields
+    item.component_type = getattr(part, 'component_type', None)
+    item.specs = getattr(part, 'specs', None)
+    
+    # Legacy fields
+    item.current_type = getattr(part, 'current_type', None)
+    item.input_voltage = getattr(part, 'input_voltage', None)
+    item.input_current = getattr(part, 'input_current', None)
+    item.processor = getattr(part, 'processor', None)
+    item.ram_kb = getattr(part, 'ram_kb', None)
+    item.rom_mb = getattr(part, 'rom_mb', None)
+    item.tnved_code = getattr(part, 'tnved_code', None)
+    item.tnved_description = getattr(part, 'tnved_description', None)
+    
+    # Update description with match info
+    if match_type.startswith("base:"):
+        base_des = match_type.split(":")[1]
+        if not item.description: item.description = ""
+        item.description += f" [Base Match: {base_des}]"
+    elif match_type.startswith("normalized:"):
+        normalized_des = match_type.split(":", 1)[1]
+        if not item.description: item.description = ""
+        item.description += f" [Normalized Match: {normalized_des}]"
+    elif match_type.startswith("fuzzy:"):
+        fuzzy_des = match_type.split(":")[1]
+        if not item.description: item.description = ""
+        item.description += f" [Fuzzy Match: {fuzzy_des}]"
+
+
+async def match_item(item: Dict, db: AsyncSession, all_parts: List[Part], lookups: Dict) -> InvoiceItem:
+    """
+    Build an InvoiceItem for a parsed item and enrich it from the database.
+
+    `lookups` caches part lookups by designation across calls.
+    """
+    return await PartMatcher(db, all_parts, lookups).match_item(item)
+
+
+def dedupe_items(results: List[InvoiceItem]) -> List[InvoiceItem]:
+    """Failsafe deduplication of results by designation (first one wins)."""
+    unique_results = []
+    seen_designations = set()
+    for res in results:
+        if res.designation not in seen_designations:
+            seen_designations.add(res.designation)
+            unique_results.append(res)
+    return unique_results
+
+
+async def load_all_parts(db: AsyncSession) -> List[Part]:
+    """Prefetch all parts for fuzzy matching."""
+    all_parts_result = await db.execute(select(Part))
+    return all_parts_result.scalars().all()
+
+
+async def match_parsed_items(
+    parsed_items: List[Dict],
+    debug_info: Dict,
+    db: AsyncSession,
+    all_parts: Optional[List[Part]] = None,
+    lookups: Optional[Dict] = None,
+    matcher: Optional[PartMatcher] = None
+) -> InvoiceUploadResponse:
+    """
+    Match all parsed items and build the upload response.
+
+    Pass a `matcher` (or `all_parts` and `lookups`) to share the parts list
+    and lookup cache between several invoices.
+    """
+    if matcher is None:
+        if all_parts is None and lookups is None:
+            matcher = await create_matcher(db)
+        else:
+            matcher = PartMatcher(db, all_parts, lookups)
+
+    with INVOICE_MATCH_SECONDS.time():
+        results = await matcher.match_items(parsed_items)
+
+    # Extract metadata from debug_info if available
+    invoice_metadata = debug_info.get("invoice_metadata") if debug_info else None
+
+    results = dedupe_items(results)
+
+    return InvoiceUploadResponse(items=results, debug_info=debug_info, metadata=invoice_metadata)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def merge_items(item_lists: List[List[InvoiceItem]]) -> List[InvoiceItem]:
+    """
+    Merge items of several invoices into one list by designation.
+
+    Quantities of repeated designations are summed when both are numeric;
+    the first occurrence provides all other fields.
+    """
+    merged = {}
+    for items in item_lists:
+        for item in items:
+            existing = merged.get(item.designation)
+            if existing is None:
+                merged[item.designation] = item.model_copy()
+            elif _is_number(existing.quantity) and _is_number(item.quantity):
+                existing.quantity += item.quantity
+    return list(merged.values())
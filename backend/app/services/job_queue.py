@@ -0,0 +1,165 @@
+"""
+Postgres-backed queue for background invoice parsing jobs.
+
+Features:
+- Submit returns immediately with a job id
+- Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number
+  of worker processes can poll the same table without double-processing
+- Heartbeats; jobs of crashed workers are re-queued after JOB_STALE_SECONDS
+- Attempts are capped at JOB_MAX_ATTEMPTS
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+
+from app.core.config import settings
+from app.db.models import ParseJob
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def submit_job(
+    db: AsyncSession,
+    contents: bytes,
+    filename: str,
+    method: str = None,
+    use_cache: bool = True,
+    refresh_cache: bool = False
+) -> ParseJob:
+    """Queue a PDF for parsing."""
+    job = ParseJob(
+        status=JOB_QUEUED,
+        filename=filename,
+        pdf=contents,
+        method=method,
+        use_cache=use_cache,
+        refresh_cache=refresh_cache,
+        progress={"pages_rendered": 0, "pages_parsed": 0, "items": 0},
+        attempts=0,
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    logger.info(f"Queued parse job {job.id} for {filename}")
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: int) -> Optional[ParseJob]:
+    """Get a job without loading the PDF bytes."""
+    result = await db.execute(select(ParseJob).where(ParseJob.id == job_id))
+    return result.scalars().first()
+
+
+def claim_query(now: datetime):
+    """Oldest queued (or stale running) job, skipping rows locked by other workers."""
+    stale_before = now - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    return (
+        select(ParseJob)
+        .options(undefer(ParseJob.pdf))
+        .where(or_(
+            ParseJob.status == JOB_QUEUED,
+            and_(ParseJob.status == JOB_RUNNING, ParseJob.heartbeat_at < stale_before),
+        ))
+        .order_by(ParseJob.created_at, ParseJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+
+
+async def claim_job(db: AsyncSession, worker_id: str) -> Optional[ParseJob]:
+    """
+    Lock and mark the next job as running.
+
+    Returns the job (with its PDF loaded) or None when the queue is empty.
+    Jobs that already used up their attempts are marked failed and skipped.
+    """
+    while True:
+        now = _now()
+        job = (await db.execute(claim_query(now))).scalars().first()
+        if job is None:
+            await db.rollback()
+            return None
+
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            job.status = JOB_FAILED
+            job.error = job.error or f"Gave up after {job.attempts} attempts"
+            job.finished_at = now
+            job.pdf = b""
+            await db.commit()
+            logger.warning(f"Parse job {job.id} failed: {job.error}")
+            continue
+
+        if job.status == JOB_RUNNING:
+            logger.warning(f"Re-queuing stale parse job {job.id} from worker {job.worker_id}")
+        job.status = JOB_RUNNING
+        job.attempts += 1
+        job.worker_id = worker_id
+        job.started_at = now
+        job.heartbeat_at = now
+        await db.commit()
+        return job
+
+
+async def heartbeat(db: AsyncSession, job_id: int, worker_id: str, progress: Dict) -> None:
+    """Record progress and keep the job from being considered stale."""
+    await db.execute(
+        update(ParseJob)
+        .where(ParseJob.id == job_id, ParseJob.worker_id == worker_id, ParseJob.status == JOB_RUNNING)
+        .values(heartbeat_at=_now(), progress=dict(progress))
+    )
+    await db.commit()
+
+
+async def finish_job(
+    db: AsyncSession,
+    job_id: int,
+    worker_id: str,
+    progress: Dict,
+    result: Optional[Dict] = None,
+    error: Optional[str] = None
+) -> None:
+    """Store the result (or error) and release the PDF bytes."""
+    await db.execute(
+        update(ParseJob)
+        .where(ParseJob.id == job_id, ParseJob.worker_id == worker_id)
+        .values(
+            status=JOB_FAILED if error else JOB_DONE,
+            result=result,
+            error=error,
+            progress=dict(progress),
+            finished_at=_now(),
+            pdf=b"",
+        )
+    )
+    await db.commit()
+
+
+async def retry_job(db: AsyncSession, job_id: int, worker_id: str, error: str) -> None:
+    """Put a job back in the queue after a failed attempt."""
+    await db.execute(
+        update(ParseJob)
+        .where(ParseJob.id == job_id, ParseJob.worker_id == worker_id)
+        .values(status=JOB_QUEUED, error=error, worker_id=None, heartbeat_at=None)
+    )
+    await db.commit()
+
+
+async def queue_stats(db: AsyncSession) -> Dict[str, int]:
+    """Number of jobs per status."""
+    from sqlalchemy import func
+
+    result = await db.execute(select(ParseJob.status, func.count()).group_by(ParseJob.status))
+    return {status: count for status, count in result.all()}
@@ -0,0 +1,319 @@
+"""
+Rate-limit-aware API key scheduler for Groq.
+
+Features:
+- Per-key token buckets (requests per minute)
+- Cooldowns from 429 responses and Retry-After / x-ratelimit-reset headers
+- Failure tracking (invalid keys are parked for a long time)
+- Process-wide singleton, optionally sharing cooldowns between workers
+  through a small JSON state file
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-worker locking
+    fcntl = None
+
+# Groq API Keys (with rotation)
+DEFAULT_GROQ_API_KEYS = [
+    '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',
+    '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',
+    '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',
+    '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',
+    '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',
+    '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',
+    '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',
+    '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',
+    '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',
+    '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',
+    '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',
+    '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',
+    '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',
+    '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'
+]
+
+# Cooldowns (seconds)
+DEFAULT_RATE_LIMIT_COOLDOWN = 10   # 429 without usable headers (doubles on repeats)
+MAX_RATE_LIMIT_COOLDOWN = 120
+SERVER_ERROR_COOLDOWN = 2          # 5xx / timeouts
+INVALID_KEY_COOLDOWN = 600         # 401 / 403
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """
+    Extract a cooldown in seconds from rate limit response headers.
+
+    Supports `Retry-After: 7` and Groq's `x-ratelimit-reset-requests: 2m59.56s`.
+    """
+    if not headers:
+        return None
+
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+    value = headers.get("x-ratelimit-reset-requests") or headers.get("x-ratelimit-reset-tokens")
+    if value:
+        match = re.fullmatch(r"(?:(\d+)h)?(?:(\d+)m(?!s))?(?:([\d.]+)s)?(?:([\d.]+)ms)?", value.strip())
+        if match and any(match.groups()):
+            hours, minutes, seconds, millis = match.groups()
+            return (
+                int(hours or 0) * 3600
+                + int(minutes or 0) * 60
+                + float(seconds or 0)
+                + float(millis or 0) / 1000
+            )
+    return None
+
+
+class _KeyState:
+    """Scheduling state for a single API key."""
+
+    def __init__(self, key: str, capacity: float):
+        self.key = key
+        self.fingerprint = hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+        self.tokens = capacity
+        self.refilled_at = time.monotonic()
+        self.cooldown_until = 0.0       # time.time() based, shareable between processes
+        self.rate_limit_streak = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.successes = 0
+        self.last_used = 0.0
+
+
+class KeyPool:
+    """
+    Hands out the API key most likely to succeed immediately.
+
+    Usage:
+        key_idx, wait = key_pool.acquire()
+        time.sleep(wait)
+        ... call the API with key_pool.keys[key_idx] ...
+        key_pool.release(key_idx, "success")
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        requests_per_minute: int = 30,
+        state_file: Optional[str] = None
+    ):
+        self.requests_per_minute = max(1, requests_per_minute)
+        self.capacity = float(self.requests_per_minute)
+        self._states = [_KeyState(key, self.capacity) for key in keys]
+        self._lock = threading.Lock()
+        self._state_file = state_file
+        self._state_mtime = 0.0
+
+    @property
+    def keys(self) -> List[str]:
+        return [state.key for state in self._states]
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _refill(self, state: _KeyState, now: float) -> None:
+        elapsed = now - state.refilled_at
+        state.tokens = min(self.capacity, state.tokens + elapsed * self.requests_per_minute / 60.0)
+        state.refilled_at = now
+
+    def _available_in(self, state: _KeyState, now: float, wall_now: float) -> float:
+        """Seconds until the key can be used without being throttled."""
+        wait = max(0.0, state.cooldown_until - wall_now)
+        if state.tokens < 1:
+            wait = max(wait, (1 - state.tokens) * 60.0 / self.requests_per_minute)
+        return wait
+
+    def acquire(self, exclude: Iterable[int] = ()) -> Tuple[Optional[int], float]:
+        """
+        Reserve the best key.
+
+        Returns (key_idx, wait_seconds). The caller should sleep `wait_seconds`
+        before using the key. key_idx is None when every key is excluded.
+        """
+        excluded = set(exclude)
+        self._load_shared_state()
+
+        with self._lock:
+            now = time.monotonic()
+            wall_now = time.time()
+            best = None
+            best_rank = None
+            for idx, state in enumerate(self._states):
+                if idx in excluded:
+                    continue
+                self._refill(state, now)
+                rank = (
+                    self._available_in(state, now, wall_now),
+                    state.in_flight,
+                    state.failures,
+                    state.last_used,
+                )
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = idx, rank
+
+            if best is None:
+                return None, 0.0
+
+            state = self._states[best]
+            wait = best_rank[0]
+            # Tokens may go negative: that is a reservation for a future slot
+            state.tokens -= 1
+            state.in_flight += 1
+            state.last_used = now
+            return best, wait
+
+    def release(self, key_idx: int, status: str, retry_after: Optional[float] = None) -> None:
+        """
+        Report the outcome of a request made with `key_idx`.
+
+        status: 'success', 'rate_limit', 'server_error', 'timeout', 'invalid', 'error',
+        'skipped' (key was not used) or 'cancelled' (caller gave up mid-request)
+        """
+        cooldown = None
+        with self._lock:
+            state = self._states[key_idx]
+            state.in_flight = max(0, state.in_flight - 1)
+            wall_now = time.time()
+
+            if status == "success":
+                state.successes += 1
+                state.failures = 0
+                state.rate_limit_streak = 0
+            elif status == "rate_limit":
+                state.rate_limit_streak += 1
+                if retry_after is None:
+                    retry_after = min(
+                        MAX_RATE_LIMIT_COOLDOWN,
+                        DEFAULT_RATE_LIMIT_COOLDOWN * 2 ** (state.rate_limit_streak - 1)
+                    )
+                cooldown = wall_now + retry_after
+                state.cooldown_until = max(state.cooldown_until, cooldown)
+                # The bucket is evidently empty on the server side
+                state.tokens = min(state.tokens, 0.0)
+            elif status in ("skipped", "cancelled"):
+                # Not the key's fault: no cooldown or failure
+                if status == "skipped":
+                    state.tokens = min(self.capacity, state.tokens + 1)
+            elif status == "invalid":
+                state.failures += 1
+                cooldown = wall_now + INVALID_KEY_COOLDOWN
+                state.cooldown_until = max(state.cooldown_until, cooldown)
+            else:
+                state.failures += 1
+                state.cooldown_until = max(state.cooldown_until, wall_now + SERVER_ERROR_COOLDOWN)
+
+        if cooldown is not None:
+            self._save_shared_cooldown(state.fingerprint, state.cooldown_until)
+
+    def healthy_count(self) -> int:
+        """Number of keys that are not cooling down right now."""
+        self._load_shared_state()
+        wall_now = time.time()
+        with self._lock:
+            return sum(1 for state in self._states if state.cooldown_until <= wall_now)
+
+    # --- Cross-worker sharing -------------------------------------------------
+
+    def _load_shared_state(self) -> None:
+        """Merge cooldowns written by other workers (only when the file changed)."""
+        if not self._state_file:
+            return
+        try:
+            mtime = os.path.getmtime(self._state_file)
+        except OSError:
+            return
+        if mtime == self._state_mtime:
+            return
+
+        shared = self._read_state_file()
+        with self._lock:
+            self._state_mtime = mtime
+            for state in self._states:
+                until = shared.get(state.fingerprint, 0.0)
+                if until > state.cooldown_until:
+                    state.cooldown_until = until
+
+    def _read_state_file(self) -> Dict[str, float]:
+        try:
+            with open(self._state_file, "r", encoding="utf-8") as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_SH)
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_shared_cooldown(self, fingerprint: str, until: float) -> None:
+        """Record a cooldown so other workers skip the key too. Best effort."""
+        if not self._state_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self._state_file)), exist_ok=True)
+            with open(self._state_file, "a+", encoding="utf-8") as f:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                try:
+                    shared = json.loads(f.read() or "{}")
+                except ValueError:
+                    shared = {}
+                wall_now = time.time()
+                shared = {fp: t for fp, t in shared.items() if t > wall_now}
+                shared[fingerprint] = max(until, shared.get(fingerprint, 0.0))
+                f.seek(0)
+                f.truncate()
+                json.dump(shared, f)
+        except OSError as e:
+            logger.warning(f"Could not write key pool state file {self._state_file}: {e}")
+
+    @property
+    def stats(self) -> List[dict]:
+        """Per-key statistics (keys are shown by their last 4 characters)."""
+        wall_now = time.time()
+        with self._lock:
+            return [
+                {
+                    "key": state.key[-4:],
+                    "tokens": round(state.tokens, 2),
+                    "cooldown_seconds": round(max(0.0, state.cooldown_until - wall_now), 1),
+                    "in_flight": state.in_flight,
+                    "failures": state.failures,
+                    "successes": state.successes,
+                }
+                for state in self._states
+            ]
+
+
+def _configured_keys() -> List[str]:
+    """Env keys first (GROQ_API_KEY, then GROQ_API_KEYS), followed by the built-in list."""
+    keys = []
+    if settings.GROQ_API_KEY:
+        keys.append(settings.GROQ_API_KEY)
+    if settings.GROQ_API_KEYS:
+        keys.extend(k.strip() for k in settings.GROQ_API_KEYS.split(",") if k.strip())
+    keys.extend(DEFAULT_GROQ_API_KEYS)
+    # Deduplicate while keeping order
+    return list(dict.fromkeys(keys))
+
+
+key_pool = KeyPool(
+    _configured_keys(),
+    requests_per_minute=settings.GROQ_KEY_RPM,
+    state_file=settings.KEY_POOL_STATE_FILE,
+)
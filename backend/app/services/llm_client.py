@@ -0,0 +1,150 @@
+"""
+Async HTTP client for LLM chat completion APIs (Groq, OpenAI-compatible).
+
+Features:
+- One long-lived httpx.AsyncClient per event loop (keep-alive connection pool,
+  no TCP/TLS handshake per request)
+- Optional HTTP/2 (needs the `h2` package)
+- Cancellation-safe: cancelling the awaiting task aborts the request
+"""
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class LLMClient:
+    """
+    Pooled async client for chat completion requests.
+
+    Usage:
+        response = await llm_client.chat_completion(api_key, payload)
+        if response.status_code == 200:
+            data = response.json()
+    """
+
+    def __init__(
+        self,
+        base_url: str = GROQ_BASE_URL,
+        timeout: float = 60,
+        max_connections: int = 20,
+        http2: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 10))
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60,
+        )
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 requested for the LLM client but 'h2' is not installed, using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.requests = 0
+        self.errors = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the pooled client for the running event loop.
+
+        Connections are bound to the loop that opened them, so a new client is
+        created when called from another loop (e.g. asyncio.run in scripts);
+        the previous one is closed on its own loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            if self._client is not None and not self._client.is_closed:
+                self._close_stale(self._client, self._loop)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self._transport,
+            )
+            self._loop = loop
+        return self._client
+
+    @staticmethod
+    def _close_stale(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """
+        Close a client replaced by _get_client() on the loop that owns its connections.
+
+        That is only possible while the loop still runs (e.g. in another
+        thread); code that ends its loop (asyncio.run wrappers) must await
+        aclose() before returning, otherwise the pool's sockets leak.
+        """
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        else:
+            logger.warning("LLM client of a finished event loop replaced without aclose(), its connections leak")
+
+    async def chat_completion(
+        self,
+        api_key: str,
+        payload: Dict,
+        timeout: Optional[float] = None
+    ) -> httpx.Response:
+        """
+        POST /chat/completions and return the raw response.
+
+        Raises httpx.TimeoutException / httpx.HTTPError on transport errors;
+        HTTP error statuses are returned, not raised.
+        """
+        client = self._get_client()
+        self.requests += 1
+        try:
+            return await client.post(
+                "/chat/completions",
+                headers={"Authorization": f"Bearer {api_key}"},
+                json=payload,
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            )
+        except httpx.HTTPError:
+            self.errors += 1
+            raise
+
+    async def aclose(self) -> None:
+        """Close pooled connections (call on application shutdown)."""
+        client, self._client, self._loop = self._client, None, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+    @property
+    def stats(self) -> dict:
+        """Get client statistics."""
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+llm_client = LLMClient(
+    base_url=settings.GROQ_BASE_URL,
+    timeout=settings.LLM_TIMEOUT,
+    max_connections=settings.LLM_MAX_CONNECTIONS,
+    http2=settings.LLM_HTTP2,
+)
@@ -0,0 +1,238 @@
+"""
+In-process metrics for the invoice pipeline, exposed in Prometheus text format.
+
+Counters, gauges and histograms with labels, without extra dependencies.
+All pipeline metrics are defined here so names and labels stay consistent:
+
+    from app.services.metrics import PAGE_RENDER_SECONDS
+    with PAGE_RENDER_SECONDS.time():
+        ...
+    LLM_TOKENS_TOTAL.inc(1234, model="llama")
+
+Scrape: GET /api/metrics
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; covers fast local steps (encode, match) up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base class: a named metric family with fixed label names."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (cumulative buckets, sum and count)."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the `with` block (also when it raises)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        lines = self.header()
+        for key, state in values:
+            for bound, bucket_count in zip(self.buckets, state):
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families and scrape-time collectors."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Run `collector` before every scrape (e.g. to set gauges from pool status)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format."""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                pass  # A broken collector must not break the scrape
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Invoice parsing
+PAGE_RENDER_SECONDS = registry.histogram(
+    "invoice_page_render_seconds", "Time to render one PDF page to a bitmap")
+PAGE_ENCODE_SECONDS = registry.histogram(
+    "invoice_page_encode_seconds", "Time to optimize and base64-encode one page image")
+INVOICE_PARSE_SECONDS = registry.histogram(
+    "invoice_parse_seconds", "Total parse_invoice time per PDF", ["cache"])
+PAGES_TOTAL = registry.counter(
+    "invoice_pages_total", "Pages processed by source (llm, cache, text_layer, skipped)", ["source"])
+PAGE_LAYOUT_SAVED_BYTES = registry.counter(
+    "invoice_page_layout_saved_bytes_total", "JPEG bytes saved by cropping pages to the item table (estimated from the kept area)")
+
+# LLM calls
+LLM_REQUEST_SECONDS = registry.histogram(
+    "llm_request_seconds", "Chat completion request latency", ["model", "key", "status"])
+LLM_RETRIES_TOTAL = registry.counter(
+    "llm_retries_total", "Failed LLM attempts that were retried or moved to another key/model", ["model", "reason"])
+LLM_RATE_LIMITED_TOTAL = registry.counter(
+    "llm_rate_limited_total", "429 responses per key", ["key"])
+LLM_TOKENS_TOTAL = registry.counter(
+    "llm_tokens_total", "Tokens reported by the LLM API", ["model"])
+LLM_BATCHES_TOTAL = registry.counter(
+    "llm_batches_total", "Multi-page requests by outcome (ok, fallback to single pages)", ["outcome"])
+HEDGE_REQUESTS_TOTAL = registry.counter(
+    "llm_hedge_requests_total", "Hedged page requests (won, lost, failed, budget_exhausted)", ["outcome"])
+
+# Matching and document generation
+INVOICE_MATCH_SECONDS = registry.histogram(
+    "invoice_match_seconds", "Time to match parsed items against the parts database")
+CATALOG_RELOADS_TOTAL = registry.counter(
+    "catalog_reloads_total", "Parts catalog snapshot loads from the database")
+CATALOG_PARTS = registry.gauge(
+    "catalog_parts", "Parts in the in-process catalog snapshot")
+DOCX_GENERATE_SECONDS = registry.histogram(
+    "docx_generate_seconds", "Time to generate one DOCX document", ["document"])
+
+# Storage and database
+S3_CACHE_REQUESTS_TOTAL = registry.counter(
+    "s3_cache_requests_total", "S3 image reads by in-memory cache result", ["result"])
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_wait_seconds", "Time to get a connection from the database pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+DB_POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections", "Database pool connections by state", ["state"])
+
+
+def key_label(api_key: Optional[str]) -> str:
+    """Metric label for an API key (last 4 characters, never the full key)."""
+    return api_key[-4:] if api_key else "none"
@@ -0,0 +1,115 @@
+"""
+Cheap local classification of invoice pages before the vision model.
+
+Many supplier invoices have pages without line items (bank details,
+packing terms, signature pages). Sending them to the LLM costs a full
+request just to get "items": []. This module decides locally:
+
+- Text layer: item table keywords vs bank/terms keywords, item-like rows
+- Bitmap (scanned pages): ruling lines of tables; only blank pages are skipped
+
+Rules are conservative: a page is only skipped when there is positive
+evidence that it has no items; anything uncertain is sent to the LLM.
+"""
+import re
+from typing import Optional, Tuple
+
+from PIL import Image
+
+# Bump when the rules change (part of the parse cache version)
+PAGE_CLASSIFIER_VERSION = 2
+
+# Item table headers (lowercase)
+ITEM_KEYWORDS = re.compile(
+    r"\b(qty|q'ty|quantity|pcs|unit price|amount|part no|part number|p/n|item no|model|"
+    r"кол-во|количество|цена|сумма|наименование|обозначение)\b",
+    re.IGNORECASE
+)
+# Typical contents of pages without items
+NON_ITEM_KEYWORDS = re.compile(
+    r"\b(bank|swift|beneficiary|iban|account no|payment terms|terms and conditions|packing|"
+    r"shipping marks|signature|stamp|remarks|банк|реквизиты|подпись)\b",
+    re.IGNORECASE
+)
+# A code-like token (digits plus . - /) followed by a number on the same line: "R1.003 Bushing 10"
+ITEM_ROW_PATTERN = re.compile(r"\b[A-Za-z]*\d+\w*[.\-/]\w+\b.*\s\d+(?:[.,]\d+)?\b")
+
+# Bitmap analysis (on a downscaled grayscale copy)
+ANALYSIS_WIDTH = 600
+DARK_THRESHOLD = 160  # Pixels darker than this are ink
+LINE_FILL = 0.6  # Share of dark pixels for a row/column to count as a ruling line
+MIN_TABLE_LINES = 3  # Horizontal ruling lines that indicate a table
+MAX_SKIP_INK = 0.002  # Pages without table lines are skipped only when (nearly) blank
+
+
+def classify_text(text: str) -> Tuple[Optional[bool], str]:
+    """
+    Classify a page by its text layer.
+
+    Returns (has_items, reason); has_items is None when the text is not conclusive.
+    """
+    if ITEM_KEYWORDS.search(text):
+        return True, "text: item table keywords"
+    if any(ITEM_ROW_PATTERN.search(line) for line in text.splitlines()):
+        return True, "text: item-like rows"
+    match = NON_ITEM_KEYWORDS.search(text)
+    if match:
+        return False, f"text: '{match.group(0).lower()}' without item rows"
+    return None, "text: inconclusive"
+
+
+def _count_lines(profile: list) -> int:
+    """Count runs of consecutive True values (a thick line is one line)."""
+    count = 0
+    previous = False
+    for value in profile:
+        if value and not previous:
+            count += 1
+        previous = value
+    return count
+
+
+def ink_mask(image: Image.Image) -> Image.Image:
+    """Downscaled (ANALYSIS_WIDTH) grayscale mask of the page: 255 for ink, 0 for background."""
+    gray = image.convert("L")
+    if gray.width > ANALYSIS_WIDTH:
+        ratio = ANALYSIS_WIDTH / gray.width
+        gray = gray.resize((ANALYSIS_WIDTH, max(1, int(gray.height * ratio))), Image.Resampling.BOX)
+    return gray.point(lambda p: 255 if p < DARK_THRESHOLD else 0)
+
+
+def analyze_bitmap(image: Image.Image) -> dict:
+    """
+    Measure ruling lines and ink density of a rendered page.
+
+    Uses box-filter resizing to get per-row/per-column dark pixel shares,
+    which is fast and needs nothing beyond Pillow.
+    """
+    mask = ink_mask(image)
+    width, height = mask.size
+
+    rows = mask.resize((1, height), Image.Resampling.BOX).getdata()
+    columns = mask.resize((width, 1), Image.Resampling.BOX).getdata()
+    ink = sum(rows) / (255.0 * height)
+
+    return {
+        "horizontal_lines": _count_lines([value / 255.0 >= LINE_FILL for value in rows]),
+        "vertical_lines": _count_lines([value / 255.0 >= LINE_FILL for value in columns]),
+        "ink": round(ink, 4),
+    }
+
+
+def classify_bitmap(image: Image.Image) -> Tuple[Optional[bool], str]:
+    """
+    Classify a rendered page without a text layer.
+
+    Returns (has_items, reason); has_items is None when not conclusive.
+    Little ink is no proof of an item-free page (borderless tables, light
+    print), so only nearly blank pages are skipped.
+    """
+    stats = analyze_bitmap(image)
+    if stats["horizontal_lines"] >= MIN_TABLE_LINES:
+        return True, f"bitmap: {stats['horizontal_lines']} ruling lines"
+    if stats["ink"] < MAX_SKIP_INK:
+        return False, f"bitmap: blank, ink {stats['ink']:.2%}"
+    return None, "bitmap: inconclusive"
@@ -0,0 +1,137 @@
+"""
+Layout analysis: crop rendered pages to the line-item table before the LLM.
+
+Letterheads, logos, stamps and footers cost payload bytes and tokens but
+carry no items. This module finds the item table:
+
+- Text layer: table bounding boxes found by pdfplumber
+- Bitmap (scanned pages): the span of horizontal ruling lines
+
+and crops the page to it. The first page keeps everything above the table:
+the letterhead and the blocks below it carry the supplier, invoice number,
+date and contract.
+When no table is found, or the crop would save little, the full page is used.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from app.services.page_classifier import LINE_FILL, MIN_TABLE_LINES, ink_mask
+
+# Bump when the rules change (part of the parse cache version)
+PAGE_LAYOUT_VERSION = 2
+
+INK_ROW = 0.002  # Share of ink for a row to count as non-blank
+TABLE_GAP = 0.03  # Blank band (share of page height) that ends the table
+PADDING = 0.02  # Padding around the crop, as a share of the page width
+MAX_CROP_AREA = 0.85  # Crops larger than this share of the page are not worth it
+
+Box = Tuple[int, int, int, int]
+
+
+def _runs(flags: Sequence[bool]) -> List[Tuple[int, int]]:
+    """(start, end) of runs of consecutive True values, end exclusive."""
+    runs = []
+    start = None
+    for index, flag in enumerate(flags):
+        if flag and start is None:
+            start = index
+        elif not flag and start is not None:
+            runs.append((start, index))
+            start = None
+    if start is not None:
+        runs.append((start, len(flags)))
+    return runs
+
+
+def _extend_below(rows: Sequence[float], bottom: int, gap: int) -> int:
+    """Follow ink rows below the last ruling line (open tables, totals) until a blank band."""
+    blank = 0
+    end = bottom
+    for index in range(bottom, len(rows)):
+        if rows[index] >= INK_ROW:
+            blank = 0
+            end = index + 1
+        else:
+            blank += 1
+            if blank >= gap:
+                break
+    return end
+
+
+def find_item_region(
+    image: Image.Image,
+    tables: Optional[List[Sequence[float]]] = None,
+    keep_header: bool = False
+) -> Tuple[Optional[Box], str]:
+    """
+    Locate the item table (and optionally everything above it) in pixels.
+
+    Args:
+        image: Rendered page
+        tables: Table bounding boxes (x0, top, x1, bottom) in pixels from the
+            text layer; ruling-line detection is used when empty
+        keep_header: Also keep the page above the table (first page metadata)
+
+    Returns: (box or None, source) where source is "text_layer", "ruling_lines"
+    or the reason no region was found.
+    """
+    width, height = image.size
+    mask = ink_mask(image)
+    x_scale, y_scale = width / mask.width, height / mask.height
+    rows = [value / 255.0 for value in mask.resize((1, mask.height), Image.Resampling.BOX).getdata()]
+    gap = max(1, int(TABLE_GAP * mask.height))
+
+    # Work in mask coordinates
+    if tables:
+        source = "text_layer"
+        table_top = int(min(table[1] for table in tables) / y_scale)
+        table_bottom = int(max(table[3] for table in tables) / y_scale) + 1
+    else:
+        source = "ruling_lines"
+        lines = _runs([share >= LINE_FILL for share in rows])
+        if len(lines) < MIN_TABLE_LINES:
+            return None, "no table lines"
+        table_top = lines[0][0]
+        table_bottom = _extend_below(rows, lines[-1][1], gap)
+
+    top = 0 if keep_header else table_top
+    bbox = mask.crop((0, top, mask.width, max(top + 1, table_bottom))).getbbox()
+    if not bbox and not tables:
+        return None, "empty region"
+
+    left, right = (bbox[0] * x_scale, bbox[2] * x_scale) if bbox else (width, 0)
+    if tables:
+        left = min(left, min(table[0] for table in tables))
+        right = max(right, max(table[2] for table in tables))
+
+    padding = PADDING * width
+    box = (
+        max(0, int(left - padding)),
+        max(0, int(top * y_scale - padding)),
+        min(width, int(right + padding)),
+        min(height, int(table_bottom * y_scale + padding)),
+    )
+    return box, source
+
+
+def crop_to_items(
+    image: Image.Image,
+    tables: Optional[List[Sequence[float]]] = None,
+    keep_header: bool = False
+) -> Tuple[Image.Image, Dict]:
+    """
+    Crop a rendered page to its item region, or return it unchanged.
+
+    Returns: (image, info) where info has "cropped", "source" and, for crops,
+    "box" and "area" (share of the page that is kept).
+    """
+    box, source = find_item_region(image, tables, keep_header)
+    if box is None:
+        return image, {"cropped": False, "source": source}
+
+    width, height = image.size
+    area = (box[2] - box[0]) * (box[3] - box[1]) / float(width * height)
+    if area > MAX_CROP_AREA:
+        return image, {"cropped": False, "source": source, "area": round(area, 3)}
+    return image.crop(box), {"cropped": True, "source": source, "box": list(box), "area": round(area, 3)}
@@ -0,0 +1,152 @@
+"""
+Payload optimizer for page images sent to vision models.
+
+Shrinks rendered invoice pages before they are base64-encoded:
+- Trim white margins
+- Convert to grayscale
+- Downscale to a target long edge
+- Pick the highest JPEG quality that fits a byte budget
+
+Defaults reproduce the previous behaviour (full-size RGB JPEG at quality 75);
+use tools/benchmark_payload.py to choose settings with data.
+"""
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+# Qualities tried (in order) when a byte budget is set
+QUALITY_STEPS = [85, 75, 65, 55, 45, 35]
+# Pixels lighter than this count as background when trimming
+TRIM_THRESHOLD = 245
+TRIM_PADDING = 16
+# Never downscale below this long edge while chasing a byte budget
+MIN_LONG_EDGE = 800
+
+
+class PayloadOptions:
+    """Settings for optimize_page. Zero/False disables a stage."""
+
+    def __init__(
+        self,
+        max_long_edge: int = 0,
+        grayscale: bool = False,
+        trim_margins: bool = False,
+        byte_budget: int = 0,
+        quality: int = 75
+    ):
+        self.max_long_edge = max_long_edge
+        self.grayscale = grayscale
+        self.trim_margins = trim_margins
+        self.byte_budget = byte_budget
+        self.quality = quality
+
+    @classmethod
+    def from_settings(cls) -> "PayloadOptions":
+        return cls(
+            max_long_edge=settings.PAGE_MAX_LONG_EDGE,
+            grayscale=settings.PAGE_GRAYSCALE,
+            trim_margins=settings.PAGE_TRIM_MARGINS,
+            byte_budget=settings.PAGE_BYTE_BUDGET_KB * 1024,
+            quality=settings.PAGE_JPEG_QUALITY,
+        )
+
+    def as_dict(self) -> Dict:
+        return {
+            "max_long_edge": self.max_long_edge,
+            "grayscale": self.grayscale,
+            "trim_margins": self.trim_margins,
+            "byte_budget": self.byte_budget,
+            "quality": self.quality,
+        }
+
+    def __repr__(self) -> str:
+        return f"PayloadOptions({self.as_dict()})"
+
+
+def trim_margins(image: Image.Image, threshold: int = TRIM_THRESHOLD, padding: int = TRIM_PADDING) -> Image.Image:
+    """Crop away uniform white borders, keeping a small padding."""
+    gray = image.convert("L")
+    # Non-background pixels become white in the mask
+    mask = gray.point(lambda p: 255 if p < threshold else 0)
+    bbox = mask.getbbox()
+    if not bbox:
+        return image  # Blank page, nothing to trim
+
+    left, top, right, bottom = bbox
+    width, height = image.size
+    box = (
+        max(0, left - padding),
+        max(0, top - padding),
+        min(width, right + padding),
+        min(height, bottom + padding),
+    )
+    if box == (0, 0, width, height):
+        return image
+    return image.crop(box)
+
+
+def _downscale(image: Image.Image, long_edge: int) -> Image.Image:
+    width, height = image.size
+    if max(width, height) <= long_edge:
+        return image
+    ratio = long_edge / max(width, height)
+    new_size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+    return image.resize(new_size, Image.Resampling.LANCZOS)
+
+
+def _save_jpeg(image: Image.Image, quality: int) -> bytes:
+    buffered = BytesIO()
+    image.save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+def optimize_page(image: Image.Image, options: Optional[PayloadOptions] = None) -> Tuple[bytes, Dict]:
+    """
+    Encode a rendered page as JPEG according to `options`.
+
+    Returns:
+        Tuple of (JPEG bytes, info dict with the settings that were applied)
+    """
+    options = options or PayloadOptions()
+    original_size = image.size
+
+    trimmed = False
+    if options.trim_margins:
+        image = trim_margins(image)
+        trimmed = image.size != original_size
+
+    if options.grayscale:
+        image = ImageOps.grayscale(image)
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    if options.max_long_edge:
+        image = _downscale(image, options.max_long_edge)
+
+    quality = options.quality
+    data = _save_jpeg(image, quality)
+
+    # Lower quality first, then shrink the image until the budget is met
+    while options.byte_budget and len(data) > options.byte_budget:
+        lower = [q for q in QUALITY_STEPS if q < quality]
+        if lower:
+            quality = lower[0]
+        elif max(image.size) * 0.8 >= MIN_LONG_EDGE:
+            image = _downscale(image, int(max(image.size) * 0.8))
+            quality = options.quality
+        else:
+            break  # Give up, send the smallest we have
+        data = _save_jpeg(image, quality)
+
+    info = {
+        "original_size": list(original_size),
+        "size": list(image.size),
+        "grayscale": image.mode == "L",
+        "trimmed": trimmed,
+        "quality": quality,
+        "bytes": len(data),
+    }
+    return data, info
@@ -0,0 +1,172 @@
+"""
+Persistent caches for invoice parsing results (whole files and single pages).
+
+Features:
+- Content-addressed keys (SHA-256 of the input plus a prompt/model version)
+- JSON files on local disk, shared by all workers in a container
+- Size-based LRU eviction (least recently read files are removed first)
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, ".cache")
+
+
+def content_key(data: bytes, version: str) -> str:
+    """Build a cache key from raw content and a version string."""
+    digest = hashlib.sha256(data)
+    digest.update(version.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """JSON key/value store on disk with size-based LRU eviction."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a value by key, or None if missing or unreadable."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self.invalidate(key)
+            self.misses += 1
+            return None
+
+        # Touch the file so eviction keeps recently used entries
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a JSON-serializable value, evicting old entries if over budget."""
+        path = self._path(key)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            logger.warning(f"Cache entry {key[:12]} is larger than the cache, not storing")
+            return
+
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+
+            # Write atomically so concurrent readers never see partial files
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - old_size
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def invalidate(self, key: str) -> None:
+        """Remove a single entry."""
+        path = self._path(key)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            for path, _, _ in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every entry on disk."""
+        if not os.path.isdir(self.directory):
+            return
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under 90% of the budget."""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        logger.info(f"Evicted {removed} entries from {self.directory}")
+
+    @property
+    def stats(self) -> dict:
+        """Get cache statistics."""
+        return {
+            "directory": self.directory,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+parse_cache = DiskCache(
+    os.path.join(settings.PARSE_CACHE_DIR or DEFAULT_CACHE_DIR, "invoices"),
+    max_bytes=settings.PARSE_CACHE_MAX_MB * 1024 * 1024,
+)
+
+page_cache = DiskCache(
+    os.path.join(settings.PARSE_CACHE_DIR or DEFAULT_CACHE_DIR, "pages"),
+    max_bytes=settings.PAGE_CACHE_MAX_MB * 1024 * 1024,
+)
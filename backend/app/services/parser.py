@@ -1,93 +1,130 @@
 """
 Invoice PDF Parser - Groq Multi-Key Implementation
 Parses PDF invoices using Groq AI with key rotation and model fallback.
+Pages with a usable text layer are read locally with pdfplumber first.
+
+LLM requests run on the event loop through the pooled async client;
+rendering and other blocking work is offloaded to worker threads.
 """
+import asyncio
 import json
-import os
-import re
-from datetime import datetime
-from typing import Dict, List, Tuple
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
+import httpx
 import pypdfium2 as pdfium
 from PIL import Image
 
 from app.core.config import settings
+from app.services.dates import normalize_date
+from app.services.hedging import hedge_budget, hedge_delay, page_latency, run_hedged
+from app.services.key_pool import KeyPool, key_pool, parse_retry_after
+from app.services.llm_client import LLMClient, llm_client
+from app.services.metrics import (
+    INVOICE_PARSE_SECONDS,
+    LLM_BATCHES_TOTAL,
+    LLM_RATE_LIMITED_TOTAL,
+    LLM_REQUEST_SECONDS,
+    LLM_RETRIES_TOTAL,
+    LLM_TOKENS_TOTAL,
+    PAGE_ENCODE_SECONDS,
+    PAGE_LAYOUT_SAVED_BYTES,
+    PAGE_RENDER_SECONDS,
+    PAGES_TOTAL,
+    key_label,
+)
+from app.services.page_classifier import PAGE_CLASSIFIER_VERSION, classify_bitmap, classify_text
+from app.services.page_layout import PAGE_LAYOUT_VERSION, crop_to_items
+from app.services.page_optimizer import PayloadOptions, optimize_page
+from app.services.text_extractor import METADATA_FIELDS, TEXT_EXTRACTOR_VERSION, TextLayerExtractor
+
 
+# pdfium is not thread-safe: serialize all calls into it across requests
+_PDFIUM_LOCK = threading.Lock()
 
-def normalize_date(date_str: str) -> str:
+
+def _iter_pages(
+    pdf_path: str,
+    scale: float = 2,
+    wants_render: Callable[[int], bool] = None
+) -> Iterator[Tuple[int, Image.Image]]:
     """
-    Normalizes a date string to DD.MM.YYYY format.
-    Supports formats like:
-    - YYYY-MM-DD
-    - DD.MM.YYYY
-    - Oct.16th, 2023
-    - 2025-Oct-24
+    Render PDF pages to PIL images one at a time.
+
+    Yields (page_index, image). Only the page being rendered is held by
+    pdfium, so memory does not grow with the page count. Pages for which
+    `wants_render(page_index)` returns False are skipped without rendering.
     """
-    if not date_str:
-        return ""
-
-    date_str = date_str.strip()
-
-    # Pre-processing: remove "th", "st", "nd", "rd" suffixes after digits
-    clean_str = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str)
-
-    formats = [
-        "%Y-%m-%d",       # 2025-10-24
-        "%d.%m.%Y",       # 24.10.2025
-        "%Y/%m/%d",       # 2025/10/24
-        "%d/%m/%Y",       # 24/10/2025
-        "%b.%d, %Y",      # Oct.16, 2023
-        "%B %d, %Y",      # October 16, 2023
-        "%d-%b-%Y",       # 24-Oct-2025
-        "%Y-%b-%d",       # 2025-Oct-24
-        "%b %d, %Y",      # Oct 16, 2023
-        "%d %b. %Y",      # 23 Oct. 2025
-        "%d %b %Y",       # 23 Oct 2025
-        "%d %B %Y",       # 23 October 2025
-    ]
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+        page_count = len(pdf)
+    try:
+        print(f"Rendering {page_count} PDF pages...")
+        for i in range(page_count):
+            if wants_render and not wants_render(i):
+                continue
+            with _PDFIUM_LOCK:
+                page = pdf.get_page(i)
+                try:
+                    with PAGE_RENDER_SECONDS.time():
+                        bitmap = page.render(scale=scale)
+                        pil_image = bitmap.to_pil()
+                        # to_pil() shares the bitmap buffer, copy before releasing it
+                        pil_image = pil_image.copy()
+                    bitmap.close()
+                finally:
+                    page.close()
+            print(f"Rendered page {i+1}/{page_count}")
+            yield i, pil_image
+    finally:
+        with _PDFIUM_LOCK:
+            pdf.close()
 
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(clean_str, fmt)
-            return dt.strftime("%d.%m.%Y")
-        except ValueError:
-            continue
 
-    return date_str  # Return original if parsing fails
+def _encode_image(image: Image.Image, options: PayloadOptions = None) -> Tuple[str, Dict]:
+    """Optimize and encode PIL image to base64. Returns (base64, payload info)."""
+    import base64
 
+    with PAGE_ENCODE_SECONDS.time():
+        data, info = optimize_page(image, options)
+        return base64.b64encode(data).decode("utf-8"), info
 
-def _render_pages(pdf_path: str) -> List[Image.Image]:
-    """Render all pages of a PDF to PIL images."""
-    import pypdfium2 as pdfium
-    
-    images = []
-    try:
-        print("Rendering PDF pages...")
-        pdf = pdfium.PdfDocument(pdf_path)
-        for i in range(len(pdf)):
-            print(f"Rendering page {i+1}...")
-            page = pdf.get_page(i)
-            bitmap = page.render(scale=2)
-            pil_image = bitmap.to_pil()
-            images.append(pil_image)
-        pdf.close()
-        print(f"Rendered {len(images)} pages.")
-        return images
-    except Exception as e:
-        print(f"Rendering failed: {e}")
-        raise e
 
+def _encode_cropped(
+    image: Image.Image,
+    options: PayloadOptions = None,
+    tables: Optional[List[List[float]]] = None,
+    keep_header: bool = False
+) -> Tuple[str, Dict]:
+    """
+    Crop the page to its item table, then encode it (PAGE_LAYOUT_CROP).
 
-def _encode_image(image: Image.Image) -> str:
-    """Encode PIL image to base64."""
-    import base64
-    from io import BytesIO
-    
-    buffered = BytesIO()
-    image.save(buffered, format="JPEG")
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+    The full page is sent when no table was found. The byte reduction is
+    estimated from the kept area instead of encoding the full page too.
+    """
+    cropped, layout = crop_to_items(image, tables, keep_header)
+    if not layout["cropped"]:
+        b64_img, info = _encode_image(image, options)
+        return b64_img, {**info, "layout": layout}
+
+    b64_img, info = _encode_image(cropped, options)
+    cropped.close()
+    full_bytes = int(info["bytes"] / layout["area"]) if layout["area"] else info["bytes"]
+    saved = full_bytes - info["bytes"]
+    PAGE_LAYOUT_SAVED_BYTES.inc(saved)
+    layout.update(full_bytes=full_bytes, saved_bytes=saved, saved=round(saved / full_bytes, 3) if full_bytes else 0.0)
+    print(f"Page crop ({layout['source']}): ~{full_bytes} -> {info['bytes']} bytes")
+    return b64_img, {**info, "layout": layout}
 
 
+# Models to try (Primary + Fallbacks)
+GROQ_MODELS = [
+    "meta-llama/llama-4-scout-17b-16e-instruct",  # Primary
+    "llama-3.3-70b-versatile",                     # Fallback 1
+    "llama-3.2-90b-vision-preview"                 # Fallback 2
+]
+
 PAGE_PROMPT = """Extract all line items from this invoice page. Return a valid JSON object with this structure:
 {
   "items": [
@@ -114,34 +151,76 @@ IMPORTANT:
 3. IGNORE footer text like "Say total...", "Page x of y".
 """
 
+BATCH_PROMPT = """The {count} images are pages of the same invoice, in order. Extract all line items from every page. Return a valid JSON object with this structure:
+{
+  "items": [
+    {
+      "page": 1,
+      "designation": "Part Number/Designation (Alphanumeric code, e.g. R1.003, 5550-0329c)", 
+      "description": "Description", 
+      "material": "Material", 
+      "name": "Part Name (Text description, e.g. Bushing, Plate, Втулка)", 
+      "quantity": 0, 
+      "unit_price": 0.0, 
+      "total_price": 0.0
+    }
+  ],
+  "invoice_number": "Invoice Number (if found)",
+  "invoice_date": "Invoice Date (if found)",
+  "contract_number": "Contract Number (if found)",
+  "contract_date": "Contract Date (if found)",
+  "supplier": "Supplier Name (if found)"
+}
+"page" is the number of the image the item appears on (1 to {count}). Every item must have it.
+If a field is not found, return null or empty string. Ensure the JSON is valid.
+IMPORTANT: 
+1. Do not confuse Designation (code) with Name (text). Designation usually contains numbers and dots/dashes. Name is usually a word.
+2. IGNORE rows that are NOT parts, such as: "Shipping cost", "Freight", "Tax", "VAT", "Total", "Subtotal", "Bank charges", "Insurance".
+3. IGNORE footer text like "Say total...", "Page x of y".
+"""
+
 
-def _process_page(
+async def _process_page(
     page_index: int, 
-    b64_img: str, 
+    b64_img: Union[str, List[str]], 
     models: List[str], 
-    api_keys: List[str],
-    max_retries: int = 3
+    pool: KeyPool,
+    max_retries: int = 3,
+    max_wait: float = 60,
+    client: Optional[LLMClient] = None,
+    busy_keys: Optional[Set[int]] = None,
+    prompt: str = PAGE_PROMPT
 ) -> Tuple[List[Dict], Dict, List[Dict]]:
     """
     Process a single page with Groq AI using model/key rotation.
     
     Features:
     - Model fallback (tries multiple models)
-    - Key rotation (tries multiple API keys)
-    - Exponential backoff for rate limits
+    - Key scheduling via the shared KeyPool (skips keys that are cooling down)
+    - Cooldowns from 429 responses and Retry-After headers
+    - Non-blocking waits; cancelling the task releases the reserved key
     
     Args:
         page_index: 0-based page index
-        b64_img: Base64-encoded image
+        b64_img: Base64-encoded image, or a list of images sent in one request
         models: List of model slugs to try
-        api_keys: List of API keys to rotate
-        max_retries: Max retries per key for transient errors
+        pool: Key pool that hands out API keys
+        max_retries: Attempts per key for transient errors
+        max_wait: Give up on a model instead of waiting longer than this for a key
+        client: LLM client (defaults to the shared pooled client)
+        busy_keys: Keys held by another request for the same page (hedging);
+            they are not used, and the key of this call is added while it is in use
+        prompt: Instruction sent with the image(s)
         
     Returns: (items, metadata, logs)
     """
-    import requests
-    import time
-    
+    client = client or llm_client
+    images = [b64_img] if isinstance(b64_img, str) else b64_img
+    content = [{"type": "text", "text": prompt}] + [
+        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image}"}}
+        for image in images
+    ]
+
     items = []
     metadata = {}
     logs = []
@@ -152,130 +231,164 @@ def _process_page(
             break
             
         print(f"--- Page {page_index+1}: Trying model {model_slug} ---")
-        
-        for key_idx, api_key in enumerate(api_keys):
-            if success:
+
+        # Keys that returned a non-retryable error for this model
+        dead_keys = set()
+
+        for attempt in range(max_retries * len(pool)):
+            key_idx, wait_time = pool.acquire(exclude=dead_keys | busy_keys if busy_keys else dead_keys)
+            if key_idx is None:
                 break
-                
-            print(f"--- Page {page_index+1}: Trying Key {key_idx+1}/{len(api_keys)} ({api_key[-4:]}) ---")
-            
-            # Retry logic with exponential backoff
-            for retry in range(max_retries):
-                if success:
-                    break
-                    
-                if retry > 0:
-                    wait_time = 2 ** retry  # 2, 4, 8 seconds
-                    print(f"⏳ Retry {retry}/{max_retries}, waiting {wait_time}s...")
-                    time.sleep(wait_time)
+            if wait_time > max_wait:
+                pool.release(key_idx, "skipped")
+                print(f"⏳ All keys are cooling down for {wait_time:.0f}s, skipping model {model_slug}")
+                break
+
+            api_key = pool.keys[key_idx]
+            payload = {
+                "model": model_slug,
+                "messages": [{
+                    "role": "user", 
+                    "content": content
+                }],
+                "temperature": 0.1
+            }
             
-                headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model": model_slug,
-                    "messages": [{
-                        "role": "user", 
-                        "content": [
-                            {"type": "text", "text": PAGE_PROMPT},
-                            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64_img}"}}
-                        ]
-                    }],
-                    "temperature": 0.1
-                }
-                
+            if busy_keys is not None:
+                busy_keys.add(key_idx)
+            try:
+                if wait_time > 0:
+                    print(f"⏳ Waiting {wait_time:.1f}s for Key {key_idx+1}...")
+                    await asyncio.sleep(wait_time)
+                print(f"--- Page {page_index+1}: Trying Key {key_idx+1}/{len(pool)} ({api_key[-4:]}) ---")
+                started = time.perf_counter()
+                response = await client.chat_completion(api_key, payload)
+                LLM_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, model=model_slug, key=key_label(api_key),
+                    status=str(response.status_code)
+                )
+            except asyncio.CancelledError:
+                pool.release(key_idx, "cancelled")
+                raise
+            except httpx.TimeoutException:
+                LLM_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, model=model_slug, key=key_label(api_key), status="timeout"
+                )
+                LLM_RETRIES_TOTAL.inc(model=model_slug, reason="timeout")
+                pool.release(key_idx, "timeout")
+                print(f"⏱️ Timeout on page {page_index+1}, attempt {attempt+1}")
+                logs.append({
+                    "page": page_index+1,
+                    "status": "timeout",
+                    "key_idx": key_idx,
+                    "retry": attempt
+                })
+                continue
+            except Exception as e:
+                LLM_RETRIES_TOTAL.inc(model=model_slug, reason="exception")
+                pool.release(key_idx, "error")
+                print(f"❌ Page {page_index+1} Exception: {e}")
+                logs.append({
+                   "page": page_index+1,
+                   "status": "error",
+                   "error": str(e)[:50]
+                })
+                dead_keys.add(key_idx)  # Don't retry on unknown errors
+                continue
+            finally:
+                if busy_keys is not None:
+                    busy_keys.discard(key_idx)
+
+            if response.status_code == 200:
+                pool.release(key_idx, "success")
                 try:
-                    response = requests.post(
-                        "https://api.groq.com/openai/v1/chat/completions",
-                        headers=headers,
-                        data=json.dumps(payload),
-                        timeout=60
-                    )
+                    resp_json = response.json()
+                    content = resp_json['choices'][0]['message']['content']
                     
-                    if response.status_code == 200:
-                        resp_json = response.json()
-                        content = resp_json['choices'][0]['message']['content']
-                        
-                        # Basic cleanup
-                        if "```json" in content:
-                            content = content.split("```json")[1].split("```")[0]
-                        elif "```" in content:
-                            content = content.split("```")[1].split("```")[0]
-                        
-                        print(f"DEBUG: Raw JSON from Groq (Page {page_index+1}): {content[:100]}...")
-                        data = json.loads(content)
-                        
-                        if isinstance(data.get("items"), list):
-                            items = data["items"]
-                        
-                        # Metadata only if valid
-                        metadata = {
-                            "invoice_number": data.get("invoice_number"),
-                            "invoice_date": normalize_date(data.get("invoice_date")),
-                            "contract_number": data.get("contract_number"),
-                            "contract_date": normalize_date(data.get("contract_date")),
-                            "supplier": data.get("supplier")
-                        }
-
-                        logs.append({
-                            "page": page_index+1,
-                            "status": "success",
-                            "key_idx": key_idx,
-                            "model": model_slug,
-                            "tokens": resp_json.get('usage', {}).get('total_tokens', 0),
-                            "retries": retry
-                        })
-                        print(f"✅ Page {page_index+1} Success with Key {key_idx+1} (retries: {retry})")
-                        success = True
-                        break  # Exit retry loop
-                        
-                    elif response.status_code == 429:
-                        # Rate limit - retry with backoff
-                        print(f"⚠️ Rate limit hit, will retry...")
-                        logs.append({
-                            "page": page_index+1,
-                            "status": "rate_limit",
-                            "key_idx": key_idx,
-                            "model": model_slug,
-                            "retry": retry
-                        })
-                        continue  # Continue retry loop
-                        
-                    elif response.status_code in [500, 502, 503, 504]:
-                        # Server error - retry
-                        print(f"⚠️ Server error {response.status_code}, will retry...")
-                        continue
-                        
-                    else:
-                        print(f"❌ Page {page_index+1} Failed: {response.status_code} - {response.text[:100]}")
-                        logs.append({
-                            "page": page_index+1,
-                            "status": "failed",
-                            "key_idx": key_idx,
-                            "model": model_slug,
-                            "error": f"{response.status_code}: {response.text[:50]}"
-                        })
-                        break  # Try next key (don't retry for auth errors etc)
-                        
-                except requests.exceptions.Timeout:
-                    print(f"⏱️ Timeout on page {page_index+1}, retry {retry+1}/{max_retries}")
-                    logs.append({
-                        "page": page_index+1,
-                        "status": "timeout",
-                        "retry": retry
-                    })
-                    continue
+                    # Basic cleanup
+                    if "```json" in content:
+                        content = content.split("```json")[1].split("```")[0]
+                    elif "```" in content:
+                        content = content.split("```")[1].split("```")[0]
                     
+                    print(f"DEBUG: Raw JSON from Groq (Page {page_index+1}): {content[:100]}...")
+                    data = json.loads(content)
                 except Exception as e:
-                    print(f"❌ Page {page_index+1} Exception: {e}")
+                    LLM_RETRIES_TOTAL.inc(model=model_slug, reason="invalid_response")
+                    print(f"❌ Page {page_index+1} Invalid response: {e}")
                     logs.append({
                        "page": page_index+1,
                        "status": "error",
+                       "key_idx": key_idx,
+                       "model": model_slug,
                        "error": str(e)[:50]
                     })
-                    break  # Don't retry on unknown errors
+                    continue
+                
+                if isinstance(data.get("items"), list):
+                    items = data["items"]
+                
+                # Metadata only if valid
+                metadata = {
+                    "invoice_number": data.get("invoice_number"),
+                    "invoice_date": normalize_date(data.get("invoice_date")),
+                    "contract_number": data.get("contract_number"),
+                    "contract_date": normalize_date(data.get("contract_date")),
+                    "supplier": data.get("supplier")
+                }
+
+                tokens = resp_json.get('usage', {}).get('total_tokens', 0)
+                LLM_TOKENS_TOTAL.inc(tokens or 0, model=model_slug)
+                logs.append({
+                    "page": page_index+1,
+                    "status": "success",
+                    "key_idx": key_idx,
+                    "model": model_slug,
+                    "tokens": tokens,
+                    "retries": attempt
+                })
+                print(f"✅ Page {page_index+1} Success with Key {key_idx+1} (attempts: {attempt+1})")
+                success = True
+                break
+                
+            elif response.status_code == 429:
+                # Rate limit - park this key and move on to the next one
+                retry_after = parse_retry_after(response.headers)
+                LLM_RATE_LIMITED_TOTAL.inc(key=key_label(api_key))
+                LLM_RETRIES_TOTAL.inc(model=model_slug, reason="rate_limit")
+                pool.release(key_idx, "rate_limit", retry_after=retry_after)
+                print(f"⚠️ Rate limit hit on Key {key_idx+1}, cooling down {retry_after or 'default'}s")
+                logs.append({
+                    "page": page_index+1,
+                    "status": "rate_limit",
+                    "key_idx": key_idx,
+                    "model": model_slug,
+                    "retry": attempt,
+                    "retry_after": retry_after
+                })
+                continue
+                
+            elif response.status_code in [500, 502, 503, 504]:
+                # Server error - retry
+                LLM_RETRIES_TOTAL.inc(model=model_slug, reason="server_error")
+                pool.release(key_idx, "server_error")
+                print(f"⚠️ Server error {response.status_code}, will retry...")
+                continue
+                
+            else:
+                # Auth errors etc: don't retry this key
+                LLM_RETRIES_TOTAL.inc(model=model_slug, reason=f"http_{response.status_code}")
+                pool.release(key_idx, "invalid" if response.status_code in [401, 403] else "error")
+                print(f"❌ Page {page_index+1} Failed: {response.status_code} - {response.text[:100]}")
+                logs.append({
+                    "page": page_index+1,
+                    "status": "failed",
+                    "key_idx": key_idx,
+                    "model": model_slug,
+                    "error": f"{response.status_code}: {response.text[:50]}"
+                })
+                dead_keys.add(key_idx)
+                continue
 
     if not success:
         print(f"💀 Page {page_index+1} failed with ALL keys and ALL models.")
@@ -283,25 +396,265 @@ def _process_page(
     return items, metadata, logs
 
 
-def parse_invoice(pdf_path: str, method: str = "groq", api_key: str = None) -> Tuple[List[Dict], Dict]:
+def _page_succeeded(result: Tuple[List[Dict], Dict, List[Dict]]) -> bool:
+    return any(log.get("status") == "success" for log in result[2])
+
+
+async def _process_page_hedged(
+    page_index: int,
+    b64_img: str,
+    models: List[str],
+    pool: KeyPool,
+    client: Optional[LLMClient] = None
+) -> Tuple[List[Dict], Dict, List[Dict]]:
     """
-    Parses the PDF invoice using Groq AI.
-    
+    _process_page with a hedged duplicate request for slow pages.
+
+    Once enough page latencies are known, a page still running after the
+    recent p90 (HEDGE_PERCENTILE, clamped to HEDGE_MIN_DELAY..HEDGE_MAX_DELAY)
+    is requested again on a key the first request is not using. The first
+    successful response wins and the other request is cancelled, which
+    releases its key without a penalty. HEDGE_BUDGET_RATIO caps the extra
+    requests relative to the number of pages.
+    """
+    busy_keys = set()
+    started = time.perf_counter()
+    result, winner = await run_hedged(
+        lambda: _process_page(page_index, b64_img, models, pool, client=client, busy_keys=busy_keys),
+        lambda: _process_page(page_index, b64_img, models, pool, client=client, busy_keys=busy_keys),
+        hedge_delay(page_latency),
+        _page_succeeded,
+        hedge_budget,
+    )
+    if _page_succeeded(result):
+        page_latency.record(time.perf_counter() - started)
+    if winner:
+        print(f"🔀 Page {page_index+1}: hedged request, {winner} won")
+        result[2].append({"page": page_index+1, "status": "hedged", "winner": winner})
+    return result
+
+
+def _batch_pages(
+    pages: Iterator[Tuple[int, str]],
+    max_pages: int,
+    max_bytes: int = 0
+) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Group encoded pages into batches for one request each.
+
+    A batch holds at most `max_pages` pages and, when `max_bytes` is set,
+    at most that many base64 bytes (a single larger page still gets its own
+    batch). A full batch is yielded as soon as its last page arrives.
+    """
+    batch, size = [], 0
+    for i, b64_img in pages:
+        if batch and max_bytes and size + len(b64_img) > max_bytes:
+            yield batch
+            batch, size = [], 0
+        batch.append((i, b64_img))
+        size += len(b64_img)
+        if len(batch) >= max_pages:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def _split_batch_items(items: List, count: int) -> Optional[List[List[Dict]]]:
+    """Items of a batched response by page position, None if any item lacks a valid page tag."""
+    pages = [[] for _ in range(count)]
+    for item in items:
+        if not isinstance(item, dict):
+            return None
+        try:
+            page = int(item.get("page"))
+        except (TypeError, ValueError):
+            return None
+        if not 1 <= page <= count:
+            return None
+        pages[page - 1].append({key: value for key, value in item.items() if key != "page"})
+    return pages
+
+
+async def _process_batch(
+    batch: List[Tuple[int, str]],
+    models: List[str],
+    pool: KeyPool,
+    client: Optional[LLMClient] = None
+) -> Dict[int, Tuple[List[Dict], Dict, List[Dict]]]:
+    """
+    Process several pages with one request (BATCH_PROMPT, items tagged by page).
+
+    The prompt and the request overhead are paid once and only one request
+    counts against the key's rate limit. When the batched response fails or
+    is malformed (items without a valid page tag), every page is requested
+    on its own. The invoice metadata and the token count are attributed to
+    the first page of the batch.
+
+    Returns: dict of page_index -> (items, metadata, logs).
+    """
+    indices = [i for i, _ in batch]
+    pages = [i + 1 for i in indices]
+    prompt = BATCH_PROMPT.replace("{count}", str(len(batch)))
+    print(f"--- Pages {pages}: one batched request ---")
+    items, metadata, logs = await _process_page(
+        indices[0], [b64_img for _, b64_img in batch], models, pool, client=client, prompt=prompt
+    )
+    split = _split_batch_items(items, len(batch)) if _page_succeeded((items, metadata, logs)) else None
+
+    if split is None:
+        LLM_BATCHES_TOTAL.inc(outcome="fallback")
+        print(f"⚠️ Batched response for pages {pages} unusable, falling back to single pages")
+        # Keep the failed attempts for debugging, without counting them as a success
+        batch_logs = [
+            {**log, "status": "batch_invalid" if log["status"] == "success" else log["status"], "batch": pages}
+            for log in logs
+        ]
+        results = await asyncio.gather(*(
+            _process_page(i, b64_img, models, pool, client=client) for i, b64_img in batch
+        ))
+        results[0][2][:0] = batch_logs
+        return dict(zip(indices, results))
+
+    LLM_BATCHES_TOTAL.inc(outcome="ok")
+    results = {}
+    for position, i in enumerate(indices):
+        if position == 0:
+            page_logs = [{**log, "batch": pages} for log in logs]
+        else:
+            page_logs = [{"page": i+1, "status": "success", "batch": pages, "tokens": 0}]
+        results[i] = (split[position], metadata if position == 0 else {}, page_logs)
+    return results
+
+
+async def _process_pages(
+    pages: Iterator[Tuple[int, str]],
+    models: List[str],
+    pool: KeyPool,
+    max_concurrency: int = 1,
+    on_result: Callable[[int, Tuple[List[Dict], Dict, List[Dict]]], None] = None,
+    semaphore: Optional[asyncio.Semaphore] = None
+) -> Dict[int, Tuple[List[Dict], Dict, List[Dict]]]:
+    """
+    Process pages as they arrive, optionally in parallel.
+
+    `pages` is a (blocking) iterator, typically a generator that renders and
+    encodes pages. It is advanced in a worker thread and only when there is
+    room in the in-flight window, so rendering of the next page overlaps with
+    the requests for previous pages, and at most `workers + 1` encoded pages
+    are held in memory at once.
+
+    Parallelism is bounded by `max_concurrency` and by the number of healthy
+    API keys (more parallel pages than usable keys only produces rate limits).
+    Cancelling the call cancels all in-flight page requests.
+
+    With PAGE_BATCH_SIZE > 1, consecutive pages are grouped (up to
+    PAGE_BATCH_MAX_KB of images) and sent in one request; the in-flight
+    window then counts batches.
+
     Args:
-        pdf_path: Path to the PDF file
-        method: Parsing method (only 'groq' supported)
-        api_key: Optional API key override
-        
+        pages: Iterator of (page_index, base64 image) tuples
+        on_result: Called with (page_index, result) as soon as a page is done
+        semaphore: Shared page budget (e.g. across the invoices of a batch);
+            replaces the per-call limit derived from `max_concurrency`
+
+    Returns: dict of page_index -> (items, metadata, logs).
+    """
+    workers = max(1, min(max_concurrency, pool.healthy_count()))
+    semaphore = semaphore or asyncio.Semaphore(workers)
+    window = workers + 1
+    results = {}
+    in_flight = {}
+    pages = _batch_pages(pages, max(1, settings.PAGE_BATCH_SIZE), settings.PAGE_BATCH_MAX_KB * 1024)
+    done_marker = object()
+
+    async def run(batch):
+        async with semaphore:
+            if len(batch) > 1:
+                return await _process_batch(batch, models, pool)
+            i, b64_img = batch[0]
+            if settings.HEDGE_ENABLED:
+                return {i: await _process_page_hedged(i, b64_img, models, pool)}
+            return {i: await _process_page(i, b64_img, models, pool)}
+
+    def collect(tasks):
+        for task in tasks:
+            in_flight.pop(task)
+            for i, result in sorted(task.result().items()):
+                results[i] = result
+                if on_result:
+                    on_result(i, result)
+
+    try:
+        while True:
+            if len(in_flight) >= window:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            batch = await asyncio.to_thread(next, pages, done_marker)
+            if batch is done_marker:
+                break
+            in_flight[asyncio.ensure_future(run(batch))] = [i for i, _ in batch]
+
+        if in_flight:
+            await asyncio.wait(in_flight)
+            collect(list(in_flight))
+    except BaseException:
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        raise
+
+    return results
+
+
+def _page_cache_key(image: Image.Image) -> str:
+    """Hash the rendered page bitmap together with the prompt/model version."""
+    from app.services.parse_cache import content_key
+
+    header = f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("utf-8")
+    return content_key(header + image.tobytes(), _cache_version())
+
+
+def _normalize_item(item: Dict, method: str) -> Dict:
+    """Convert a raw extracted row into the parser's item format."""
+    return {
+        "designation": (item.get("designation") or "").replace(" ", ""),
+        "raw_description": item.get("description") or "",
+        "material": item.get("material") or "",
+        "name": item.get("name") or "",
+        "quantity": item.get("quantity") or 1,
+        "weight": 0.0,
+        "dimensions": "",
+        "description": "",
+        "parsing_method": method
+    }
+
+
+async def _extract_items(
+    pdf_path: str,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    on_event: Callable[[Dict], None] = None,
+    page_semaphore: Optional[asyncio.Semaphore] = None
+) -> Tuple[List[Dict], Dict]:
+    """
+    Render the PDF and extract line items with Groq AI.
+
+    Pages whose rendered bitmap was already parsed are taken from the page
+    cache, so only new or changed pages are sent to the LLM. Pages after the
+    first that the local classifier recognizes as item-free (bank details,
+    terms, blank pages) are skipped.
+
+    `on_event` receives progress events on the event loop thread:
+    {"event": "page_rendered", "page": n} and
+    {"event": "page_parsed", "page": n, "source": ..., "items": [...], "metadata": {...}}.
+
     Returns:
         Tuple of (items list, debug info dict)
     """
-    import base64
-    from io import BytesIO
-
-    import requests
+    from app.services.parse_cache import page_cache
 
     items = []
-    print(f"Parsing PDF: {pdf_path} with method={method}")
 
     debug_info = {
         "method_used": "Groq Multi-Key",
@@ -310,56 +663,188 @@ def parse_invoice(pdf_path: str, method: str = "groq", api_key: str = None) -> T
         "page_count": 0
     }
 
-    # Render PDF pages to images
+    payload_options = PayloadOptions.from_settings()
+    debug_info["payload_settings"] = payload_options.as_dict()
+    debug_info["pages"] = []
+
+    page_results = {}
+    page_keys = {}
+    page_sources = {}
+    text_pages = set()
+    table_boxes = {}  # page_index -> text-layer table boxes in PDF points, with the page size
+
+    loop = asyncio.get_running_loop()
+    loop_thread = threading.get_ident()
+
+    def emit(event: Dict) -> None:
+        if not on_event:
+            return
+        if threading.get_ident() == loop_thread:
+            on_event(event)
+        else:
+            # Rendering runs in worker threads: hand the event to the loop. It is
+            # delivered before the loop resumes the code awaiting that thread.
+            loop.call_soon_threadsafe(on_event, event)
+
+    def emit_page(i: int, result: Tuple[List[Dict], Dict, List[Dict]]) -> None:
+        page_items, page_metadata, page_logs = result
+        if not any(log["status"] == "success" for log in page_logs):
+            return
+        method = "Text Layer" if page_sources.get(i) == "text_layer" else "Groq Multi-Key"
+        emit({
+            "event": "page_parsed",
+            "page": i+1,
+            "source": page_sources.get(i),
+            "items": [_normalize_item(item, method) for item in page_items or []],
+            "metadata": page_metadata,
+        })
+
+    def skip_page(i: int, reason: str) -> None:
+        print(f"Page {i+1}: skipped, {reason}")
+        page_results[i] = ([], {}, [{
+            "page": i+1,
+            "status": "success",
+            "source": "classifier",
+            "skipped": True,
+            "tokens": 0
+        }])
+        page_sources[i] = "skipped"
+        debug_info["pages"].append({"page": i+1, "source": "skipped", "reason": reason})
+
+    text_extractor = None
+    if settings.TEXT_LAYER_ENABLED:
+        try:
+            text_extractor = TextLayerExtractor(pdf_path)
+        except Exception as e:
+            print(f"Text layer unavailable: {e}")
+
+    def wants_render(i: int) -> bool:
+        """Use the text layer when it is confident enough, otherwise render for the LLM."""
+        debug_info["page_count"] = i + 1
+        if not text_extractor:
+            return True
+        try:
+            result = text_extractor.extract_page(i)
+        except Exception as e:
+            print(f"Text layer extraction failed on page {i+1}: {e}")
+            return True
+        if not result:
+            return True
+        text_pages.add(i)
+        if result.get("tables"):
+            table_boxes[i] = (result["tables"], result["page_size"])
+
+        confident = result["confidence"] >= settings.TEXT_LAYER_MIN_CONFIDENCE and result["items"]
+        # The first page carries the invoice metadata: the LLM reads whatever the text layer missed
+        if i == 0 and not all(result["metadata"].get(field) for field in METADATA_FIELDS):
+            confident = False
+        if not confident:
+            if settings.PAGE_CLASSIFIER_ENABLED and i > 0:
+                has_items, reason = classify_text(result.get("text", ""))
+                if has_items is False:
+                    skip_page(i, reason)
+                    return False
+            print(f"Page {i+1}: text layer confidence {result['confidence']}, using LLM")
+            return True
+
+        print(f"Page {i+1}: {len(result['items'])} items from text layer (confidence {result['confidence']})")
+        page_results[i] = (result["items"], result["metadata"], [{
+            "page": i+1,
+            "status": "success",
+            "source": "text_layer",
+            "tokens": 0
+        }])
+        page_sources[i] = "text_layer"
+        debug_info["pages"].append({
+            "page": i+1,
+            "source": "text_layer",
+            "confidence": result["confidence"]
+        })
+        emit_page(i, page_results[i])
+        return False
+
+    def pending_pages():
+        """Render pages lazily, yielding only those without a cached result."""
+        for i, image in _iter_pages(pdf_path, wants_render=wants_render):
+            emit({"event": "page_rendered", "page": i+1})
+            if use_cache:
+                page_keys[i] = _page_cache_key(image)
+                cached = None if refresh_cache else page_cache.get(page_keys[i])
+                if cached:
+                    page_results[i] = (cached["items"], cached["metadata"], [{
+                        "page": i+1,
+                        "status": "success",
+                        "cached": True,
+                        "tokens": 0
+                    }])
+                    page_sources[i] = "cache"
+                    debug_info["pages"].append({"page": i+1, "source": "cache"})
+                    emit_page(i, page_results[i])
+                    image.close()
+                    continue
+
+            # Scanned pages: look for table ruling lines on the bitmap
+            if settings.PAGE_CLASSIFIER_ENABLED and i > 0 and i not in text_pages:
+                has_items, reason = classify_bitmap(image)
+                if has_items is False:
+                    skip_page(i, reason)
+                    image.close()
+                    continue
+
+            if settings.PAGE_LAYOUT_CROP:
+                tables = None
+                if i in table_boxes:
+                    boxes, (page_width, _) = table_boxes[i]
+                    scale = image.width / page_width
+                    tables = [[value * scale for value in box] for box in boxes]
+                # The first page keeps everything above the table (letterhead and metadata)
+                b64_img, payload_info = _encode_cropped(image, payload_options, tables, keep_header=i == 0)
+            else:
+                b64_img, payload_info = _encode_image(image, payload_options)
+            image.close()
+            page_sources[i] = "llm"
+            debug_info["pages"].append({"page": i+1, "source": "llm", **payload_info})
+            yield i, b64_img
+
     try:
-        images = _render_pages(pdf_path)
-        debug_info["page_count"] = len(images)
+        fresh_results = await _process_pages(
+            pending_pages(), GROQ_MODELS, key_pool,
+            max_concurrency=settings.PARSER_MAX_CONCURRENCY,
+            on_result=emit_page,
+            semaphore=page_semaphore
+        )
     except Exception as e:
-        debug_info["error"] = f"Rendering failed: {e}"
+        print(f"Processing failed: {e}")
+        debug_info["error"] = f"Processing failed: {e}"
         return [], debug_info
+    finally:
+        if text_extractor:
+            text_extractor.close()
 
-    # Groq API Keys (with rotation)
-    GROQ_API_KEYS = [
-        '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',
-        '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',
-        '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',
-        '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',
-        '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',
-        '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',
-        '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',
-        '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',
-        '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',
-        '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',
-        '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',
-        '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',
-        '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',
-        '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'
-    ]
-
-    # Add env key if present and not in list
-    if settings.GROQ_API_KEY and settings.GROQ_API_KEY not in GROQ_API_KEYS:
-        GROQ_API_KEYS.insert(0, settings.GROQ_API_KEY)
-
-    # Models to try (Primary + Fallbacks)
-    GROQ_MODELS = [
-        "meta-llama/llama-4-scout-17b-16e-instruct",  # Primary
-        "llama-3.3-70b-versatile",                     # Fallback 1
-        "llama-3.2-90b-vision-preview"                 # Fallback 2
-    ]
+    debug_info["cached_pages"] = sum(1 for source in page_sources.values() if source == "cache")
+    debug_info["text_layer_pages"] = sum(1 for source in page_sources.values() if source == "text_layer")
+    debug_info["skipped_pages"] = sum(1 for source in page_sources.values() if source == "skipped")
+    for source in page_sources.values():
+        PAGES_TOTAL.inc(source=source)
+    print(f"DEBUG: Sent {len(fresh_results)} pages to Groq "
+          f"({debug_info['cached_pages']} cached, {debug_info['text_layer_pages']} from text layer, "
+          f"{debug_info['skipped_pages']} skipped).")
 
-    # Encode images to base64
-    base64_images = [_encode_image(img) for img in images]
-    print(f"DEBUG: Prepared {len(base64_images)} images for Groq.")
+    for i, result in fresh_results.items():
+        page_results[i] = result
+        page_items, page_metadata, page_logs = result
+        if page_keys.get(i) and any(log["status"] == "success" for log in page_logs):
+            page_cache.put(page_keys[i], {"items": page_items, "metadata": page_metadata})
 
     all_items = []
     invoice_metadata = {}
     key_attempts_log = []
 
-    for i, b64_img in enumerate(base64_images):
-        page_items, page_metadata, page_logs = _process_page(i, b64_img, GROQ_MODELS, GROQ_API_KEYS)
-        
+    for i in sorted(page_results):
+        page_items, page_metadata, page_logs = page_results[i]
+        method = "Text Layer" if page_sources.get(i) == "text_layer" else "Groq Multi-Key"
         if page_items:
-            all_items.extend(page_items)
+            all_items.extend((item, method) for item in page_items)
             
         key_attempts_log.extend(page_logs)
         
@@ -372,18 +857,13 @@ def parse_invoice(pdf_path: str, method: str = "groq", api_key: str = None) -> T
              debug_info["error"] = f"Page {i+1} failed after trying all keys/models."
 
     # Process items
-    for item in all_items:
-        items.append({
-            "designation": (item.get("designation") or "").replace(" ", ""),
-            "raw_description": item.get("description") or "",
-            "material": item.get("material") or "",
-            "name": item.get("name") or "",
-            "quantity": item.get("quantity") or 1,
-            "weight": 0.0,
-            "dimensions": "",
-            "description": "",
-            "parsing_method": "Groq Multi-Key"
-        })
+    for item, method in all_items:
+        items.append(_normalize_item(item, method))
+
+    if page_sources and all(source == "text_layer" for source in page_sources.values()):
+        debug_info["method_used"] = "Text Layer"
+    elif "text_layer" in page_sources.values():
+        debug_info["method_used"] = "Text Layer + Groq Multi-Key"
 
     # Calculate total token usage
     total_tokens = sum(attempt.get("tokens", 0) for attempt in key_attempts_log if attempt.get("status") == "success")
@@ -397,60 +877,159 @@ def parse_invoice(pdf_path: str, method: str = "groq", api_key: str = None) -> T
     }
     print(f"Groq found {len(items)} items total. Total tokens: {total_tokens}")
 
-    # Image standardization logic
-    from app.services.image_processor import process_and_save_image
+    return items, debug_info
 
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    IMAGES_DIR = os.path.join(BASE_DIR, "images")
 
-    if os.path.exists(IMAGES_DIR):
-        print(f"Scanning for images in {IMAGES_DIR}...")
-        image_files = os.listdir(IMAGES_DIR)
+def attach_images(items: List[Dict]) -> None:
+    """
+    Find an image for each item, using WebP conversions of local non-WebP files.
 
-        for item in items:
-            designation = item.get("designation")
-            if not designation:
-                continue
+    Conversions are cached by source content; with IMAGE_CONVERT_BACKGROUND a
+    missing conversion is queued and the source image is used until it is ready.
+    """
+    from app.services.image_index import image_index
+    from app.services.image_processor import convert_image_file, get_converted_image
 
-            found_image = None
-
-            # Try exact match with common extensions
-            for ext in ['.jpg', '.jpeg', '.png', '.webp']:
-                candidate_name = f"{designation}{ext}"
-                if candidate_name in image_files:
-                    found_image = candidate_name
-                    break
-
-            if not found_image:
-                # Try match without suffix (e.g. R1.01.00.001a -> R1.01.00.001.jpg)
-                if designation[-1].isalpha():
-                    base_des = designation[:-1]
-                    for ext in ['.jpg', '.jpeg', '.png', '.webp']:
-                        candidate_name = f"{base_des}{ext}"
-                        if candidate_name in image_files:
-                            found_image = candidate_name
-                            break
-
-            if not found_image:
-                # Try to find any file that STARTS with the designation
-                for img_file in image_files:
-                    if img_file.startswith(designation) and img_file.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-                        found_image = img_file
-                        break
-
-            if found_image:
-                try:
-                    full_path = os.path.join(IMAGES_DIR, found_image)
-                    with Image.open(full_path) as img:
-                        if found_image.endswith(".webp"):
-                            item["image_path"] = found_image
-                        else:
-                            # Convert to WebP and resize
-                            new_filename = process_and_save_image(img)
-                            item["image_path"] = new_filename
-                            print(f"Converted {found_image} to {new_filename}")
-                except Exception as e:
-                    print(f"Error processing image {found_image}: {e}")
-                    item["image_path"] = found_image
+    image_index.refresh()
+
+    for item in items:
+        found_image = image_index.lookup(item.get("designation"))
+        if not found_image:
+            continue
+
+        local_path = image_index.local_path(found_image)
+        if found_image.lower().endswith(".webp") or not local_path:
+            # WebP already, or an S3 object served by /images/{filename}
+            item["image_path"] = found_image
+            continue
 
+        try:
+            if settings.IMAGE_CONVERT_BACKGROUND:
+                item["image_path"] = get_converted_image(local_path) or found_image
+            else:
+                item["image_path"] = convert_image_file(local_path)
+        except Exception as e:
+            print(f"Error processing image {found_image}: {e}")
+            item["image_path"] = found_image
+
+
+# Bump when the output format of _extract_items changes
+PARSE_CACHE_FORMAT = 1
+
+
+def _file_cache_key(pdf_path: str) -> str:
+    """SHA-256 based cache key of the PDF file bytes."""
+    from app.services.parse_cache import content_key
+
+    with open(pdf_path, "rb") as f:
+        return content_key(f.read(), _cache_version())
+
+
+def _cache_version() -> str:
+    """Version string mixed into cache keys so prompt/model/payload changes invalidate entries."""
+    payload = PayloadOptions.from_settings().as_dict()
+    text_layer = [settings.TEXT_LAYER_ENABLED, settings.TEXT_LAYER_MIN_CONFIDENCE, TEXT_EXTRACTOR_VERSION]
+    classifier = [settings.PAGE_CLASSIFIER_ENABLED, PAGE_CLASSIFIER_VERSION]
+    batching = [BATCH_PROMPT, settings.PAGE_BATCH_SIZE] if settings.PAGE_BATCH_SIZE > 1 else None
+    layout = [settings.PAGE_LAYOUT_CROP, PAGE_LAYOUT_VERSION]
+    return json.dumps(
+        [PARSE_CACHE_FORMAT, PAGE_PROMPT, GROQ_MODELS, payload, text_layer, classifier, batching, layout],
+        sort_keys=True
+    )
+
+
+async def parse_invoice_async(
+    pdf_path: str,
+    method: str = "groq",
+    api_key: str = None,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    on_event: Callable[[Dict], None] = None,
+    page_semaphore: Optional[asyncio.Semaphore] = None
+) -> Tuple[List[Dict], Dict]:
+    """
+    Parses the PDF invoice using Groq AI.
+    
+    Results are cached by the SHA-256 of the PDF bytes, so a repeat upload of
+    the same file skips rendering and the LLM entirely.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        method: Parsing method (only 'groq' supported)
+        api_key: Optional API key override
+        use_cache: Read and write the parse result cache
+        refresh_cache: Ignore any cached result and overwrite it
+        on_event: Progress callback for page events (see _extract_items);
+            not called for whole-file cache hits
+        page_semaphore: Page request budget shared with other parses
+        
+    Returns:
+        Tuple of (items list, debug info dict)
+    """
+    from app.services.parse_cache import parse_cache
+
+    print(f"Parsing PDF: {pdf_path} with method={method}")
+    started = time.perf_counter()
+
+    use_cache = use_cache and settings.PARSE_CACHE_ENABLED
+    cache_key = None
+    cache_status = "bypass"
+
+    if use_cache:
+        try:
+            cache_key = await asyncio.to_thread(_file_cache_key, pdf_path)
+        except OSError as e:
+            print(f"Could not read {pdf_path} for caching: {e}")
+
+    cached = None
+    if cache_key:
+        if refresh_cache:
+            parse_cache.invalidate(cache_key)
+            cache_status = "refresh"
+        else:
+            cached = parse_cache.get(cache_key)
+            cache_status = "hit" if cached else "miss"
+
+    if cached:
+        print(f"Parse cache hit for {pdf_path} ({cache_key[:12]})")
+        items, debug_info = cached["items"], cached["debug_info"]
+    else:
+        items, debug_info = await _extract_items(
+            pdf_path, use_cache=use_cache, refresh_cache=refresh_cache,
+            on_event=on_event, page_semaphore=page_semaphore
+        )
+        # Only cache complete results, failed pages should be retried next time
+        if cache_key and not debug_info.get("error"):
+            parse_cache.put(cache_key, {"items": items, "debug_info": debug_info})
+
+    debug_info["cache"] = cache_status
+
+    await asyncio.to_thread(attach_images, items)
+
+    INVOICE_PARSE_SECONDS.observe(time.perf_counter() - started, cache=cache_status)
     return items, debug_info
+
+
+def parse_invoice(
+    pdf_path: str,
+    method: str = "groq",
+    api_key: str = None,
+    use_cache: bool = True,
+    refresh_cache: bool = False
+) -> Tuple[List[Dict], Dict]:
+    """
+    Synchronous wrapper around parse_invoice_async for scripts and tools.
+
+    Must not be called from a running event loop; use parse_invoice_async there.
+    """
+    async def run():
+        try:
+            return await parse_invoice_async(
+                pdf_path, method=method, api_key=api_key,
+                use_cache=use_cache, refresh_cache=refresh_cache
+            )
+        finally:
+            # The pooled connections belong to this loop, which asyncio.run closes
+            await llm_client.aclose()
+
+    return asyncio.run(run())
@@ -0,0 +1,199 @@
+"""
+Trigram search over the parts table, in PostgreSQL where possible.
+
+With the pg_trgm extension and the trigram indexes on parts.designation
+and parts.name (migration 9b4e2f6c1d80) both lookups run in the database,
+without loading the whole table into Python:
+
+- search_parts(mode="similar"): rows ranked by similarity() to the search
+  string (GIN indexes serve the % and ILIKE filters)
+- nearest_parts(): the closest designations per query by trigram distance
+  (ORDER BY designation <-> query, served by the GiST index)
+
+Other dialects (SQLite in tests), or a database without pg_trgm, fall back
+to ILIKE and in-process trigram ranking.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import String, bindparam, case, func, or_, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.designation import normalize_designation
+from app.db.models import Part
+from app.services.fuzzy_matcher import trigram_similarity
+
+# pg_trgm default threshold of the % operator
+SIMILARITY_THRESHOLD = 0.3
+# Nearest designations fetched per query; re-scored with difflib by the matcher
+KNN_CANDIDATES = 20
+
+NEAREST_SQL = text("""
+    SELECT q.query, p.id
+    FROM unnest(:queries) AS q(query)
+    CROSS JOIN LATERAL (
+        SELECT parts.id FROM public.parts
+        ORDER BY parts.designation <-> q.query
+        LIMIT :k
+    ) AS p
+""").bindparams(bindparam("queries", type_=ARRAY(String)))
+
+# SQLSTATEs of a database without pg_trgm: undefined_function (similarity, %, <->)
+# and undefined_object (gin_trgm_ops / gist_trgm_ops)
+MISSING_EXTENSION_SQLSTATES = {"42883", "42704"}
+
+# Set when a trigram query failed because the extension is missing
+_unavailable = False
+
+
+def trigram_supported(db: AsyncSession) -> bool:
+    """True when `db` is PostgreSQL and trigram queries are enabled and working."""
+    if not settings.PG_TRGM_ENABLED or _unavailable:
+        return False
+    dialect = getattr(getattr(db, "bind", None), "dialect", None)
+    return getattr(dialect, "name", None) == "postgresql"
+
+
+async def _execute_trigram(db: AsyncSession, statement):
+    """
+    Execute a pg_trgm statement in a savepoint; None when it failed.
+
+    The savepoint keeps the surrounding transaction usable after a failure.
+    A missing extension disables trigram queries until reset_availability();
+    other errors (timeouts, dropped connections) only fall back for this call.
+    """
+    global _unavailable
+    try:
+        async with db.begin_nested():
+            return await db.execute(statement)
+    except DBAPIError as e:
+        if _sqlstate(e) in MISSING_EXTENSION_SQLSTATES:
+            _unavailable = True
+            print(f"pg_trgm is not available, falling back to in-process matching: {e}")
+        else:
+            print(f"pg_trgm query failed, falling back to in-process matching for this call: {e}")
+        return None
+
+
+def _sqlstate(error: DBAPIError) -> Optional[str]:
+    """SQLSTATE of the driver error (asyncpg/psycopg: sqlstate, psycopg2: pgcode)."""
+    orig = error.orig
+    return getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+
+
+def _contains_filter(search: str):
+    """Substring of designation or name, or the same normalized designation (indexed)."""
+    pattern = f"%{search}%"
+    conditions = [Part.designation.ilike(pattern), Part.name.ilike(pattern)]
+    norm = normalize_designation(search)
+    if norm:
+        conditions.append(Part.designation_norm == norm)
+    return or_(*conditions)
+
+
+def similar_query(search: str):
+    """Parts matching `search` by normalized designation, trigram similarity or substring, best first."""
+    score = func.greatest(
+        func.similarity(Part.designation, search),
+        func.coalesce(func.similarity(Part.name, search), 0),
+    )
+    order = [score.desc(), Part.designation]
+    norm = normalize_designation(search)
+    if norm:
+        order.insert(0, case((Part.designation_norm == norm, 0), else_=1))
+    return (
+        select(Part)
+        .filter(or_(
+            Part.designation.op("%")(search),
+            Part.name.op("%")(search),
+            _contains_filter(search),
+        ))
+        .order_by(*order)
+    )
+
+
+def rank_similar(parts: Iterable[Part], search: str) -> List[Part]:
+    """In-process stand-in for similar_query(): same filter and order, approximate scores."""
+    needle = search.casefold()
+    norm = normalize_designation(search)
+    ranked = []
+    for part in parts:
+        designation, name = part.designation or "", part.name or ""
+        same = bool(norm) and normalize_designation(designation) == norm
+        score = max(trigram_similarity(designation, search), trigram_similarity(name, search) if name else 0)
+        if same or score >= SIMILARITY_THRESHOLD or needle in designation.casefold() or needle in name.casefold():
+            ranked.append((not same, -score, designation, part))
+    ranked.sort(key=lambda entry: entry[:3])
+    return [part for *_, part in ranked]
+
+
+async def search_parts(
+    db: AsyncSession,
+    search: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    mode: str = "contains"
+) -> List[Part]:
+    """
+    Parts filtered by `search` on designation and name.
+
+    Modes: "contains" (ILIKE substring or same normalized designation, table
+    order) and "similar" (also trigram similarity; normalized matches first,
+    then most similar).
+    """
+    if search and mode == "similar":
+        if trigram_supported(db):
+            result = await _execute_trigram(db, similar_query(search).offset(skip).limit(limit))
+            if result is not None:
+                return result.scalars().all()
+        # Fallback: rank substring candidates and the rest of the table in Python
+        result = await db.execute(select(Part))
+        return rank_similar(result.scalars().all(), search)[skip:skip + limit]
+
+    query = select(Part)
+    if search:
+        query = query.filter(_contains_filter(search))
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+async def nearest_parts(
+    db: AsyncSession,
+    designations: Iterable[str],
+    k: int = KNN_CANDIDATES
+) -> Optional[Dict[str, List[Part]]]:
+    """
+    Up to `k` parts with the closest designations per query (pg_trgm KNN).
+
+    One query for all designations plus one to load the parts. Returns None
+    when trigram queries are not available; callers then match in process.
+    """
+    queries = sorted(set(designations))
+    if not queries or not trigram_supported(db):
+        return None
+
+    result = await _execute_trigram(db, NEAREST_SQL.bindparams(queries=queries, k=k))
+    if result is None:
+        return None
+    ids_by_query: Dict[str, List[int]] = {query: [] for query in queries}
+    for query, part_id in result.all():
+        ids_by_query[query].append(part_id)
+
+    wanted = {part_id for ids in ids_by_query.values() for part_id in ids}
+    parts = {}
+    if wanted:
+        loaded = await db.execute(select(Part).filter(Part.id.in_(wanted)))
+        parts = {part.id: part for part in loaded.scalars().all()}
+    return {
+        query: [parts[part_id] for part_id in ids if part_id in parts]
+        for query, ids in ids_by_query.items()
+    }
+
+
+def reset_availability() -> None:
+    """Retry pg_trgm queries after a failure (e.g. once the migration is applied)."""
+    global _unavailable
+    _unavailable = False
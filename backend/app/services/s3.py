@@ -10,12 +10,13 @@ import io
 import logging
 import time
 from collections import OrderedDict
-from typing import BinaryIO, Optional, Tuple
+from typing import BinaryIO, List, Optional, Tuple
 
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 
 from app.core.config import settings
+from app.services.metrics import S3_CACHE_REQUESTS_TOTAL
 
 logger = logging.getLogger(__name__)
 
@@ -142,7 +143,9 @@ class S3Service:
             cached_data = self._cache.get(object_name)
             if cached_data is not None:
                 logger.debug(f"Cache hit for {object_name}")
+                S3_CACHE_REQUESTS_TOTAL.inc(result="hit")
                 return io.BytesIO(cached_data)
+            S3_CACHE_REQUESTS_TOTAL.inc(result="miss")
         
         try:
             response = self.s3_client.get_object(Bucket=self.bucket_name, Key=object_name)
@@ -206,6 +209,29 @@ class S3Service:
         except ClientError:
             return False
 
+    def list_objects(self, prefix: str = "") -> Optional[List[str]]:
+        """
+        List object keys in the bucket (all pages).
+
+        Args:
+            prefix: Only keys starting with this prefix
+
+        Returns:
+            List of keys, None on failure (so callers can keep a previous listing)
+        """
+        try:
+            keys = []
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                keys.extend(obj['Key'] for obj in page.get('Contents', []))
+            return keys
+        except ClientError as e:
+            logger.error(f"S3 client error listing objects: {e.response['Error']['Message']}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error listing S3 objects: {e}")
+            return None
+
     @property
     def cache_stats(self) -> dict:
         """Get cache statistics."""
@@ -0,0 +1,244 @@
+"""
+Text-layer line item extraction with pdfplumber.
+
+Most supplier invoices are generated digitally and carry a real text layer.
+For those pages the line-item table can be read locally, which is much
+faster than rendering the page and sending it to a vision model.
+
+Each page gets a confidence score; the parser only trusts the local result
+above a threshold and falls back to the LLM otherwise.
+"""
+import re
+from typing import Dict, List, Optional
+
+import pdfplumber
+
+from app.services.dates import normalize_date
+
+# Bump when extraction logic changes (part of the parse cache version)
+TEXT_EXTRACTOR_VERSION = 2
+
+# Pages with fewer characters than this are treated as scanned images
+MIN_TEXT_CHARS = 50
+
+# Header cell text (lowercase, partial match) -> item field
+HEADER_SYNONYMS = {
+    "designation": [
+        "part no", "part number", "part#", "p/n", "item no", "model", "designation",
+        "drawing no", "article", "art.", "обозначение", "артикул",
+    ],
+    "name": ["product name", "name", "наименование", "commodity"],
+    "description": ["description", "specification", "spec", "описание", "спецификация"],
+    "material": ["material", "материал"],
+    "quantity": ["qty", "quantity", "q'ty", "pcs", "кол-во", "количество"],
+    "unit_price": ["unit price", "price", "цена"],
+    "total_price": ["amount", "total price", "total", "сумма", "стоимость"],
+}
+
+# Rows that are not parts (same rules as the LLM prompt)
+IGNORE_ROW_PATTERN = re.compile(
+    r"\b(shipping|freight|tax|vat|total|subtotal|bank charges?|insurance|итого|доставка)\b",
+    re.IGNORECASE
+)
+
+METADATA_PATTERNS = {
+    "invoice_number": r"(?:proforma\s+)?(?:invoice|inv\.?|p/?i)\s*(?:no\.?|number|#)\s*[:：.]?\s*([A-Za-z0-9][\w\-/.]*)",
+    "invoice_date": r"(?:invoice\s+)?date\s*[:：]?\s*([A-Za-z0-9][\w .,/\-]{5,20}?\d{2,4})",
+    "contract_number": r"contract\s*(?:no\.?|number|#)\s*[:：.]?\s*([A-Za-z0-9][\w\-/.]*)",
+    "contract_date": r"contract\s+date\s*[:：]?\s*([A-Za-z0-9][\w .,/\-]{5,20}?\d{2,4})",
+    # Labelled party only ("Seller: Ningbo Trading Co., Ltd."), up to the end of the line or the buyer
+    "supplier": r"(?:seller|supplier|vendor|exporter|shipper|поставщик|продавец)\s*[:：][ \t]*"
+                r"([^\s:：][^\n]*?)\s*(?=\b(?:buyer|consignee|покупатель|грузополучатель)\b|\n|$)",
+}
+# Fields the LLM returns for the first page; all of them must be found to skip it
+METADATA_FIELDS = tuple(METADATA_PATTERNS)
+
+
+def _clean_cell(value) -> str:
+    if value is None:
+        return ""
+    return " ".join(str(value).replace("\n", " ").split())
+
+
+def _parse_number(value: str) -> Optional[float]:
+    """Parse '1,234.50', '$12.00' or '12,5' into a float."""
+    text = re.sub(r"[^\d,.\-]", "", value or "")
+    if not text:
+        return None
+    if "," in text and "." in text:
+        text = text.replace(",", "")          # 1,234.50
+    elif text.count(",") == 1 and len(text.split(",")[1]) != 3:
+        text = text.replace(",", ".")         # 12,5
+    else:
+        text = text.replace(",", "")          # 1,234
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _match_header(row: List[str]) -> Dict[str, int]:
+    """Map item fields to column indexes for a candidate header row."""
+    columns = {}
+    for col_idx, cell in enumerate(row):
+        text = cell.lower()
+        if not text:
+            continue
+        # Prefer the most specific synonym ("total price" over "price")
+        best_field, best_len = None, 0
+        for field, synonyms in HEADER_SYNONYMS.items():
+            if field in columns:
+                continue
+            for synonym in synonyms:
+                if synonym in text and len(synonym) > best_len:
+                    best_field, best_len = field, len(synonym)
+        if best_field:
+            columns[best_field] = col_idx
+    return columns
+
+
+def _looks_like_designation(value: str) -> bool:
+    return bool(value) and any(c.isdigit() for c in value) and len(value) <= 64
+
+
+def extract_table_items(table: List[List]) -> Optional[Dict]:
+    """
+    Extract items from one table (list of rows).
+
+    Returns {"items": [...], "rows": n, "valid_rows": n} or None if the
+    table has no recognizable header.
+    """
+    rows = [[_clean_cell(cell) for cell in row] for row in table if row]
+    header_idx, columns = None, {}
+    for idx, row in enumerate(rows[:3]):
+        candidate = _match_header(row)
+        if len(candidate) >= 2 and "quantity" in candidate and (
+            "designation" in candidate or "name" in candidate
+        ):
+            header_idx, columns = idx, candidate
+            break
+    if header_idx is None:
+        return None
+
+    def get(row, field):
+        idx = columns.get(field)
+        return row[idx] if idx is not None and idx < len(row) else ""
+
+    items = []
+    data_rows = 0
+    valid_rows = 0
+    for row in rows[header_idx + 1:]:
+        if not any(row):
+            continue
+        if IGNORE_ROW_PATTERN.search(" ".join(row)):
+            continue
+
+        data_rows += 1
+        designation = get(row, "designation")
+        name = get(row, "name")
+        quantity = _parse_number(get(row, "quantity"))
+        if not designation and _looks_like_designation(name.split(" ")[0] if name else ""):
+            designation = name.split(" ")[0]
+
+        if not designation and not name:
+            continue
+
+        if _looks_like_designation(designation) and quantity is not None and quantity > 0:
+            valid_rows += 1
+
+        items.append({
+            "designation": designation,
+            "description": get(row, "description"),
+            "material": get(row, "material"),
+            "name": name,
+            "quantity": int(quantity) if quantity and quantity.is_integer() else quantity,
+            "unit_price": _parse_number(get(row, "unit_price")),
+            "total_price": _parse_number(get(row, "total_price")),
+        })
+
+    return {"items": items, "rows": data_rows, "valid_rows": valid_rows}
+
+
+def extract_metadata(text: str) -> Dict:
+    """Find invoice/contract numbers, dates and the supplier in page text (None when not found)."""
+    metadata = {}
+    for field, pattern in METADATA_PATTERNS.items():
+        match = re.search(pattern, text or "", re.IGNORECASE)
+        value = match.group(1).strip() if match else None
+        if value and field.endswith("_date"):
+            value = normalize_date(value)
+        metadata[field] = value or None
+    return metadata
+
+
+class TextLayerExtractor:
+    """
+    Reads line items from the text layer of a PDF, page by page.
+
+    Usage:
+        with TextLayerExtractor(pdf_path) as extractor:
+            result = extractor.extract_page(0)
+            if result and result["confidence"] >= 0.9:
+                ...
+    """
+
+    def __init__(self, pdf_path: str):
+        self._pdf = pdfplumber.open(pdf_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._pdf.close()
+
+    def __len__(self) -> int:
+        return len(self._pdf.pages)
+
+    def page_text(self, page_index: int) -> str:
+        """Plain text of a page ('' for scanned pages)."""
+        return self._pdf.pages[page_index].extract_text() or ""
+
+    def extract_page(self, page_index: int) -> Optional[Dict]:
+        """
+        Extract items and metadata from one page.
+
+        Returns None for pages without a usable text layer, otherwise
+        {"items", "metadata", "confidence", "chars", "text", "tables", "page_size"}
+        (table bounding boxes and page size in PDF points). Confidence is the share
+        of table rows with a code-like designation and a positive quantity;
+        0 when no item table was recognized.
+        """
+        page = self._pdf.pages[page_index]
+        chars = len(page.chars)
+        if chars < MIN_TEXT_CHARS:
+            return None
+
+        items = []
+        rows = 0
+        valid_rows = 0
+        tables = page.find_tables()
+        for table in tables:
+            result = extract_table_items(table.extract())
+            if result is None:
+                continue
+            items.extend(result["items"])
+            rows += result["rows"]
+            valid_rows += result["valid_rows"]
+
+        confidence = valid_rows / rows if rows else 0.0
+        text = page.extract_text() or ""
+        metadata = extract_metadata(text)
+        page.flush_cache()
+
+        return {
+            "items": items,
+            "metadata": metadata,
+            "confidence": round(confidence, 3),
+            "chars": chars,
+            "text": text,
+            "tables": [list(table.bbox) for table in tables],
+            "page_size": [float(page.width), float(page.height)],
+        }
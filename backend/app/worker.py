@@ -0,0 +1,177 @@
+"""
+Background worker for invoice parse jobs.
+
+Pulls jobs from the Postgres-backed queue (see app/services/job_queue.py),
+parses and matches them, and stores the InvoiceUploadResponse on the job.
+Run as many worker processes as needed, independently of the API:
+
+    python -m app.worker                  # run until SIGTERM / Ctrl+C
+    python -m app.worker --concurrency 4  # jobs in parallel per process
+    python -m app.worker --once           # drain the queue, then exit
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+from typing import Dict
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.services import job_queue
+from app.services.invoice_matcher import match_parsed_items
+from app.services.llm_client import llm_client
+from app.services.parser import parse_invoice_async
+
+logger = logging.getLogger("app.worker")
+
+
+def _progress_handler(progress: Dict):
+    """on_event callback that counts parser progress events."""
+    def on_event(event: Dict) -> None:
+        if event["event"] == "page_rendered":
+            progress["pages_rendered"] += 1
+        elif event["event"] == "page_parsed":
+            progress["pages_parsed"] += 1
+            progress["items"] += len(event["items"])
+    return on_event
+
+
+async def _heartbeat_loop(job_id: int, worker_id: str, progress: Dict) -> None:
+    interval = max(1.0, settings.JOB_STALE_SECONDS / 3)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                await job_queue.heartbeat(db, job_id, worker_id, progress)
+        except Exception as e:
+            logger.warning(f"Heartbeat for job {job_id} failed: {e}")
+
+
+async def process_job(job, worker_id: str) -> None:
+    """Parse one claimed job and store its result, error or retry."""
+    job_id = job.id
+    progress = {"pages_rendered": 0, "pages_parsed": 0, "items": 0}
+    heartbeat = asyncio.ensure_future(_heartbeat_loop(job_id, worker_id, progress))
+
+    fd, temp_path = tempfile.mkstemp(suffix=".pdf", prefix=f"job{job_id}_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(job.pdf)
+
+        logger.info(f"Processing job {job_id} ({job.filename}), attempt {job.attempts}")
+        parsed_items, debug_info = await parse_invoice_async(
+            pdf_path=temp_path,
+            method=job.method,
+            use_cache=job.use_cache,
+            refresh_cache=job.refresh_cache,
+            on_event=_progress_handler(progress)
+        )
+        progress["items"] = len(parsed_items)
+
+        async with AsyncSessionLocal() as db:
+            response = await match_parsed_items(parsed_items, debug_info, db)
+            await job_queue.finish_job(
+                db, job_id, worker_id, progress, result=response.model_dump(mode="json")
+            )
+        logger.info(f"Job {job_id} done: {len(response.items)} items")
+
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+        async with AsyncSessionLocal() as db:
+            if job.attempts < settings.JOB_MAX_ATTEMPTS:
+                await job_queue.retry_job(db, job_id, worker_id, str(e))
+            else:
+                await job_queue.finish_job(db, job_id, worker_id, progress, error=str(e))
+
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+async def run_worker(
+    concurrency: int = 1,
+    once: bool = False,
+    poll_interval: float = 2,
+    stop: asyncio.Event = None
+) -> None:
+    """
+    Claim and process jobs until `stop` is set (or the queue is empty with `once`).
+
+    On stop, no new jobs are claimed and running jobs are allowed to finish;
+    jobs of a killed worker are re-queued once their heartbeat goes stale.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or asyncio.Event()
+    running = set()
+    logger.info(f"Worker {worker_id} started (concurrency={concurrency})")
+
+    try:
+        while not stop.is_set():
+            claimed = False
+            while len(running) < concurrency and not stop.is_set():
+                try:
+                    async with AsyncSessionLocal() as db:
+                        job = await job_queue.claim_job(db, worker_id)
+                except Exception as e:
+                    logger.error(f"Could not claim a job: {e}")
+                    job = None
+                if job is None:
+                    break
+                claimed = True
+                running.add(asyncio.ensure_future(process_job(job, worker_id)))
+
+            if once and not running and not claimed:
+                break
+
+            waiters = set(running)
+            stop_waiter = asyncio.ensure_future(stop.wait())
+            waiters.add(stop_waiter)
+            timeout = None if len(running) >= concurrency else poll_interval
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            stop_waiter.cancel()
+            running -= done
+
+        if running:
+            logger.info(f"Waiting for {len(running)} running jobs to finish")
+            await asyncio.gather(*running, return_exceptions=True)
+    finally:
+        await llm_client.aclose()
+        logger.info(f"Worker {worker_id} stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=settings.JOB_POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:  # Windows
+                pass
+        await run_worker(args.concurrency, once=args.once, poll_interval=args.poll_interval, stop=stop)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
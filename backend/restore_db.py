@@ -3,36 +3,26 @@ import os
 import json
 import re
 
+from app.services.image_index import ImageIndex
+
 # Configuration
 BACKEND_URL = "https://backend-service-841188097120.us-central1.run.app"
 FILE_PATH = r"d:\Work\_develop\_gen_for_ tamozh\_dev\PI PTJ20251023B1.pdf"
 IMAGES_DIR = r"d:\Work\_develop\_gen_for_ tamozh\_dev\_изображения"
 
+_image_index = None
+
 def find_local_image(designation):
+    global _image_index
     if not os.path.exists(IMAGES_DIR):
         return None
-    
-    image_files = os.listdir(IMAGES_DIR)
-    
-    # 1. Exact match
-    candidate = f"{designation}.jpg"
-    if candidate in image_files:
-        return os.path.join(IMAGES_DIR, candidate)
-        
-    # 2. Base match (remove suffix like -01)
-    # Heuristic: if it ends with a letter or -XX
-    if '-' in designation:
-        base_des = designation.rsplit('-', 1)[0]
-        candidate = f"{base_des}.jpg"
-        if candidate in image_files:
-            return os.path.join(IMAGES_DIR, candidate)
-            
-    # 3. Prefix match
-    for img in image_files:
-        if img.startswith(designation) and img.lower().endswith(('.jpg', '.jpeg', '.png')):
-            return os.path.join(IMAGES_DIR, img)
-            
-    return None
+
+    # Same lookup rules as the backend (exact -> token -> normalized -> base -> prefix)
+    if _image_index is None:
+        _image_index = ImageIndex(local_dir=IMAGES_DIR)
+        _image_index.refresh()
+    found = _image_index.lookup(designation)
+    return _image_index.local_path(found) if found else None
 
 def upload_image_to_backend(local_path):
     url = f"{BACKEND_URL}/api/v1/upload/image"
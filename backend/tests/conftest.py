@@ -1,5 +1,6 @@
 """Pytest configuration and fixtures."""
 import pytest
+from contextlib import asynccontextmanager
 from typing import Generator
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, Column, Integer, String, Float, Text
@@ -62,3 +63,179 @@ def client(db) -> Generator:
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+
+
+def _build_text_pdf(path, text_lines, table_rows, col_x, top=700, row_h=20):
+    """Write a one-page PDF with a text layer and a ruled table (no extra deps)."""
+    ops = [f"BT /F1 10 Tf {x} {y} Td ({text}) Tj ET" for x, y, text in text_lines]
+    if table_rows:
+        bottom = top - row_h * len(table_rows)
+        for r in range(len(table_rows) + 1):
+            y = top - r * row_h
+            ops.append(f"{col_x[0]} {y} m {col_x[-1]} {y} l S")
+        for x in col_x:
+            ops.append(f"{x} {top} m {x} {bottom} l S")
+        for r, row in enumerate(table_rows):
+            y = top - (r + 1) * row_h + 6
+            for c, cell in enumerate(row):
+                ops.append(f"BT /F1 9 Tf {col_x[c] + 3} {y} Td ({cell}) Tj ET")
+    stream = "\n".join(ops).encode("latin-1")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return str(path)
+
+
+@pytest.fixture
+def text_pdf(tmp_path):
+    """Factory for small text-layer invoice PDFs: text_pdf(text_lines, table_rows, col_x)."""
+    counter = {"n": 0}
+
+    def factory(text_lines, table_rows=None, col_x=None):
+        counter["n"] += 1
+        path = tmp_path / f"text_{counter['n']}.pdf"
+        return _build_text_pdf(path, text_lines, table_rows or [], col_x or [])
+
+    return factory
+
+
+class FakeResult:
+    """Query result: rows for .all(), entities for .scalars()."""
+
+    def __init__(self, rows=(), scalars=None):
+        self.rows = list(rows)
+        self._scalars = self.rows if scalars is None else list(scalars)
+
+    def scalars(self):
+        return FakeResult(self._scalars)
+
+    def all(self):
+        return list(self.rows)
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+
+def _lookup_filter(where):
+    """(column name, values) of a `column IN (...)` / `column == value` filter, else None."""
+    from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+
+    if not isinstance(where, BinaryExpression) or not isinstance(where.right, BindParameter):
+        return None
+    value = where.right.value
+    return getattr(where.left, "name", None), set(value) if isinstance(value, (list, tuple, set)) else {value}
+
+
+class FakeSession:
+    """
+    AsyncSession stand-in for service tests (no database needed).
+
+    - parts: Part objects returned by part queries; `designation` /
+      `designation_norm` IN or = filters are applied, other filters ignored.
+      Column selects (the catalog load) get them as CATALOG_FIELDS tuples
+    - version: answer to the catalog_version query
+    - results: values returned one per execute() instead (job queue)
+    - dialect: name of the bind dialect (None: no bind)
+    - error: raised by every execute()
+
+    Executed statements are kept in `statements`; `queries` labels them:
+    "version", "all" (unfiltered part query) or the sorted looked-up values.
+    """
+
+    def __init__(self, parts=(), version=0, results=None, dialect=None, error=None):
+        from types import SimpleNamespace
+
+        self.parts = list(parts)
+        self.version = version
+        self.results = None if results is None else list(results)
+        self.bind = SimpleNamespace(dialect=SimpleNamespace(name=dialect)) if dialect else None
+        self.error = error
+        self.statements = []
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.flushes = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        yield
+
+    async def execute(self, statement):
+        from app.services.catalog import CATALOG_FIELDS
+
+        self.statements.append(statement)
+        if self.error is not None:
+            raise self.error
+        if self.results is not None:
+            return FakeResult([self.results.pop(0) if self.results else None])
+        if "catalog_version" in str(statement):
+            self.queries.append("version")
+            return FakeResult([self.version])
+
+        parts = self.parts
+        lookup = _lookup_filter(getattr(statement, "whereclause", None))
+        if lookup and lookup[0] in ("designation", "designation_norm"):
+            column, wanted = lookup
+            parts = sorted((part for part in parts if getattr(part, column) in wanted), key=lambda part: part.designation)
+            self.queries.append(sorted(wanted))
+        else:
+            self.queries.append("all")
+        rows = [tuple(getattr(part, field, None) for field in CATALOG_FIELDS) for part in parts]
+        return FakeResult(rows, scalars=parts)
+
+    async def flush(self):
+        self.flushes += 1
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def make_session():
+    """Factory for FakeSession: make_session(parts, version=3, dialect="postgresql")."""
+    return FakeSession
+
+
+@pytest.fixture
+def fake_session() -> FakeSession:
+    """FakeSession without parts (nothing is found)."""
+    return FakeSession()
+
+
+@pytest.fixture
+def parsed_item():
+    """Factory for parser output items: parsed_item("R1.003", quantity=2)."""
+    from app.services.parser import _normalize_item
+
+    def factory(designation, quantity=1):
+        return _normalize_item({"designation": designation, "quantity": quantity}, "Groq Multi-Key")
+
+    return factory
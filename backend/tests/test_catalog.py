@@ -0,0 +1,142 @@
+"""Unit tests for catalog.py - in-process parts catalog snapshot."""
+
+
+def _parts(*designations):
+    from app.db.models import Part
+    return [Part(id=n, designation=d, name=f"Part {d}") for n, d in enumerate(designations, 1)]
+
+
+def _item(designation):
+    return {"designation": designation, "raw_description": "", "quantity": 1}
+
+
+class TestCatalogPart:
+    """Tests for the slim part record."""
+
+    def test_has_part_fields_without_instance_dict(self):
+        """Test that records carry every Part column and no per-instance __dict__."""
+        from app.services.catalog import CatalogPart
+
+        part = _parts("R1.003")[0]
+        part.specs = {"Род тока": "DC"}
+
+        record = CatalogPart.from_part(part)
+
+        assert record.designation == "R1.003"
+        assert record.name == "Part R1.003"
+        assert record.specs == {"Род тока": "DC"}
+        assert record.weight is None
+        assert not hasattr(record, "__dict__")
+
+
+class TestPartCatalog:
+    """Tests for PartCatalog."""
+
+    async def test_loads_once_per_version(self, make_session):
+        """Test that the catalog is loaded once and reloaded only when the version changes."""
+        from app.services.catalog import PartCatalog
+
+        catalog = PartCatalog()
+        db = make_session(_parts("R1.003", "R1.004"), version=3)
+
+        first = await catalog.snapshot(db)
+        second = await catalog.snapshot(db)
+        db.version = 4
+        third = await catalog.snapshot(db)
+
+        assert first is second
+        assert third is not first and third.version == 4
+        assert db.queries == ["version", "all", "version", "version", "all"]
+        assert first.get("R1.004").name == "Part R1.004"
+
+    async def test_check_interval(self, make_session):
+        """Test that version checks are skipped within the check interval."""
+        from app.services.catalog import PartCatalog
+
+        catalog = PartCatalog(check_interval=60)
+        db = make_session(_parts("R1.003"))
+
+        await catalog.snapshot(db)
+        await catalog.snapshot(db)
+
+        assert db.queries == ["version", "all"]
+
+    async def test_patch_own_write(self, make_session):
+        """Test that a write of this process patches the snapshot without a reload."""
+        from app.services.catalog import PartCatalog
+
+        catalog = PartCatalog()
+        db = make_session(_parts("R1.003"), version=1)
+        snapshot = await catalog.snapshot(db)
+        fuzzy = snapshot.fuzzy
+
+        renamed = _parts("R1.003-01")[0]
+        catalog.patch(renamed, 2, previous_designation="R1.003")
+        db.version = 2
+        patched = await catalog.snapshot(db)
+
+        assert db.queries == ["version", "all", "version"]
+        assert patched.version == 2
+        assert set(patched.parts) == {"R1.003-01"}
+        assert patched.fuzzy is not fuzzy
+        assert set(snapshot.parts) == {"R1.003"}  # Readers of the old snapshot are unaffected
+
+    async def test_field_update_keeps_fuzzy_index(self, make_session):
+        """Test that updating fields of a part reuses the trigram index."""
+        from app.services.catalog import PartCatalog
+
+        catalog = PartCatalog()
+        snapshot = await catalog.snapshot(make_session(_parts("R1.003"), version=1))
+        fuzzy = snapshot.fuzzy
+
+        part = _parts("R1.003")[0]
+        part.name = "Пластина"
+        catalog.patch(part, 2, previous_designation="R1.003")
+
+        assert catalog.stats == {"version": 2, "parts": 1, "reloads": 1}
+        assert catalog._snapshot.fuzzy is fuzzy
+        assert catalog._snapshot.get("R1.003").name == "Пластина"
+
+    async def test_written_version_flushes_first(self, make_session):
+        """Test that the version is read after the pending writes reached the trigger."""
+        from app.services.catalog import written_version
+
+        db = make_session(version=7)
+
+        assert await written_version(db) == 7
+        assert db.flushes == 1
+        assert db.queries == ["version"]
+
+    async def test_missed_write_invalidates(self, make_session):
+        """Test that a version gap (another process wrote) drops the snapshot."""
+        from app.services.catalog import PartCatalog
+
+        catalog = PartCatalog()
+        await catalog.snapshot(make_session(_parts("R1.003"), version=1))
+
+        catalog.patch(_parts("R1.004")[0], 3)
+
+        assert catalog.stats["version"] is None
+
+
+class TestMatcherOnSnapshot:
+    """Tests for PartMatcher on a catalog snapshot."""
+
+    async def test_matches_without_queries(self, make_session):
+        """Test that exact, base, normalized and fuzzy matches come from the snapshot only."""
+        from app.services.catalog import PartCatalog
+        from app.services.invoice_matcher import PartMatcher
+
+        db = make_session(_parts("R1.003", "BUSHING-1234"))
+        snapshot = await PartCatalog().snapshot(db)
+        db.queries.clear()
+
+        results = await PartMatcher(db, catalog=snapshot).match_items([
+            _item("R1.003"), _item("R1.003-01"), _item("BUSHlNG-1234"), _item("UNKNOWN"), _item("r1 003")
+        ])
+
+        assert db.queries == []
+        assert [item.found_in_db for item in results] == [True, True, True, False, True]
+        assert "[Base Match: R1.003]" in results[1].description
+        assert "[Fuzzy Match: BUSHING-1234]" in results[2].description
+        assert "[Normalized Match: R1.003]" in results[4].description
@@ -0,0 +1,152 @@
+"""Unit tests for catalog_file.py - memory-mapped catalog shared by workers."""
+import pytest
+
+
+def _item(designation):
+    return {"designation": designation, "raw_description": "", "quantity": 1}
+
+
+def _parts(*designations):
+    from app.db.models import Part
+
+    parts = []
+    for n, designation in enumerate(designations, 1):
+        part = Part(id=n, designation=designation, name=f"Part {designation}", weight=1.5)
+        if designation.startswith("MOTOR"):
+            part.specs = {"Род тока": "DC", "Момент": "2 Нм"}
+        parts.append(part)
+    return parts
+
+
+def _rows(*designations):
+    from app.services.catalog import CATALOG_FIELDS
+    return [tuple(getattr(part, field, None) for field in CATALOG_FIELDS) for part in _parts(*designations)]
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    return str(tmp_path / "parts.catalog")
+
+
+class TestCatalogFile:
+    """Tests for write_catalog_file / MappedCatalog."""
+
+    def test_round_trip(self, catalog_path):
+        """Test that records, including specs, are read back by designation."""
+        from app.services.catalog_file import MappedCatalog, write_catalog_file
+
+        assert write_catalog_file(catalog_path, 7, _rows("R1.003", "MOTOR-1", "A-100", "R1.003")) == 3
+        catalog = MappedCatalog(catalog_path)
+
+        assert catalog.version == 7
+        assert len(catalog) == 3
+        assert list(catalog.designations) == ["A-100", "MOTOR-1", "R1.003"]
+        assert "R1.003" in catalog.parts and "R1.004" not in catalog.parts
+        part = catalog.parts["MOTOR-1"]
+        assert part.name == "Part MOTOR-1"
+        assert part.weight == 1.5
+        assert part.specs == {"Род тока": "DC", "Момент": "2 Нм"}
+        assert catalog.get("R1.004") is None
+
+    def test_normalized_lookup(self, catalog_path):
+        """Test lookups by normalized key (case and separators ignored)."""
+        from app.services.catalog_file import MappedCatalog, write_catalog_file
+
+        write_catalog_file(catalog_path, 1, _rows("R1.01.00.001", "BUSHING-1234"))
+        catalog = MappedCatalog(catalog_path)
+
+        assert catalog.get_normalized("r1 01 00 001").designation == "R1.01.00.001"
+        assert catalog.get_normalized("bushing 1234").designation == "BUSHING-1234"
+        assert catalog.get_normalized("BUSHING-9999") is None
+
+    def test_fuzzy_matches_in_memory_index(self, catalog_path):
+        """Test that the mapped trigram index gives the same matches as FuzzyMatcher."""
+        from app.services.catalog_file import MappedCatalog, write_catalog_file
+        from app.services.fuzzy_matcher import FuzzyMatcher
+
+        designations = [f"R{a}.{b:03d}" for a in range(1, 20) for b in range(1, 60)] + ["BUSHING-1234"]
+        write_catalog_file(catalog_path, 1, _rows(*designations))
+        mapped = MappedCatalog(catalog_path).fuzzy
+        in_memory = FuzzyMatcher(sorted(designations))
+
+        queries = ["R1.0O3", "R12.O45", "BUSHlNG-1234", "R7.05", "UNKNOWN"]
+        assert mapped.best_many(queries) == in_memory.best_many(queries)
+        assert mapped.best("BUSHlNG-1234") == "BUSHING-1234"
+
+    def test_swap_keeps_old_mapping(self, catalog_path):
+        """Test that a rebuild replaces the file while old mappings stay readable."""
+        from app.services.catalog_file import MappedCatalog, write_catalog_file
+
+        write_catalog_file(catalog_path, 1, _rows("R1.003"))
+        old = MappedCatalog(catalog_path)
+        write_catalog_file(catalog_path, 2, _rows("R1.003", "R1.004"))
+        new = MappedCatalog(catalog_path)
+
+        assert (old.version, len(old)) == (1, 1)
+        assert old.get("R1.003").name == "Part R1.003"
+        assert (new.version, len(new)) == (2, 2)
+        assert new.identity != old.identity
+
+    def test_unusable_file(self, catalog_path):
+        """Test that missing and foreign files are ignored."""
+        from app.services.catalog_file import open_catalog_file
+
+        assert open_catalog_file(catalog_path) is None
+        with open(catalog_path, "wb") as f:
+            f.write(b"not a catalog" * 10)
+        assert open_catalog_file(catalog_path) is None
+
+
+class TestSharedPartCatalog:
+    """Tests for PartCatalog with CATALOG_FILE."""
+
+    async def test_built_once_mapped_by_other_workers(self, catalog_path, make_session):
+        """Test that the first worker builds the file and the others only map it."""
+        from app.services.catalog import PartCatalog
+        from app.services.catalog_file import MappedCatalog
+
+        db = make_session(_parts("R1.003", "R1.004"), version=5)
+        first = await PartCatalog(path=catalog_path).snapshot(db)
+        other_db = make_session([], version=5)
+        second = await PartCatalog(path=catalog_path).snapshot(other_db)
+
+        assert isinstance(first, MappedCatalog) and isinstance(second, MappedCatalog)
+        assert db.queries == ["version", "all"]
+        assert other_db.queries == ["version"]
+        assert second.get("R1.004").name == "Part R1.004"
+
+    async def test_rebuilt_on_new_version(self, catalog_path, make_session):
+        """Test that a version bump (or a local write) rebuilds the file."""
+        from app.services.catalog import PartCatalog
+        from app.db.models import Part
+
+        catalog = PartCatalog(path=catalog_path)
+        db = make_session(_parts("R1.003"), version=1)
+        await catalog.snapshot(db)
+
+        db.parts = _parts("R1.003", "R1.005")
+        catalog.patch(Part(id=2, designation="R1.005"), 2)
+        db.version = 2
+        snapshot = await catalog.snapshot(db)
+
+        assert snapshot.version == 2
+        assert "R1.005" in snapshot.parts
+        assert db.queries == ["version", "all", "version", "all"]
+
+    async def test_matcher_on_mapped_catalog(self, catalog_path, make_session):
+        """Test that PartMatcher matches against the mapped file without queries."""
+        from app.services.catalog import PartCatalog
+        from app.services.invoice_matcher import PartMatcher
+
+        db = make_session(_parts("R1.003", "BUSHING-1234"))
+        snapshot = await PartCatalog(path=catalog_path).snapshot(db)
+        db.queries.clear()
+
+        results = await PartMatcher(db, catalog=snapshot).match_items([
+            _item("R1.003-01"), _item("BUSHlNG-1234"), _item("UNKNOWN"), _item("bushing 1234")
+        ])
+
+        assert db.queries == []
+        assert [item.found_in_db for item in results] == [True, True, False, True]
+        assert "[Normalized Match: BUSHING-1234]" in results[3].description
+        assert "[Fuzzy Match: BUSHING-1234]" in results[1].description
@@ -0,0 +1,79 @@
+"""Unit tests for fuzzy_matcher.py - trigram candidate index for designations."""
+import random
+
+
+def _catalog(size, seed=7):
+    rng = random.Random(seed)
+    values = set()
+    while len(values) < size:
+        kind = rng.random()
+        if kind < 0.5:
+            values.add(f"R{rng.randint(1, 9)}.{rng.randint(0, 99):02d}.{rng.randint(0, 99):02d}.{rng.randint(0, 999):03d}")
+        elif kind < 0.8:
+            values.add(f"{rng.randint(1000, 9999)}-{rng.randint(0, 9999):04d}{rng.choice('abc')}")
+        else:
+            values.add(f"{rng.choice(['SKF', 'NSK', 'FAG'])}{rng.randint(6000, 6400)}-{rng.choice(['2RS', 'ZZ', 'C3'])}")
+    return sorted(values)
+
+
+def _typo(value, rng):
+    position = rng.randrange(len(value))
+    action = rng.random()
+    if action < 0.4:
+        return value[:position] + rng.choice("0123456789OIl") + value[position + 1:]
+    if action < 0.7:
+        return value[:position] + value[position + 1:]
+    return value[:position] + rng.choice(".-0") + value[position:]
+
+
+class TestFuzzyMatcher:
+    """Tests for FuzzyMatcher."""
+
+    def test_same_result_as_difflib(self):
+        """Test top-1/cutoff parity with difflib.get_close_matches on typos."""
+        import difflib
+        from app.services.fuzzy_matcher import FuzzyMatcher
+
+        def ratio(query, value):
+            return difflib.SequenceMatcher(None, value, query).ratio()
+
+        catalog = _catalog(1000)
+        matcher = FuzzyMatcher(catalog)
+        rng = random.Random(3)
+        queries = [_typo(rng.choice(catalog), rng) for _ in range(200)] + ["UNKNOWN-PART", "R1"]
+
+        same = 0
+        for query in queries:
+            expected = difflib.get_close_matches(query, catalog, n=1, cutoff=0.8)
+            found = matcher.best(query)
+            if not expected:
+                assert found is None, query
+                continue
+            # Equally scored entries may be picked in another order than difflib's
+            assert found is not None and ratio(query, found) == ratio(query, expected[0]), query
+            same += found == expected[0]
+        assert same >= 0.9 * len(queries)
+
+    def test_prunes_candidates(self):
+        """Test that only a small candidate set is scored on a large catalog."""
+        from app.services.fuzzy_matcher import FuzzyMatcher
+
+        catalog = _catalog(20000)
+        matcher = FuzzyMatcher(catalog, max_candidates=20)
+
+        assert len(matcher.candidates("R1.03.05.O17")) <= 20
+        assert matcher.best(catalog[123]) == catalog[123]
+
+    def test_best_many_and_duplicates(self):
+        """Test batch lookups and that duplicate catalog values are indexed once."""
+        from app.services.fuzzy_matcher import FuzzyMatcher
+
+        matcher = FuzzyMatcher(["R1.003", "R1.003", "BUSHING-1234", ""])
+
+        assert len(matcher) == 2
+        assert matcher.best_many(["R1.0O3", "BUSHlNG-1234", "XYZ", "R1.0O3"]) == {
+            "R1.0O3": "R1.003",
+            "BUSHlNG-1234": "BUSHING-1234",
+            "XYZ": None,
+        }
+        assert matcher.best("") is None
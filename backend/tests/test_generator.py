@@ -138,6 +138,29 @@ class TestDocumentGeneration:
                 os.unlink(output_path)
 
 
+    def test_technical_description_embeds_converted_image(self, tmp_path, monkeypatch):
+        """Test that an image_path pointing at a WebP conversion ends up in the document."""
+        from types import SimpleNamespace
+        from docx import Document
+        from PIL import Image
+        from app.services import image_processor
+        from app.services.generator import generate_technical_description
+
+        monkeypatch.setattr(image_processor, "IMAGES_DIR", str(tmp_path))
+        filename = image_processor.process_and_save_image(Image.new("RGB", (60, 40), "red"))
+        part = SimpleNamespace(
+            designation="R1.003", name="Plate", material="Steel", weight=1.5, weight_unit="кг",
+            dimensions="100x50x25", description=None, image_path=filename, component_type=None,
+            specs=None, manufacturer=None, condition=None, tnved_code=None, tnved_description=None,
+        )
+        output_path = str(tmp_path / "description.docx")
+
+        with patch("app.services.generator.s3_service.get_file", return_value=None) as get_file:
+            generate_technical_description(items=[part], output_path=output_path)
+
+        get_file.assert_not_called()
+        assert len(Document(output_path).inline_shapes) >= 1
+
 class TestElectronicsDetection:
     """Tests for electronics vs mechanical part detection logic."""
 
@@ -0,0 +1,235 @@
+"""
+Tests for hedged LLM requests (app/services/hedging.py and _process_page_hedged).
+"""
+import pytest
+
+
+class TestLatencyTracker:
+    """Tests for the rolling latency window."""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles over the window."""
+        from app.services.hedging import LatencyTracker
+
+        tracker = LatencyTracker(window=10)
+        assert tracker.percentile(90) is None
+        for seconds in range(1, 11):
+            tracker.record(seconds)
+
+        assert tracker.percentile(90) == 9
+        assert tracker.percentile(50) == 5
+
+    def test_window_drops_old_samples(self):
+        """Test that only the latest samples count."""
+        from app.services.hedging import LatencyTracker
+
+        tracker = LatencyTracker(window=3)
+        for seconds in (100, 1, 2, 3):
+            tracker.record(seconds)
+
+        assert len(tracker) == 3
+        assert tracker.percentile(100) == 3
+
+    def test_delay_needs_samples_and_is_clamped(self):
+        """Test the hedge delay: None while warming up, then p90 within the limits."""
+        from unittest.mock import patch
+        from app.services.hedging import LatencyTracker, hedge_delay
+
+        tracker = LatencyTracker()
+        with patch.multiple("app.services.hedging.settings", HEDGE_MIN_SAMPLES=5, HEDGE_PERCENTILE=90,
+                            HEDGE_MIN_DELAY=2, HEDGE_MAX_DELAY=20):
+            for _ in range(4):
+                tracker.record(10)
+            assert hedge_delay(tracker) is None
+
+            tracker.record(10)
+            assert hedge_delay(tracker) == 10
+
+            for _ in range(5):
+                tracker.record(0.1)
+            assert hedge_delay(tracker) == 10  # p90 still covers the slow samples
+            for _ in range(50):
+                tracker.record(0.1)
+            assert hedge_delay(tracker) == 2
+
+
+class TestHedgeBudget:
+    """Tests for the extra-request budget."""
+
+    def test_hedges_limited_by_ratio(self):
+        """Test that hedges never exceed ratio * pages."""
+        from app.services.hedging import HedgeBudget
+
+        budget = HedgeBudget(0.25)
+        allowed = 0
+        for _ in range(20):
+            budget.earn()
+            allowed += budget.try_spend()
+
+        assert allowed == 5
+        assert budget.spent == 5
+
+    def test_credits_are_capped(self):
+        """Test that idle periods cannot bank an unlimited burst of hedges."""
+        from app.services.hedging import HedgeBudget
+
+        budget = HedgeBudget(1.0, max_credits=2)
+        for _ in range(10):
+            budget.earn()
+
+        assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+
+
+class TestRunHedged:
+    """Tests for run_hedged."""
+
+    @staticmethod
+    def _budget(ratio=1.0):
+        from app.services.hedging import HedgeBudget
+        return HedgeBudget(ratio)
+
+    async def test_fast_primary_is_not_hedged(self):
+        """Test that no duplicate is sent when the primary finishes in time."""
+        from app.services.hedging import run_hedged
+
+        calls = []
+
+        async def primary():
+            return "primary"
+
+        async def hedge():
+            calls.append("hedge")
+            return "hedge"
+
+        result, winner = await run_hedged(primary, hedge, 1.0, bool, self._budget())
+
+        assert (result, winner) == ("primary", None)
+        assert calls == []
+
+    async def test_slow_primary_loses_and_is_cancelled(self):
+        """Test that the hedge wins against a stuck primary, which gets cancelled."""
+        import asyncio
+        from app.services.hedging import run_hedged
+        from app.services.metrics import HEDGE_REQUESTS_TOTAL
+
+        cancelled = []
+
+        async def primary():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append("primary")
+                raise
+
+        async def hedge():
+            return "hedge"
+
+        won_before = HEDGE_REQUESTS_TOTAL.value(outcome="won")
+        result, winner = await run_hedged(primary, hedge, 0.01, bool, self._budget())
+
+        assert (result, winner) == ("hedge", "hedge")
+        assert cancelled == ["primary"]
+        assert HEDGE_REQUESTS_TOTAL.value(outcome="won") == won_before + 1
+
+    async def test_invalid_hedge_waits_for_primary(self):
+        """Test that a failed hedge does not win over a later valid primary."""
+        import asyncio
+        from app.services.hedging import run_hedged
+
+        async def primary():
+            await asyncio.sleep(0.05)
+            return "primary"
+
+        async def hedge():
+            return ""
+
+        result, winner = await run_hedged(primary, hedge, 0.01, bool, self._budget())
+
+        assert (result, winner) == ("primary", "primary")
+
+    async def test_exhausted_budget_skips_hedge(self):
+        """Test that without credits the primary is awaited alone."""
+        import asyncio
+        from app.services.hedging import run_hedged
+
+        calls = []
+
+        async def primary():
+            await asyncio.sleep(0.03)
+            return "primary"
+
+        async def hedge():
+            calls.append("hedge")
+            return "hedge"
+
+        result, winner = await run_hedged(primary, hedge, 0.01, bool, self._budget(ratio=0.1))
+
+        assert (result, winner) == ("primary", None)
+        assert calls == []
+
+    async def test_cancel_cancels_both(self):
+        """Test that cancelling the caller cancels primary and hedge."""
+        import asyncio
+        from app.services.hedging import run_hedged
+
+        cancelled = []
+
+        def slow(name):
+            async def run():
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(name)
+                    raise
+            return run
+
+        task = asyncio.ensure_future(run_hedged(slow("primary"), slow("hedge"), 0.01, bool, self._budget()))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert sorted(cancelled) == ["hedge", "primary"]
+
+
+class TestProcessPageHedged:
+    """Tests for _process_page_hedged with a real KeyPool."""
+
+    async def test_hedge_uses_other_key(self):
+        """Test that the duplicate request goes to a different key and the stuck one is released."""
+        import asyncio
+        import json
+        from unittest.mock import patch
+        import httpx
+        from app.services.hedging import HedgeBudget, LatencyTracker
+        from app.services.key_pool import KeyPool
+        from app.services.llm_client import LLMClient
+        from app.services.parser import _process_page_hedged
+
+        used_keys = []
+
+        async def handler(request):
+            used_keys.append(request.headers["Authorization"])
+            if request.headers["Authorization"] == "Bearer key-a":
+                await asyncio.sleep(10)
+            body = {"choices": [{"message": {"content": json.dumps({"items": [{"designation": "R1.003"}]})}}]}
+            return httpx.Response(200, json=body)
+
+        tracker = LatencyTracker()
+        for _ in range(3):
+            tracker.record(0.01)
+        pool = KeyPool(["key-a", "key-b"])
+        client = LLMClient(transport=httpx.MockTransport(handler))
+        with patch.multiple("app.services.hedging.settings", HEDGE_MIN_SAMPLES=3, HEDGE_PERCENTILE=90,
+                            HEDGE_MIN_DELAY=0.01, HEDGE_MAX_DELAY=1), \
+                patch("app.services.parser.page_latency", tracker), \
+                patch("app.services.parser.hedge_budget", HedgeBudget(1.0)):
+            items, _, logs = await _process_page_hedged(0, "b64", ["model"], pool, client=client)
+
+        assert items == [{"designation": "R1.003"}]
+        assert used_keys == ["Bearer key-a", "Bearer key-b"]
+        assert logs[-1] == {"page": 1, "status": "hedged", "winner": "hedge"}
+        stuck = pool.stats[0]
+        assert stuck["in_flight"] == 0
+        assert stuck["failures"] == 0
+        assert len(tracker) == 4
@@ -0,0 +1,187 @@
+"""Unit tests for image_index.py and core/designation.py."""
+import os
+
+import pytest
+
+
+@pytest.fixture
+def images_dir(tmp_path):
+    for name in ("R1.003.jpg", "R1.003.webp", "R1.301 Пластина.webp", "R2.10.00.001.png",
+                 "R3.500-XL.webp", "notes.txt"):
+        (tmp_path / name).write_bytes(b"x")
+    return tmp_path
+
+
+class TestNormalizeDesignation:
+    """Tests for designation helpers."""
+
+    def test_normalize(self):
+        """Test that only lowercase alphanumerics are kept."""
+        from app.core.designation import normalize_designation
+
+        assert normalize_designation("R1.01-00 A") == "r10100a"
+        assert normalize_designation(None) == ""
+
+    def test_base_designations(self):
+        """Test suffix and dash variant stripping."""
+        from app.core.designation import base_designations
+
+        assert base_designations("R1.01.00.001a") == ["R1.01.00.001"]
+        assert base_designations("R1.003-01") == ["R1.003"]
+        assert base_designations("R1.003") == []
+
+
+class TestImageIndexLookup:
+    """Tests for ImageIndex.lookup over a local directory."""
+
+    def test_lookup_order(self, images_dir):
+        """Test exact, token, normalized, base and prefix lookups."""
+        from app.services.image_index import ImageIndex
+
+        index = ImageIndex(local_dir=str(images_dir))
+        index.refresh()
+
+        assert index.lookup("R1.003") == "R1.003.webp"  # WebP preferred
+        assert index.lookup("R1.301") == "R1.301 Пластина.webp"
+        assert index.lookup("r2 10 00 001") == "R2.10.00.001.png"
+        assert index.lookup("R1.003a") == "R1.003.webp"
+        assert index.lookup("R1.003-02") == "R1.003.webp"
+        assert index.lookup("R3.500") == "R3.500-XL.webp"
+        assert index.lookup("R9.999") is None
+        assert index.lookup("") is None
+        assert index.stats["local_files"] == 5
+
+    def test_strict_lookup_and_extensions(self, images_dir):
+        """Test that strict lookups skip base/prefix matches and extensions limit the files."""
+        from app.services.image_index import ImageIndex
+
+        index = ImageIndex(local_dir=str(images_dir), extensions=(".webp",))
+        index.refresh()
+
+        assert index.lookup("R1.003", strict=True) == "R1.003.webp"
+        assert index.lookup("r1-003", strict=True) == "R1.003.webp"
+        assert index.lookup("R1.301", strict=True) == "R1.301 Пластина.webp"
+        assert index.lookup("R1.003a", strict=True) is None
+        assert index.lookup("R3.500", strict=True) is None
+        assert index.lookup("R2.10.00.001", strict=True) is None  # Only a PNG
+        assert index.stats["local_files"] == 3
+
+    def test_local_path(self, images_dir):
+        """Test that local files resolve to paths inside the directory."""
+        from app.services.image_index import ImageIndex
+
+        index = ImageIndex(local_dir=str(images_dir))
+        index.refresh()
+
+        assert index.local_path("R1.003.webp") == os.path.join(str(images_dir), "R1.003.webp")
+        assert index.local_path("unknown.webp") is None
+
+    def test_rescans_only_when_directory_changes(self, images_dir):
+        """Test that refresh() is a no-op until the directory mtime changes."""
+        from app.services.image_index import ImageIndex
+
+        index = ImageIndex(local_dir=str(images_dir))
+        index.refresh()
+        index.refresh()
+        assert index.rebuilds == 1
+
+        (images_dir / "R4.001.webp").write_bytes(b"x")
+        os.utime(images_dir, ns=(0, os.stat(images_dir).st_mtime_ns + 1_000_000))
+        index.refresh()
+
+        assert index.rebuilds == 2
+        assert index.lookup("R4.001") == "R4.001.webp"
+
+    def test_missing_directory(self, tmp_path):
+        """Test that a missing directory gives an empty index."""
+        from app.services.image_index import ImageIndex
+
+        index = ImageIndex(local_dir=str(tmp_path / "missing"))
+        index.refresh()
+
+        assert index.lookup("R1.003") is None
+
+
+class TestImageIndexS3:
+    """Tests for S3 objects in the index."""
+
+    def test_s3_only_objects_are_found(self, images_dir):
+        """Test that bucket objects are indexed and local files win on conflicts."""
+        from unittest.mock import patch
+        from app.services.image_index import ImageIndex
+
+        keys = ["R1.003.webp", "R7.100.webp", "readme.md"]
+        index = ImageIndex(local_dir=str(images_dir), use_s3=True, s3_refresh_seconds=300)
+        with patch("app.services.s3.s3_service.list_objects", return_value=keys) as list_objects:
+            index.refresh()
+            index.refresh()
+
+        list_objects.assert_called_once()
+        assert index.lookup("R7.100") == "R7.100.webp"
+        assert index.local_path("R7.100.webp") is None
+        assert index.local_path(index.lookup("R1.003")) is not None
+        assert index.stats["s3_objects"] == 2
+
+    def test_failed_listing_keeps_previous(self, images_dir):
+        """Test that a listing error keeps the last good S3 listing."""
+        from unittest.mock import patch
+        from app.services.image_index import ImageIndex
+
+        index = ImageIndex(local_dir=str(images_dir), use_s3=True, s3_refresh_seconds=0)
+        with patch("app.services.s3.s3_service.list_objects", return_value=["R7.100.webp"]):
+            index.refresh()
+        with patch("app.services.s3.s3_service.list_objects", return_value=None):
+            index.refresh()
+
+        assert index.lookup("R7.100") == "R7.100.webp"
+
+
+class TestAttachImages:
+    """Tests for parser.attach_images using the shared index."""
+
+    def test_attaches_webp_and_s3_images(self, images_dir, monkeypatch):
+        """Test that WebP and S3-only images are attached without conversion."""
+        from unittest.mock import patch
+        from app.services import image_index as image_index_module
+        from app.services.image_index import ImageIndex
+        from app.services.parser import attach_images
+
+        index = ImageIndex(local_dir=str(images_dir), use_s3=True)
+        monkeypatch.setattr(image_index_module, "image_index", index)
+        items = [{"designation": "R1.003a"}, {"designation": "R7.100"}, {"designation": ""}]
+        with patch("app.services.s3.s3_service.list_objects", return_value=["R7.100.webp"]), \
+                patch("app.services.image_processor.process_and_save_image") as convert:
+            attach_images(items)
+
+        convert.assert_not_called()
+        assert items[0]["image_path"] == "R1.003.webp"
+        assert items[1]["image_path"] == "R7.100.webp"
+        assert "image_path" not in items[2]
+
+    def test_local_jpeg_uses_cached_conversion(self, tmp_path, monkeypatch):
+        """Test that a converted JPEG is reused and a new one is queued in the background."""
+        from PIL import Image
+        from app.core.config import settings
+        from app.services import image_index as image_index_module
+        from app.services import image_processor
+        from app.services.image_index import ImageIndex
+        from app.services.parser import attach_images
+
+        source_dir = tmp_path / "src"
+        source_dir.mkdir()
+        Image.new("RGB", (40, 40), "red").save(source_dir / "R5.001.jpg", "JPEG")
+        converted_dir = tmp_path / "converted"
+        converted_dir.mkdir()
+        monkeypatch.setattr(image_processor, "IMAGES_DIR", str(converted_dir))
+        monkeypatch.setattr(settings, "IMAGE_CONVERT_BACKGROUND", True)
+        monkeypatch.setattr(image_index_module, "image_index", ImageIndex(local_dir=str(source_dir)))
+
+        first = [{"designation": "R5.001"}]
+        attach_images(first)
+        image_processor.wait_for_conversions(timeout=10)
+        second = [{"designation": "R5.001"}]
+        attach_images(second)
+
+        assert first[0]["image_path"] == "R5.001.jpg"
+        assert second[0]["image_path"].endswith(".webp")
+        assert os.listdir(converted_dir / "converted") == [second[0]["image_path"]]
@@ -0,0 +1,132 @@
+"""Unit tests for image_processor.py - content-addressed WebP conversion."""
+import os
+
+import pytest
+from PIL import Image
+
+
+@pytest.fixture
+def images_dir(tmp_path, monkeypatch):
+    from app.services import image_processor
+
+    target = tmp_path / "images"
+    target.mkdir()
+    monkeypatch.setattr(image_processor, "IMAGES_DIR", str(target))
+    return target
+
+
+def _source(tmp_path, name="R1.003.jpg", color="red", size=(1600, 800)):
+    path = tmp_path / name
+    Image.new("RGB", size, color).save(path, "JPEG")
+    return str(path)
+
+
+class TestConvertImageFile:
+    """Tests for convert_image_file."""
+
+    def test_converts_once(self, tmp_path, images_dir):
+        """Test that the same source is converted once and reused."""
+        from unittest.mock import patch
+        from app.services import image_processor
+
+        source = _source(tmp_path)
+        first = image_processor.convert_image_file(source)
+        with patch.object(image_processor, "_save_webp") as save:
+            second = image_processor.convert_image_file(source)
+
+        save.assert_not_called()
+        assert first == second
+        assert first.endswith(".webp")
+        # Outside the directory scanned by the image index
+        assert os.listdir(images_dir) == ["converted"]
+        assert os.listdir(images_dir / "converted") == [first]
+        with Image.open(image_processor.get_image_path(first)) as img:
+            assert max(img.size) == image_processor.MAX_IMAGE_DIMENSION
+
+    def test_identical_content_shares_file(self, tmp_path, images_dir):
+        """Test that copies of one image under different names map to one WebP."""
+        from app.services.image_processor import convert_image_file
+
+        a = _source(tmp_path, "a.jpg")
+        b = tmp_path / "b.jpg"
+        b.write_bytes(open(a, "rb").read())
+
+        assert convert_image_file(a) == convert_image_file(str(b))
+        assert convert_image_file(_source(tmp_path, "c.jpg", color="blue")) != convert_image_file(a)
+        assert len(os.listdir(images_dir / "converted")) == 2
+
+    def test_quality_change_gives_new_file(self, tmp_path, images_dir, monkeypatch):
+        """Test that target parameters are part of the filename."""
+        from app.services import image_processor
+
+        source = _source(tmp_path)
+        first = image_processor.convert_image_file(source)
+        monkeypatch.setattr(image_processor, "IMAGE_QUALITY", 60)
+
+        assert image_processor._target_filename(b"x") != first
+        assert image_processor.convert_image_file(source) == first  # memoized by file stat
+        image_processor._file_target.cache_clear()
+        assert image_processor.convert_image_file(source) != first
+
+
+    def test_conversions_stay_out_of_image_index(self, images_dir):
+        """Test that conversions neither re-index the images dir nor match designation lookups."""
+        from app.services.image_index import ImageIndex
+        from app.services.image_processor import convert_image_file
+
+        source = _source(images_dir)
+        index = ImageIndex(local_dir=str(images_dir))
+        index.refresh()
+
+        filename = convert_image_file(source)
+        index.refresh()
+
+        assert index.rebuilds == 1
+        assert index.lookup(filename[:3]) is None
+        assert index.lookup("R1.003") == "R1.003.jpg"
+
+
+class TestConvertedFilenameCache:
+    """Tests for the bounded filename cache."""
+
+    def test_cache_is_bounded(self, tmp_path, images_dir):
+        """Test that remembered source files are capped at CONVERTED_CACHE_SIZE."""
+        from app.services import image_processor
+
+        image_processor._file_target.cache_clear()
+        for n in range(3):
+            image_processor.converted_filename(_source(tmp_path, f"{n}.jpg", size=(8, 8)))
+
+        info = image_processor._file_target.cache_info()
+        assert info.maxsize == image_processor.CONVERTED_CACHE_SIZE
+        assert info.currsize == 3
+
+
+class TestBackgroundConversion:
+    """Tests for get_converted_image."""
+
+    def test_queues_then_reuses(self, tmp_path, images_dir):
+        """Test that the first call schedules the conversion and later calls reuse it."""
+        from app.services.image_processor import get_converted_image, wait_for_conversions
+
+        source = _source(tmp_path)
+
+        assert get_converted_image(source) is None
+        wait_for_conversions(timeout=10)
+        filename = get_converted_image(source)
+
+        assert filename is not None
+        assert os.listdir(images_dir / "converted") == [filename]
+
+
+class TestProcessAndSaveImage:
+    """Tests for process_and_save_image."""
+
+    def test_same_pixels_same_file(self, images_dir):
+        """Test that saving the same PIL image twice does not create a second file."""
+        from app.services.image_processor import process_and_save_image
+
+        image = Image.new("RGB", (50, 50), "green")
+
+        assert process_and_save_image(image) == process_and_save_image(image.copy())
+        assert len(os.listdir(images_dir / "converted")) == 1
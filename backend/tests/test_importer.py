@@ -67,12 +67,50 @@ class TestCleanStr:
 class TestImportPartsFromExcel:
     """Integration tests for import_parts_from_excel."""
 
-    @pytest.mark.skip(reason="Requires database session and Excel file")
-    def test_import_creates_parts(self):
+    @pytest.fixture
+    def run_import(self, tmp_path):
+        """Import a sheet with a mocked session and an images dir holding R1.003.png."""
+        from app.services import importer
+        from app.services.image_index import ImageIndex
+
+        (tmp_path / "R1.003.png").write_bytes(b"png")
+        sheet = pd.DataFrame([
+            ["Обозначение", "Наименование", "Масса"],
+            ["R1.003", "Пластина", "1,5"],
+            ["R9.999", "Без изображения", "2"],
+        ])
+
+        def run(existing=None):
+            db = MagicMock()
+            db.query.return_value.filter.return_value.first.return_value = existing
+            db.query.return_value.filter.return_value.order_by.return_value.first.return_value = None
+            with patch.object(importer.pd, "read_excel", return_value=sheet), \
+                    patch.object(importer, "get_image_index", return_value=ImageIndex(local_dir=str(tmp_path))):
+                importer.import_parts_from_excel("parts.xls", db)
+            return db
+
+        return run
+
+    def test_import_creates_parts(self, run_import):
         """Test that importing Excel creates Part records."""
-        pass
+        db = run_import()
 
-    @pytest.mark.skip(reason="Requires database session and Excel file")
-    def test_import_updates_existing_parts(self):
+        added = [call.args[0] for call in db.add.call_args_list]
+        assert [part.designation for part in added] == ["R1.003"]
+        assert added[0].name == "Пластина"
+        assert added[0].weight == 1.5
+        assert added[0].image_path == "R1.003.png"
+        db.rollback.assert_not_called()
+        db.commit.assert_called()
+
+    def test_import_updates_existing_parts(self, run_import):
         """Test that importing updates existing Part records."""
-        pass
+        from app.db.models import Part
+
+        existing = Part(designation="R1.003", name="Old")
+        db = run_import(existing=existing)
+
+        db.add.assert_not_called()
+        db.rollback.assert_not_called()
+        assert existing.name == "Пластина"
+        assert existing.image_path == "R1.003.png"
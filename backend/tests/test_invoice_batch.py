@@ -0,0 +1,128 @@
+"""Unit tests for the batch invoice upload (process_invoice_batch)."""
+
+
+class TestProcessInvoiceBatch:
+    """Tests for process_invoice_batch."""
+
+    async def test_dedup_and_merge(self, monkeypatch, fake_session, parsed_item):
+        """Test that identical files are parsed once and items are merged."""
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints.invoices import process_invoice_batch
+        from app.services import invoice_matcher
+        from app.services.catalog import PartCatalog
+
+        parsed = {
+            b"invoice-a": [parsed_item("R1.003", 2), parsed_item("R1.004", 1)],
+            b"invoice-b": [parsed_item("R1.003", 5), parsed_item("R1.005", 3)],
+        }
+        calls = []
+
+        async def fake_parse(pdf_path, page_semaphore=None, **kwargs):
+            with open(pdf_path, "rb") as f:
+                contents = f.read()
+            calls.append((contents, page_semaphore))
+            return parsed[contents], {"error": None, "page_count": 1, "invoice_metadata": {}}
+
+        files = [("a.pdf", b"invoice-a"), ("b.pdf", b"invoice-b"), ("a-copy.pdf", b"invoice-a")]
+        monkeypatch.setattr(invoice_matcher, "part_catalog", PartCatalog())
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=fake_parse):
+            response = await process_invoice_batch(files, "groq", None, fake_session)
+
+        assert sorted(contents for contents, _ in calls) == [b"invoice-a", b"invoice-b"]
+        # All invoices share one page budget
+        assert calls[0][1] is calls[1][1]
+        assert [r.filename for r in response.invoices] == ["a.pdf", "b.pdf", "a-copy.pdf"]
+        assert response.invoices[2].duplicate_of == "a.pdf"
+        assert response.invoices[0].duplicate_of is None
+        assert {i.designation: i.quantity for i in response.items} == {"R1.003": 7, "R1.004": 1, "R1.005": 3}
+        assert response.stats["duplicates"] == 1
+        assert response.stats["pages"] == 2
+        # One catalog version check and snapshot load for the whole batch, no per-invoice lookups
+        assert fake_session.queries == ["version", "all"]
+
+    async def test_failed_file_does_not_fail_batch(self, fake_session, parsed_item):
+        """Test that one broken file is reported and the others still succeed."""
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints.invoices import process_invoice_batch
+
+        async def fake_parse(pdf_path, **kwargs):
+            with open(pdf_path, "rb") as f:
+                if f.read() == b"broken":
+                    raise RuntimeError("not a PDF")
+            return [parsed_item("R1.003")], {"error": None, "page_count": 1}
+
+        files = [("ok.pdf", b"fine"), ("broken.pdf", b"broken")]
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=fake_parse):
+            response = await process_invoice_batch(files, "groq", None, fake_session)
+
+        assert response.invoices[1].error == "not a PDF"
+        assert response.stats["failed"] == 1
+        assert [i.designation for i in response.items] == ["R1.003"]
+
+    async def test_page_budget_bounded_by_healthy_keys(self, monkeypatch, fake_session):
+        """Test that the shared page budget never exceeds the healthy keys."""
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints import invoices
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "BATCH_PAGE_CONCURRENCY", 8)
+        monkeypatch.setattr(invoices.key_pool, "healthy_count", lambda: 3)
+
+        async def fake_parse(pdf_path, **kwargs):
+            return [], {"error": None, "page_count": 0}
+
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=fake_parse):
+            response = await invoices.process_invoice_batch([("a.pdf", b"a")], "groq", None, fake_session)
+
+        assert response.stats["page_concurrency"] == 3
+
+
+class TestMergeItems:
+    """Tests for merge_items."""
+
+    def test_sums_int_and_float_quantities(self):
+        """Test that repeated designations sum any numeric quantity and keep text ones."""
+        from app.schemas.invoice import InvoiceItem
+        from app.services.invoice_matcher import merge_items
+
+        def item(designation, quantity):
+            return InvoiceItem(designation=designation, raw_description="", quantity=quantity)
+
+        merged = merge_items([
+            [item("STEEL-1", 2.5), item("R1.003", 2), item("R1.004", "1 set")],
+            [item("STEEL-1", 1.25), item("R1.003", 3), item("R1.004", 2)],
+        ])
+
+        assert {i.designation: i.quantity for i in merged} == {"STEEL-1": 3.75, "R1.003": 5, "R1.004": "1 set"}
+
+
+class TestSharedPageSemaphore:
+    """Tests for the shared page budget in _process_pages."""
+
+    async def test_budget_shared_across_invoices(self):
+        """Test that concurrent invoices never exceed the shared semaphore."""
+        import asyncio
+        from unittest.mock import patch
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_pages
+
+        active = []
+        peak = []
+
+        async def fake_page(page_index, *args, **kwargs):
+            active.append(page_index)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+            return [], {}, [{"page": page_index + 1, "status": "success"}]
+
+        shared = asyncio.Semaphore(2)
+        pool = KeyPool(["k1", "k2", "k3", "k4"])
+        pages = lambda: [(i, "b64") for i in range(4)]
+        with patch("app.services.parser._process_page", side_effect=fake_page):
+            await asyncio.gather(*(
+                _process_pages(pages(), ["model"], pool, max_concurrency=4, semaphore=shared)
+                for _ in range(3)
+            ))
+
+        assert max(peak) == 2
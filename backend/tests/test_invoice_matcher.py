@@ -0,0 +1,124 @@
+"""Unit tests for invoice_matcher.py - bulk matching of parsed items."""
+
+
+def _parts(*designations):
+    from app.db.models import Part
+    return [Part(designation=d, name=f"Part {d}") for d in designations]
+
+
+def _item(designation):
+    return {"designation": designation, "raw_description": "", "quantity": 1}
+
+
+class TestPartMatcher:
+    """Tests for PartMatcher."""
+
+    async def test_exact_and_base_in_one_query(self, make_session):
+        """Test that exact and base-part matches of many items cost one query."""
+        from app.services.invoice_matcher import PartMatcher
+
+        db = make_session(_parts(*[f"R{n}.003" for n in range(200)]))
+        items = [_item(f"R{n}.003" if n % 2 else f"R{n}.003-01") for n in range(200)]
+
+        results = await PartMatcher(db).match_items(items)
+
+        assert len(db.queries) == 1
+        assert all(item.found_in_db for item in results)
+        assert results[0].name == "Part R0.003"
+        assert "[Base Match: R0.003]" in results[0].description
+
+    async def test_fuzzy_only_for_leftovers(self, make_session):
+        """Test that the parts list is loaded once, only when something is left over."""
+        from app.services.invoice_matcher import PartMatcher
+
+        db = make_session(_parts("R1.003", "BUSHING-1234"))
+        matcher = PartMatcher(db)
+
+        await matcher.match_items([_item("R1.003")])
+        assert "all" not in db.queries
+
+        results = await matcher.match_items([_item("BUSHlNG-1234"), _item("UNKNOWN")])
+        await matcher.match_items([_item("OTHER")])
+
+        assert db.queries.count("all") == 1
+        assert results[0].found_in_db
+        assert "[Fuzzy Match: BUSHING-1234]" in results[0].description
+        assert not results[1].found_in_db
+
+    async def test_lookups_are_reused(self, make_session):
+        """Test that designations resolved once are not queried again."""
+        from app.services.invoice_matcher import PartMatcher
+
+        db = make_session(_parts("R1.003"))
+        matcher = PartMatcher(db)
+
+        await matcher.match_items([_item("R1.003")])
+        await matcher.match_items([_item("R1.003"), _item("R1.003")])
+
+        assert len(db.queries) == 1
+
+    async def test_normalized_before_fuzzy(self, make_session):
+        """Test that other case/separators resolve with the designation_norm lookup, not fuzzy matching."""
+        from app.services.invoice_matcher import PartMatcher
+
+        db = make_session(_parts("R1.01.00.001", "R1.01.00.002", "BUSHING-1234"))
+
+        results = await PartMatcher(db).match_items([
+            _item("r1 01 00 001"), _item("R1-01-00-002-05"), _item("bushing 1234")
+        ])
+
+        assert "all" not in db.queries
+        assert db.queries[1] == ["bushing1234", "r10100001", "r10100002", "r1010000205"]
+        assert "[Normalized Match: R1.01.00.001]" in results[0].description
+        assert "[Base Match: R1.01.00.002]" in results[1].description
+        assert results[2].name == "Part BUSHING-1234"
+
+    async def test_matched_part_keeps_catalog_image(self, make_session):
+        """Test that the parser's image is kept for unmatched items only."""
+        from app.services.invoice_matcher import PartMatcher
+
+        db = make_session(_parts("R1.003"))
+        items = [dict(_item(d), image_path="R1.webp") for d in ("R1.003", "UNKNOWN")]
+
+        matched, unmatched = await PartMatcher(db).match_items(items)
+
+        assert matched.image_path is None
+        assert unmatched.image_path == "R1.webp"
+
+    async def test_find_part_returns_match_type(self, make_session):
+        """Test that find_part returns (part, match_type), (None, None) without a match."""
+        from app.services.invoice_matcher import find_part
+
+        parts = _parts("R1.003")
+        db = make_session(parts)
+
+        assert await find_part("R1.003-01", db, parts) == (parts[0], "base:R1.003")
+        assert await find_part("UNKNOWN", db, parts) == (None, None)
+        assert await find_part("", db, parts) == (None, None)
+
+    async def test_chunked_queries(self, make_session):
+        """Test that very long invoices are split into bounded IN lists."""
+        from unittest.mock import patch
+        from app.services.invoice_matcher import find_parts_bulk
+
+        db = make_session(_parts("A", "B", "C"))
+        with patch("app.services.invoice_matcher.BULK_CHUNK_SIZE", 2):
+            found = await find_parts_bulk(["A", "B", "C", "A"], db)
+
+        assert sorted(found) == ["A", "B", "C"]
+        assert db.queries == [["A", "B"], ["C"]]
+
+    async def test_match_parsed_items(self, monkeypatch, make_session):
+        """Test the response builder on top of the matcher."""
+        from app.core.config import settings
+        from app.services.invoice_matcher import match_parsed_items
+
+        monkeypatch.setattr(settings, "CATALOG_SNAPSHOT_ENABLED", False)
+        db = make_session(_parts("R1.003"))
+        debug_info = {"invoice_metadata": {"invoice_number": "42"}}
+
+        response = await match_parsed_items([_item("R1.003"), _item("R1.003")], debug_info, db)
+
+        assert [item.designation for item in response.items] == ["R1.003"]
+        assert response.metadata == {"invoice_number": "42"}
+        assert db.queries == [["R1.003"]]
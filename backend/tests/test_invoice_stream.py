@@ -0,0 +1,203 @@
+"""Unit tests for the streaming invoice upload (NDJSON progress events)."""
+import json
+
+
+async def _collect(stream):
+    return [json.loads(line) async for line in stream]
+
+
+class TestStreamInvoiceEvents:
+    """Tests for stream_invoice_events."""
+
+    async def test_emits_page_and_item_events_before_result(self, monkeypatch, fake_session, parsed_item):
+        """Test that matched items are streamed per page, then the final result."""
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints.invoices import stream_invoice_events
+        from app.services import invoice_matcher
+        from app.services.catalog import PartCatalog
+
+        async def fake_parse(pdf_path, on_event=None, **kwargs):
+            on_event({"event": "page_rendered", "page": 1})
+            on_event({"event": "page_parsed", "page": 1, "source": "llm",
+                      "items": [parsed_item("R1.003"), parsed_item("R1.004")], "metadata": {}})
+            on_event({"event": "page_parsed", "page": 2, "source": "cache",
+                      "items": [parsed_item("R1.003", 2), parsed_item("R1.005", 2)], "metadata": {}})
+            items = [parsed_item("R1.003"), parsed_item("R1.004"), parsed_item("R1.003", 2), parsed_item("R1.005", 2)]
+            return items, {"invoice_metadata": {"invoice_number": "42"}, "error": None}
+
+        monkeypatch.setattr(invoice_matcher, "part_catalog", PartCatalog())
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=fake_parse):
+            events = await _collect(stream_invoice_events(b"%PDF", "stream.pdf", "groq", None, fake_session))
+
+        kinds = [event["event"] for event in events]
+        assert kinds == ["page_rendered", "page_parsed", "item", "item", "page_parsed", "item", "result"]
+        assert [e["item"]["designation"] for e in events if e["event"] == "item"] == ["R1.003", "R1.004", "R1.005"]
+        result = events[-1]
+        assert [item["designation"] for item in result["items"]] == ["R1.003", "R1.004", "R1.005"]
+        assert result["metadata"]["invoice_number"] == "42"
+        # One catalog version check and snapshot load, no per-page lookups
+        assert fake_session.queries == ["version", "all"]
+
+    async def test_streamed_items_carry_images(self, tmp_path, monkeypatch, fake_session, parsed_item):
+        """Test that item events have the same image_path as the final result."""
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints.invoices import stream_invoice_events
+        from app.services import image_index as image_index_module
+        from app.services.image_index import ImageIndex
+        from app.services.parser import attach_images
+
+        (tmp_path / "R1.003.webp").write_bytes(b"webp")
+        monkeypatch.setattr(image_index_module, "image_index", ImageIndex(local_dir=str(tmp_path)))
+        page_items = [parsed_item("R1.003")]
+
+        async def fake_parse(pdf_path, on_event=None, **kwargs):
+            on_event({"event": "page_parsed", "page": 1, "source": "llm", "items": page_items, "metadata": {}})
+            items = [parsed_item("R1.003")]
+            attach_images(items)
+            return items, {"invoice_metadata": {}, "error": None}
+
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=fake_parse):
+            events = await _collect(stream_invoice_events(b"%PDF", "images.pdf", "groq", None, fake_session))
+
+        streamed = [e["item"] for e in events if e["event"] == "item"]
+        assert streamed[0]["image_path"] == "R1.003.webp"
+        assert events[-1]["items"][0]["image_path"] == "R1.003.webp"
+        assert "image_path" not in page_items[0]  # Parser results (and their cache) are left untouched
+
+    async def test_events_queued_after_parse_finished_are_delivered(self, fake_session):
+        """Test that events still queued when parsing completes are not lost."""
+        import asyncio
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints.invoices import stream_invoice_events
+
+        async def fake_parse(pdf_path, on_event=None, **kwargs):
+            await asyncio.sleep(0.01)
+            for page in (1, 2, 3):
+                on_event({"event": "page_rendered", "page": page})
+            return [], {"invoice_metadata": {}, "error": None}
+
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=fake_parse):
+            events = await asyncio.wait_for(
+                _collect(stream_invoice_events(b"%PDF", "late.pdf", "groq", None, fake_session)), timeout=5
+            )
+
+        assert [event.get("page") for event in events if event["event"] == "page_rendered"] == [1, 2, 3]
+        assert events[-1]["event"] == "result"
+
+    async def test_cache_hit_streams_items_at_the_end(self, fake_session, parsed_item):
+        """Test that whole-file cache hits still produce item events."""
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints.invoices import stream_invoice_events
+
+        async def fake_parse(pdf_path, on_event=None, **kwargs):
+            return [parsed_item("R1.003")], {"invoice_metadata": {}, "cache": "hit", "error": None}
+
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=fake_parse):
+            events = await _collect(stream_invoice_events(b"%PDF", "cached.pdf", "groq", None, fake_session))
+
+        assert [event["event"] for event in events] == ["item", "result"]
+        assert events[0]["page"] is None
+
+    async def test_parse_failure_emits_error(self, fake_session):
+        """Test that exceptions become an error event and the temp file is removed."""
+        import os
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints.invoices import stream_invoice_events
+
+        paths = []
+
+        async def failing_parse(pdf_path, on_event=None, **kwargs):
+            paths.append(pdf_path)
+            raise RuntimeError("boom")
+
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=failing_parse):
+            events = await _collect(stream_invoice_events(b"%PDF", "broken.pdf", "groq", None, fake_session))
+
+        assert events == [{"event": "error", "detail": "boom"}]
+        assert not os.path.exists(paths[0])
+
+    async def test_closing_stream_cancels_parsing(self, fake_session):
+        """Test that a client disconnect (generator close) cancels the parse task."""
+        import asyncio
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints.invoices import stream_invoice_events
+
+        cancelled = []
+
+        async def slow_parse(pdf_path, on_event=None, **kwargs):
+            on_event({"event": "page_rendered", "page": 1})
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=slow_parse):
+            stream = stream_invoice_events(b"%PDF", "slow.pdf", "groq", None, fake_session)
+            first = json.loads(await stream.__anext__())
+            await stream.aclose()
+
+        assert first == {"event": "page_rendered", "page": 1}
+        assert cancelled == [True]
+
+
+    async def test_matcher_failure_cancels_parsing(self, fake_session):
+        """Test that the parse task and temp file are cleaned up if the matcher cannot be created."""
+        import asyncio
+        import os
+        from unittest.mock import patch
+        from app.api.api_v1.endpoints.invoices import stream_invoice_events
+
+        paths = []
+        cancelled = []
+
+        async def slow_parse(pdf_path, on_event=None, **kwargs):
+            paths.append(pdf_path)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def failing_matcher(db):
+            await asyncio.sleep(0)
+            raise RuntimeError("catalog unavailable")
+
+        with patch("app.api.api_v1.endpoints.invoices.parse_invoice_async", side_effect=slow_parse), \
+                patch("app.api.api_v1.endpoints.invoices.create_matcher", side_effect=failing_matcher):
+            events = await _collect(stream_invoice_events(b"%PDF", "matcher.pdf", "groq", None, fake_session))
+
+        assert events == [{"event": "error", "detail": "catalog unavailable"}]
+        assert cancelled == [True]
+        assert not os.path.exists(paths[0])
+
+class TestParserProgressEvents:
+    """Tests for on_event callbacks from _extract_items."""
+
+    async def test_llm_pages_emit_render_and_parse_events(self, monkeypatch):
+        """Test event order and payload for pages sent to the LLM."""
+        from unittest.mock import patch
+        from PIL import Image
+        from app.core.config import settings
+        from app.services.parser import _extract_items
+
+        monkeypatch.setattr(settings, "TEXT_LAYER_ENABLED", False)
+        monkeypatch.setattr(settings, "PAGE_CLASSIFIER_ENABLED", False)
+        pages = lambda pdf_path, **kwargs: iter((i, Image.new("RGB", (20, 20), "white")) for i in range(2))
+
+        async def fake_page(page_index, *args, **kwargs):
+            return ([{"designation": f"R1 00{page_index}"}], {},
+                    [{"page": page_index + 1, "status": "success", "tokens": 1}])
+
+        events = []
+        with patch("app.services.parser._iter_pages", side_effect=pages), \
+                patch("app.services.parser._process_page", side_effect=fake_page):
+            items, _ = await _extract_items("a.pdf", use_cache=False, on_event=events.append)
+
+        rendered = [e["page"] for e in events if e["event"] == "page_rendered"]
+        parsed = [e for e in events if e["event"] == "page_parsed"]
+        assert rendered == [1, 2]
+        assert sorted(e["page"] for e in parsed) == [1, 2]
+        assert parsed[0]["source"] == "llm"
+        assert parsed[0]["items"][0]["designation"] in ("R1000", "R1001")
+        assert len(items) == 2
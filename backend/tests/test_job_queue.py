@@ -0,0 +1,181 @@
+"""Unit tests for job_queue.py and the parse worker (app/worker.py)."""
+from types import SimpleNamespace
+
+import pytest
+
+
+def _job(job_id=1, attempts=0, status="queued"):
+    return SimpleNamespace(
+        id=job_id, status=status, attempts=attempts, filename="invoice.pdf", pdf=b"%PDF",
+        method="groq", use_cache=True, refresh_cache=False, error=None,
+        worker_id=None, started_at=None, heartbeat_at=None, finished_at=None,
+    )
+
+
+class TestClaimQuery:
+    """Tests for the SKIP LOCKED claim query."""
+
+    def test_postgres_sql(self):
+        """Test that the claim query locks one row and skips locked ones."""
+        from datetime import datetime, timezone
+        from sqlalchemy.dialects import postgresql
+        from app.services.job_queue import claim_query
+
+        sql = str(claim_query(datetime.now(timezone.utc)).compile(dialect=postgresql.dialect()))
+
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert "LIMIT" in sql
+        assert "parse_jobs.heartbeat_at <" in sql
+        assert "ORDER BY public.parse_jobs.created_at" in sql
+
+
+class TestClaimJob:
+    """Tests for claim_job."""
+
+    async def test_claims_queued_job(self, make_session):
+        """Test that a claimed job is marked running for this worker."""
+        from app.services.job_queue import claim_job
+
+        db = make_session(results=[_job()])
+        job = await claim_job(db, "worker-1")
+
+        assert job.status == "running"
+        assert job.attempts == 1
+        assert job.worker_id == "worker-1"
+        assert job.heartbeat_at is not None
+        assert db.commits == 1
+
+    async def test_empty_queue(self, make_session):
+        """Test that an empty queue returns None and ends the transaction."""
+        from app.services.job_queue import claim_job
+
+        db = make_session()
+
+        assert await claim_job(db, "worker-1") is None
+        assert db.rollbacks == 1
+
+    async def test_exhausted_job_is_failed_and_skipped(self, monkeypatch, make_session):
+        """Test that jobs over the attempt limit are failed instead of retried."""
+        from app.core.config import settings
+        from app.services.job_queue import claim_job
+
+        monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 3)
+        exhausted = _job(1, attempts=3, status="running")
+        db = make_session(results=[exhausted, _job(2)])
+        job = await claim_job(db, "worker-1")
+
+        assert exhausted.status == "failed"
+        assert exhausted.pdf == b""
+        assert job.id == 2
+
+
+class TestProcessJob:
+    """Tests for app.worker.process_job."""
+
+    @pytest.fixture
+    def queue_calls(self, monkeypatch, make_session):
+        from unittest.mock import AsyncMock
+        from app import worker
+        from app.services import job_queue
+
+        monkeypatch.setattr(worker, "AsyncSessionLocal", make_session)
+        calls = SimpleNamespace(finish=AsyncMock(), retry=AsyncMock())
+        monkeypatch.setattr(job_queue, "finish_job", calls.finish)
+        monkeypatch.setattr(job_queue, "retry_job", calls.retry)
+        return calls
+
+    async def test_stores_result_and_progress(self, queue_calls):
+        """Test that a successful parse stores the matched response."""
+        from unittest.mock import patch
+        from app import worker
+        from app.schemas.invoice import InvoiceItem, InvoiceUploadResponse
+
+        async def fake_parse(pdf_path, on_event=None, **kwargs):
+            on_event({"event": "page_rendered", "page": 1})
+            on_event({"event": "page_parsed", "page": 1, "source": "llm", "items": [{}], "metadata": {}})
+            return [{"designation": "R1.003"}], {"error": None}
+
+        response = InvoiceUploadResponse(items=[InvoiceItem(designation="R1.003")], debug_info={}, metadata=None)
+        with patch.object(worker, "parse_invoice_async", side_effect=fake_parse), \
+                patch.object(worker, "match_parsed_items", return_value=response):
+            await worker.process_job(_job(attempts=1), "worker-1")
+
+        args, kwargs = queue_calls.finish.call_args
+        assert args[1:] == (1, "worker-1", {"pages_rendered": 1, "pages_parsed": 1, "items": 1})
+        assert kwargs["result"]["items"][0]["designation"] == "R1.003"
+        queue_calls.retry.assert_not_called()
+
+    async def test_retries_then_fails(self, queue_calls, monkeypatch):
+        """Test that exceptions re-queue the job until the attempt limit."""
+        from unittest.mock import patch
+        from app import worker
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+        with patch.object(worker, "parse_invoice_async", side_effect=RuntimeError("groq down")):
+            await worker.process_job(_job(attempts=1), "worker-1")
+            await worker.process_job(_job(attempts=2), "worker-1")
+
+        assert queue_calls.retry.call_args.args[1:] == (1, "worker-1", "groq down")
+        assert queue_calls.finish.call_args.kwargs["error"] == "groq down"
+
+
+class TestRunWorker:
+    """Tests for app.worker.run_worker."""
+
+    async def test_once_drains_queue_with_bounded_concurrency(self, monkeypatch, make_session):
+        """Test that --once processes every job, never more than `concurrency` at a time."""
+        import asyncio
+        from app import worker
+        from app.services import job_queue
+
+        jobs = [_job(i) for i in range(5)]
+        active = []
+        peak = []
+        processed = []
+
+        async def fake_claim(db, worker_id):
+            return jobs.pop(0) if jobs else None
+
+        async def fake_process(job, worker_id):
+            active.append(job.id)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.remove(job.id)
+            processed.append(job.id)
+
+        monkeypatch.setattr(worker, "AsyncSessionLocal", make_session)
+        monkeypatch.setattr(job_queue, "claim_job", fake_claim)
+        monkeypatch.setattr(worker, "process_job", fake_process)
+
+        await asyncio.wait_for(worker.run_worker(concurrency=2, once=True, poll_interval=0.01), timeout=5)
+
+        assert sorted(processed) == list(range(5))
+        assert max(peak) == 2
+
+    async def test_stop_finishes_running_jobs(self, monkeypatch, make_session):
+        """Test that a stop request stops claiming but lets running jobs finish."""
+        import asyncio
+        from app import worker
+        from app.services import job_queue
+
+        stop = asyncio.Event()
+        jobs = [_job(1), _job(2)]
+        processed = []
+
+        async def fake_claim(db, worker_id):
+            return jobs.pop(0) if jobs else None
+
+        async def fake_process(job, worker_id):
+            stop.set()
+            await asyncio.sleep(0.01)
+            processed.append(job.id)
+
+        monkeypatch.setattr(worker, "AsyncSessionLocal", make_session)
+        monkeypatch.setattr(job_queue, "claim_job", fake_claim)
+        monkeypatch.setattr(worker, "process_job", fake_process)
+
+        await asyncio.wait_for(worker.run_worker(concurrency=1, poll_interval=0.01, stop=stop), timeout=5)
+
+        assert processed == [1]
+        assert jobs == [_job(2)]
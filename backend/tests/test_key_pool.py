@@ -0,0 +1,100 @@
+"""Unit tests for key_pool.py - Rate-limit-aware API key scheduler."""
+import pytest
+
+
+class TestParseRetryAfter:
+    """Tests for parse_retry_after helper."""
+
+    def test_retry_after_seconds(self):
+        """Test standard Retry-After header."""
+        from app.services.key_pool import parse_retry_after
+        assert parse_retry_after({"retry-after": "7"}) == 7.0
+
+    def test_groq_reset_duration(self):
+        """Test Groq's x-ratelimit-reset-requests duration format."""
+        from app.services.key_pool import parse_retry_after
+        assert parse_retry_after({"x-ratelimit-reset-requests": "2m59.56s"}) == pytest.approx(179.56)
+        assert parse_retry_after({"x-ratelimit-reset-requests": "120ms"}) == pytest.approx(0.12)
+        assert parse_retry_after({"x-ratelimit-reset-requests": "1h"}) == 3600
+
+    def test_missing_headers(self):
+        """Test that missing or garbage headers return None."""
+        from app.services.key_pool import parse_retry_after
+        assert parse_retry_after({}) is None
+        assert parse_retry_after(None) is None
+        assert parse_retry_after({"x-ratelimit-reset-requests": "soon"}) is None
+
+
+class TestKeyPool:
+    """Tests for KeyPool scheduling."""
+
+    def test_spreads_requests_over_idle_keys(self):
+        """Test that concurrent acquires get different keys."""
+        from app.services.key_pool import KeyPool
+
+        pool = KeyPool(["a", "b", "c"])
+        acquired = [pool.acquire()[0] for _ in range(3)]
+
+        assert sorted(acquired) == [0, 1, 2]
+
+    def test_rate_limited_key_is_avoided(self):
+        """Test that a key in cooldown is not handed out while others are free."""
+        from app.services.key_pool import KeyPool
+
+        pool = KeyPool(["a", "b"])
+        idx, _ = pool.acquire()
+        pool.release(idx, "rate_limit", retry_after=30)
+
+        for _ in range(3):
+            other, wait = pool.acquire()
+            assert other != idx
+            assert wait == 0
+            pool.release(other, "success")
+
+    def test_wait_when_all_keys_cooling_down(self):
+        """Test that the soonest available key is returned with a wait time."""
+        from app.services.key_pool import KeyPool
+
+        pool = KeyPool(["a", "b"])
+        pool.acquire(exclude=[1])
+        pool.release(0, "rate_limit", retry_after=30)
+        pool.acquire(exclude=[0])
+        pool.release(1, "rate_limit", retry_after=5)
+
+        idx, wait = pool.acquire()
+
+        assert idx == 1
+        assert 0 < wait <= 5
+        assert pool.healthy_count() == 0
+
+    def test_token_bucket_throttles(self):
+        """Test that a key without tokens reports a wait time."""
+        from app.services.key_pool import KeyPool
+
+        pool = KeyPool(["a"], requests_per_minute=2)
+        assert pool.acquire()[1] == 0
+        assert pool.acquire()[1] == 0
+        _, wait = pool.acquire()
+
+        assert wait == pytest.approx(30, abs=1)
+
+    def test_all_excluded_returns_none(self):
+        """Test that excluding every key returns None."""
+        from app.services.key_pool import KeyPool
+
+        pool = KeyPool(["a"])
+        assert pool.acquire(exclude=[0]) == (None, 0.0)
+
+    def test_cooldowns_shared_through_state_file(self, tmp_path):
+        """Test that a cooldown recorded by one pool is seen by another."""
+        from app.services.key_pool import KeyPool
+
+        state_file = str(tmp_path / "pool.json")
+        worker_1 = KeyPool(["a", "b"], state_file=state_file)
+        worker_2 = KeyPool(["a", "b"], state_file=state_file)
+
+        idx, _ = worker_1.acquire(exclude=[1])
+        worker_1.release(idx, "rate_limit", retry_after=60)
+
+        assert worker_2.healthy_count() == 1
+        assert worker_2.acquire()[0] == 1
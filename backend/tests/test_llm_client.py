@@ -0,0 +1,108 @@
+"""Unit tests for llm_client.py - Pooled async LLM HTTP client."""
+import asyncio
+
+import pytest
+
+
+def _echo_transport(seen):
+    import httpx
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={"ok": True})
+
+    return httpx.MockTransport(handler)
+
+
+class TestLLMClient:
+    """Tests for LLMClient."""
+
+    async def test_posts_chat_completion(self):
+        """Test URL, auth header and JSON body of a request."""
+        import json
+        from app.services.llm_client import LLMClient
+
+        seen = []
+        client = LLMClient(base_url="https://llm.test/v1/", transport=_echo_transport(seen))
+        response = await client.chat_completion("secret", {"model": "m"})
+
+        assert response.status_code == 200
+        assert str(seen[0].url) == "https://llm.test/v1/chat/completions"
+        assert seen[0].headers["Authorization"] == "Bearer secret"
+        assert json.loads(seen[0].content) == {"model": "m"}
+        assert client.stats["requests"] == 1
+        await client.aclose()
+
+    async def test_reuses_client_within_loop(self):
+        """Test that requests on one event loop share a connection pool."""
+        from app.services.llm_client import LLMClient
+
+        client = LLMClient(transport=_echo_transport([]))
+        await client.chat_completion("k", {})
+        first = client._client
+        await client.chat_completion("k", {})
+
+        assert client._client is first
+        await client.aclose()
+        assert client._client is None
+
+    def test_new_client_per_event_loop(self):
+        """Test that a client bound to a closed loop is replaced."""
+        from app.services.llm_client import LLMClient
+
+        client = LLMClient(transport=_echo_transport([]))
+        asyncio.run(client.chat_completion("k", {}))
+        first = client._client
+        asyncio.run(client.chat_completion("k", {}))
+
+        assert client._client is not first
+
+    def test_replaced_client_is_closed_on_its_loop(self):
+        """Test that a client still owned by a running loop is closed when another loop takes over."""
+        import threading
+        import time
+        from app.services.llm_client import LLMClient
+
+        client = LLMClient(transport=_echo_transport([]))
+        other = asyncio.new_event_loop()
+        thread = threading.Thread(target=other.run_forever, daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(client.chat_completion("k", {}), other).result(5)
+            first = client._client
+
+            asyncio.run(client.chat_completion("k", {}))
+            for _ in range(100):  # The close runs on the other loop
+                if first.is_closed:
+                    break
+                time.sleep(0.01)
+
+            assert first.is_closed
+            assert client._client is not first
+        finally:
+            other.call_soon_threadsafe(other.stop)
+            thread.join(5)
+            other.close()
+
+    async def test_transport_errors_are_counted(self):
+        """Test that transport errors are raised and counted."""
+        import httpx
+        from app.services.llm_client import LLMClient
+
+        def handler(request):
+            raise httpx.ConnectTimeout("slow", request=request)
+
+        client = LLMClient(transport=httpx.MockTransport(handler))
+        with pytest.raises(httpx.TimeoutException):
+            await client.chat_completion("k", {})
+
+        assert client.stats["errors"] == 1
+
+    def test_http2_falls_back_without_h2(self, monkeypatch):
+        """Test that HTTP/2 is disabled when the h2 package is missing."""
+        from app.services import llm_client as llm_client_module
+
+        monkeypatch.setattr(llm_client_module, "_http2_available", lambda: False)
+        client = llm_client_module.LLMClient(http2=True)
+
+        assert client.http2 is False
@@ -0,0 +1,145 @@
+"""Unit tests for metrics.py and pipeline instrumentation."""
+import pytest
+
+
+class TestMetricTypes:
+    """Tests for Counter, Gauge and Histogram rendering."""
+
+    def test_counter_and_gauge(self):
+        """Test label handling and text format of counters and gauges."""
+        from app.services.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        requests = registry.counter("demo_requests_total", "Requests", ["status"])
+        connections = registry.gauge("demo_connections", "Connections")
+        requests.inc(status="200")
+        requests.inc(2, status="429")
+        connections.set(3)
+
+        text = registry.render()
+
+        assert "# TYPE demo_requests_total counter" in text
+        assert 'demo_requests_total{status="200"} 1' in text
+        assert 'demo_requests_total{status="429"} 2' in text
+        assert "demo_connections 3" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket counts, sum and count of a histogram."""
+        from app.services.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        latency = registry.histogram("demo_seconds", "Latency", ["model"], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, model="m")
+
+        text = registry.render()
+
+        assert 'demo_seconds_bucket{model="m",le="0.1"} 1' in text
+        assert 'demo_seconds_bucket{model="m",le="1"} 2' in text
+        assert 'demo_seconds_bucket{model="m",le="+Inf"} 3' in text
+        assert 'demo_seconds_sum{model="m"} 5.55' in text
+        assert 'demo_seconds_count{model="m"} 3' in text
+
+    def test_time_observes_on_error(self):
+        """Test that the timer context manager records failed blocks too."""
+        from app.services.metrics import Histogram
+
+        histogram = Histogram("demo_block_seconds", "Block")
+        with pytest.raises(RuntimeError):
+            with histogram.time():
+                raise RuntimeError("boom")
+
+        assert histogram.count() == 1
+
+    def test_wrong_labels_rejected(self):
+        """Test that label names must match the declaration."""
+        from app.services.metrics import Counter
+
+        counter = Counter("demo_total", "Demo", ["model"])
+        with pytest.raises(ValueError):
+            counter.inc(key="abcd")
+
+    def test_label_values_are_escaped(self):
+        """Test escaping of quotes and backslashes in label values."""
+        from app.services.metrics import Counter
+
+        counter = Counter("demo_total", "Demo", ["model"])
+        counter.inc(model='a"b\\c')
+
+        assert 'demo_total{model="a\\"b\\\\c"} 1' in counter.render()
+
+
+class TestPipelineInstrumentation:
+    """Tests that pipeline stages report metrics."""
+
+    async def test_llm_request_metrics(self):
+        """Test latency, 429 and token metrics from _process_page."""
+        import json
+        import httpx
+        from unittest.mock import patch
+        from app.services.key_pool import KeyPool
+        from app.services.llm_client import LLMClient
+        from app.services.metrics import LLM_RATE_LIMITED_TOTAL, LLM_REQUEST_SECONDS, LLM_TOKENS_TOTAL
+        from app.services.parser import _process_page
+
+        responses = [(429, {"retry-after": "30"}), (200, {})]
+
+        def handler(request):
+            status_code, headers = responses.pop(0)
+            body = {"choices": [{"message": {"content": json.dumps({"items": []})}}], "usage": {"total_tokens": 77}}
+            return httpx.Response(status_code, json=body, headers=headers)
+
+        client = LLMClient(transport=httpx.MockTransport(handler))
+        tokens_before = LLM_TOKENS_TOTAL.value(model="metrics-model")
+        limited_before = LLM_RATE_LIMITED_TOTAL.value(key="ey-a")
+        with patch("asyncio.sleep"):
+            await _process_page(0, "b64", ["metrics-model"], KeyPool(["key-a", "key-b"]), client=client)
+
+        assert LLM_REQUEST_SECONDS.count(model="metrics-model", key="ey-a", status="429") >= 1
+        assert LLM_REQUEST_SECONDS.count(model="metrics-model", key="ey-b", status="200") >= 1
+        assert LLM_RATE_LIMITED_TOTAL.value(key="ey-a") == limited_before + 1
+        assert LLM_TOKENS_TOTAL.value(model="metrics-model") == tokens_before + 77
+
+    def test_render_and_encode_metrics(self, blank_pdf_path):
+        """Test that page rendering and encoding are timed."""
+        from app.services.metrics import PAGE_ENCODE_SECONDS, PAGE_RENDER_SECONDS
+        from app.services.parser import _encode_image, _iter_pages
+
+        rendered_before = PAGE_RENDER_SECONDS.count()
+        encoded_before = PAGE_ENCODE_SECONDS.count()
+        for _, image in _iter_pages(blank_pdf_path, scale=0.5):
+            _encode_image(image)
+
+        assert PAGE_RENDER_SECONDS.count() == rendered_before + 2
+        assert PAGE_ENCODE_SECONDS.count() == encoded_before + 2
+
+    def test_db_pool_metrics_wired_by_app(self):
+        """Test that app.main (not app.db) connects the pool wait time to the metrics."""
+        import app.main  # noqa: F401
+        from app.db import session
+        from app.services.metrics import DB_POOL_WAIT_SECONDS
+
+        assert session._pool_wait_observer == DB_POOL_WAIT_SECONDS.observe
+        assert not hasattr(session, "registry")
+
+    def test_metrics_endpoint(self, client):
+        """Test that /api/metrics serves the Prometheus text format."""
+        response = client.get("/api/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE llm_request_seconds histogram" in response.text
+        assert "# TYPE db_pool_connections gauge" in response.text
+
+
+@pytest.fixture
+def blank_pdf_path(tmp_path):
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument.new()
+    for _ in range(2):
+        pdf.new_page(200, 300)
+    path = tmp_path / "blank.pdf"
+    pdf.save(str(path))
+    pdf.close()
+    return str(path)
@@ -0,0 +1,195 @@
+"""Unit tests for page_classifier.py and skipping item-free pages in the parser."""
+from PIL import Image, ImageDraw
+
+
+def _table_page(lines=6):
+    image = Image.new("RGB", (800, 1100), "white")
+    draw = ImageDraw.Draw(image)
+    for r in range(lines):
+        y = 200 + r * 40
+        draw.line([(60, y), (740, y)], fill="black", width=2)
+    return image
+
+
+def _dense_page():
+    """Scanned text without ruling lines: too much ink to call it empty."""
+    image = Image.new("RGB", (800, 1100), "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(100, 1000, 30):
+        for x in range(60, 700, 90):
+            draw.rectangle([x, y, x + 40, y + 12], fill="black")
+    return image
+
+
+def _borderless_page(rows=3):
+    """Sparse scan with a few item rows and no table lines (well below 1% ink)."""
+    image = Image.new("RGB", (800, 1100), "white")
+    draw = ImageDraw.Draw(image)
+    for r in range(rows):
+        y = 200 + r * 30
+        for x in (60, 160, 400, 650):
+            draw.rectangle([x, y, x + 40, y + 12], fill="black")
+    return image
+
+
+BANK_TEXT = "Beneficiary: Ningbo Trading Co.\nBank: Bank of China\nSWIFT: BKCHCNBJ\nAccount No 1234"
+
+
+class TestClassifyText:
+    """Tests for classify_text."""
+
+    def test_bank_details_page_is_skipped(self):
+        """Test that a bank details page without item rows is classified as item-free."""
+        from app.services.page_classifier import classify_text
+
+        has_items, reason = classify_text(BANK_TEXT)
+
+        assert has_items is False
+        assert "beneficiary" in reason
+
+    def test_item_keywords_win(self):
+        """Test that item table headers keep the page even next to bank details."""
+        from app.services.page_classifier import classify_text
+
+        assert classify_text(BANK_TEXT + "\nDescription Qty Unit price")[0] is True
+        assert classify_text("Наименование Кол-во Цена")[0] is True
+
+    def test_item_like_rows_keep_page(self):
+        """Test that rows with a code and a number keep the page without headers."""
+        from app.services.page_classifier import classify_text
+
+        assert classify_text("Payment terms: T/T\nR1.003 Bushing 10")[0] is True
+
+    def test_unknown_text_is_inconclusive(self):
+        """Test that text without any signal is left to the LLM."""
+        from app.services.page_classifier import classify_text
+
+        assert classify_text("Thank you for your business")[0] is None
+
+
+class TestClassifyBitmap:
+    """Tests for classify_bitmap."""
+
+    def test_ruled_table_has_items(self):
+        """Test that horizontal ruling lines are detected as a table."""
+        from app.services.page_classifier import analyze_bitmap, classify_bitmap
+
+        assert analyze_bitmap(_table_page())["horizontal_lines"] == 6
+        assert classify_bitmap(_table_page())[0] is True
+
+    def test_blank_page_is_skipped(self):
+        """Test that a (near) blank scan is classified as item-free."""
+        from app.services.page_classifier import classify_bitmap
+
+        assert classify_bitmap(Image.new("RGB", (800, 1100), "white"))[0] is False
+
+    def test_dense_page_without_lines_is_inconclusive(self):
+        """Test that text-heavy scans without table lines still go to the LLM."""
+        from app.services.page_classifier import classify_bitmap
+
+        assert classify_bitmap(_dense_page())[0] is None
+
+    def test_sparse_borderless_page_is_inconclusive(self):
+        """Test that a few item rows without table lines are not mistaken for a blank page."""
+        from app.services.page_classifier import analyze_bitmap, classify_bitmap
+
+        stats = analyze_bitmap(_borderless_page())
+
+        assert stats["horizontal_lines"] == 0 and 0 < stats["ink"] < 0.01
+        assert classify_bitmap(_borderless_page())[0] is None
+
+
+class TestParserSkipsPages:
+    """Tests for page skipping in _extract_items."""
+
+    @staticmethod
+    def _fake_pages(images):
+        def iter_pages(pdf_path, wants_render=None, **kwargs):
+            for i, image in enumerate(images):
+                if wants_render is None or wants_render(i):
+                    yield i, image
+        return iter_pages
+
+    @staticmethod
+    async def _fake_page(page_index, *args, **kwargs):
+        return ([{"designation": "R1.003"}], {"invoice_number": "42"},
+                [{"page": page_index + 1, "status": "success", "tokens": 10}])
+
+    async def test_blank_scanned_page_is_not_sent(self, monkeypatch):
+        """Test that a blank page 2 is skipped and recorded in debug_info."""
+        from unittest.mock import patch
+        from app.core.config import settings
+        from app.services.parser import _extract_items
+
+        monkeypatch.setattr(settings, "TEXT_LAYER_ENABLED", False)
+        pages = self._fake_pages([_table_page(), Image.new("RGB", (800, 1100), "white")])
+        with patch("app.services.parser._iter_pages", side_effect=pages), \
+                patch("app.services.parser._process_page", side_effect=self._fake_page) as process_page:
+            items, debug_info = await _extract_items("a.pdf", use_cache=False)
+
+        assert process_page.call_count == 1
+        assert [item["designation"] for item in items] == ["R1.003"]
+        assert debug_info["skipped_pages"] == 1
+        skipped = [page for page in debug_info["pages"] if page["source"] == "skipped"]
+        assert skipped[0]["page"] == 2
+        assert skipped[0]["reason"].startswith("bitmap")
+        assert debug_info["error"] is None
+
+    async def test_first_page_is_never_skipped(self, monkeypatch):
+        """Test that page 1 goes to the LLM even when it looks empty."""
+        from unittest.mock import patch
+        from app.core.config import settings
+        from app.services.parser import _extract_items
+
+        monkeypatch.setattr(settings, "TEXT_LAYER_ENABLED", False)
+        pages = self._fake_pages([Image.new("RGB", (800, 1100), "white")])
+        with patch("app.services.parser._iter_pages", side_effect=pages), \
+                patch("app.services.parser._process_page", side_effect=self._fake_page) as process_page:
+            _, debug_info = await _extract_items("a.pdf", use_cache=False)
+
+        assert process_page.call_count == 1
+        assert debug_info["skipped_pages"] == 0
+
+    async def test_bank_details_text_page_is_not_rendered(self, monkeypatch):
+        """Test that a text-layer bank details page is skipped before rendering."""
+        from unittest.mock import MagicMock, patch
+        from app.core.config import settings
+        from app.services.parser import _extract_items
+
+        monkeypatch.setattr(settings, "TEXT_LAYER_ENABLED", True)
+        extractor = MagicMock()
+        extractor.extract_page.side_effect = lambda i: None if i == 0 else {
+            "items": [], "metadata": {}, "confidence": 0.0, "chars": 120, "text": BANK_TEXT
+        }
+        rendered = []
+        pages = self._fake_pages([_table_page(), _dense_page()])
+
+        def tracking_pages(pdf_path, wants_render=None, **kwargs):
+            for i, image in pages(pdf_path, wants_render=wants_render):
+                rendered.append(i)
+                yield i, image
+
+        with patch("app.services.parser.TextLayerExtractor", return_value=extractor), \
+                patch("app.services.parser._iter_pages", side_effect=tracking_pages), \
+                patch("app.services.parser._process_page", side_effect=self._fake_page) as process_page:
+            _, debug_info = await _extract_items("a.pdf", use_cache=False)
+
+        assert rendered == [0]
+        assert process_page.call_count == 1
+        assert debug_info["pages"][1] == {"page": 2, "source": "skipped", "reason": "text: 'beneficiary' without item rows"}
+
+    async def test_disabled_classifier_sends_every_page(self, monkeypatch):
+        """Test that PAGE_CLASSIFIER_ENABLED=false restores the old behavior."""
+        from unittest.mock import patch
+        from app.core.config import settings
+        from app.services.parser import _extract_items
+
+        monkeypatch.setattr(settings, "TEXT_LAYER_ENABLED", False)
+        monkeypatch.setattr(settings, "PAGE_CLASSIFIER_ENABLED", False)
+        pages = self._fake_pages([_table_page(), Image.new("RGB", (800, 1100), "white")])
+        with patch("app.services.parser._iter_pages", side_effect=pages), \
+                patch("app.services.parser._process_page", side_effect=self._fake_page) as process_page:
+            _, debug_info = await _extract_items("a.pdf", use_cache=False)
+
+        assert process_page.call_count == 2
+        assert debug_info["skipped_pages"] == 0
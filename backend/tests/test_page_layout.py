@@ -0,0 +1,93 @@
+"""Unit tests for page_layout.py - cropping pages to the item table."""
+from PIL import Image, ImageDraw
+
+
+def _invoice_page(table=True):
+    """Letterhead, metadata block, ruled item table and a footer on an A4-like page."""
+    image = Image.new("RGB", (800, 1100), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([60, 40, 300, 110], fill="black")  # Logo / letterhead
+    for y in (300, 325):  # Invoice number and date lines
+        draw.rectangle([60, y, 360, y + 10], fill="black")
+    if table:
+        for r in range(6):
+            y = 420 + r * 40
+            draw.line([(60, y), (740, y)], fill="black", width=2)
+            if r < 5:
+                draw.rectangle([80, y + 15, 400, y + 25], fill="black")
+    draw.rectangle([60, 1020, 500, 1035], fill="black")  # Bank details footer
+    return image
+
+
+class TestFindItemRegion:
+    """Tests for find_item_region."""
+
+    def test_ruled_table_without_letterhead_and_footer(self):
+        """Test that the crop covers the table and drops letterhead and footer."""
+        from app.services.page_layout import find_item_region
+
+        box, source = find_item_region(_invoice_page())
+
+        assert source == "ruling_lines"
+        left, top, right, bottom = box
+        assert 380 < top <= 420
+        assert 620 <= bottom < 1000
+        assert left <= 60 and right >= 740
+
+    def test_first_page_keeps_letterhead(self):
+        """Test that keep_header keeps the letterhead even when a blank band separates it."""
+        from app.services.page_layout import find_item_region
+
+        box, _ = find_item_region(_invoice_page(), keep_header=True)
+
+        assert box[1] <= 40  # Letterhead (supplier) and metadata kept
+        assert 620 <= box[3] < 1000  # Footer still dropped
+
+    def test_text_layer_tables(self):
+        """Test that text-layer table boxes are used instead of ruling lines."""
+        from app.services.page_layout import find_item_region
+
+        box, source = find_item_region(_invoice_page(table=False), tables=[[100, 500, 700, 700]])
+
+        assert source == "text_layer"
+        assert 450 < box[1] <= 500
+        assert 700 <= box[3] < 800
+        assert box[0] <= 100 and box[2] >= 700
+
+    def test_no_table(self):
+        """Test that pages without a table are not cropped."""
+        from app.services.page_layout import crop_to_items
+
+        image = _invoice_page(table=False)
+        cropped, info = crop_to_items(image)
+
+        assert cropped is image
+        assert info == {"cropped": False, "source": "no table lines"}
+
+
+class TestEncodeCropped:
+    """Tests for the parser's crop-and-encode step."""
+
+    def test_reports_byte_reduction(self):
+        """Test that a cropped page is encoded once and the saving is estimated from its area."""
+        from unittest.mock import patch
+        from app.services import parser
+
+        with patch.object(parser, "optimize_page", wraps=parser.optimize_page) as optimize:
+            b64_img, info = parser._encode_cropped(_invoice_page(), keep_header=True)
+
+        layout = info["layout"]
+        assert optimize.call_count == 1
+        assert layout["cropped"] is True
+        assert layout["saved_bytes"] == layout["full_bytes"] - info["bytes"] > 0
+        assert layout["full_bytes"] == int(info["bytes"] / layout["area"])
+        assert info["size"][1] < 1100
+
+    def test_full_page_when_no_table(self):
+        """Test that the full page is sent when detection fails."""
+        from app.services.parser import _encode_cropped
+
+        _, info = _encode_cropped(_invoice_page(table=False))
+
+        assert info["layout"]["cropped"] is False
+        assert info["size"] == [800, 1100]
@@ -0,0 +1,83 @@
+"""Unit tests for page_optimizer.py - Vision payload optimizer."""
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw
+
+
+@pytest.fixture
+def page():
+    """A white A4-ish page with a dark block of 'content' in the middle."""
+    image = Image.new("RGB", (1200, 1700), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((300, 400, 900, 1300), fill=(30, 30, 30))
+    for y in range(420, 1280, 20):
+        draw.line((320, y, 880, y), fill=(200, 60, 60), width=3)
+    return image
+
+
+class TestTrimMargins:
+    """Tests for trim_margins."""
+
+    def test_trims_white_border(self, page):
+        """Test that white margins are removed with padding kept."""
+        from app.services.page_optimizer import TRIM_PADDING, trim_margins
+
+        trimmed = trim_margins(page)
+
+        assert trimmed.size == (600 + 1 + 2 * TRIM_PADDING, 900 + 1 + 2 * TRIM_PADDING)
+
+    def test_blank_page_unchanged(self):
+        """Test that a blank page is returned as is."""
+        from app.services.page_optimizer import trim_margins
+
+        blank = Image.new("RGB", (100, 100), "white")
+        assert trim_margins(blank) is blank
+
+
+class TestOptimizePage:
+    """Tests for optimize_page."""
+
+    def test_defaults_match_plain_jpeg(self, page):
+        """Test that default options produce the same bytes as a plain JPEG save."""
+        from app.services.page_optimizer import optimize_page
+
+        buffered = BytesIO()
+        page.save(buffered, format="JPEG")
+        data, info = optimize_page(page)
+
+        assert data == buffered.getvalue()
+        assert info["size"] == [1200, 1700]
+        assert info["quality"] == 75
+        assert info["trimmed"] is False
+
+    def test_grayscale_and_downscale(self, page):
+        """Test grayscale conversion and long-edge downscaling."""
+        from app.services.page_optimizer import PayloadOptions, optimize_page
+
+        data, info = optimize_page(page, PayloadOptions(grayscale=True, max_long_edge=850))
+
+        assert info["size"] == [600, 850]
+        assert info["grayscale"] is True
+        assert Image.open(BytesIO(data)).mode == "L"
+
+    def test_byte_budget(self, page):
+        """Test that quality is lowered until the payload fits the budget."""
+        from app.services.page_optimizer import PayloadOptions, optimize_page
+
+        full, _ = optimize_page(page, PayloadOptions(quality=95))
+        budget = len(full) // 2
+        data, info = optimize_page(page, PayloadOptions(quality=95, byte_budget=budget))
+
+        assert len(data) <= budget
+        assert info["quality"] < 95
+        assert info["bytes"] == len(data)
+
+    def test_impossible_budget_stops(self, page):
+        """Test that an unreachable budget terminates with the smallest payload."""
+        from app.services.page_optimizer import MIN_LONG_EDGE, PayloadOptions, optimize_page
+
+        data, info = optimize_page(page, PayloadOptions(byte_budget=10))
+
+        assert len(data) > 10
+        assert max(info["size"]) >= MIN_LONG_EDGE
@@ -0,0 +1,203 @@
+"""Unit tests for parse_cache.py - Disk-backed parse result cache."""
+import os
+import time
+
+import pytest
+
+
+class TestContentKey:
+    """Tests for content_key helper."""
+
+    def test_same_content_same_key(self):
+        """Test that identical content produces identical keys."""
+        from app.services.parse_cache import content_key
+        assert content_key(b"pdf", "v1") == content_key(b"pdf", "v1")
+
+    def test_version_changes_key(self):
+        """Test that the version is part of the key."""
+        from app.services.parse_cache import content_key
+        assert content_key(b"pdf", "v1") != content_key(b"pdf", "v2")
+
+
+class TestDiskCache:
+    """Tests for DiskCache implementation."""
+
+    def test_put_and_get(self, tmp_path):
+        """Test basic put and get operations."""
+        from app.services.parse_cache import DiskCache
+
+        cache = DiskCache(str(tmp_path), max_bytes=1024 * 1024)
+        cache.put("abc123", {"items": [{"designation": "R1.003"}]})
+
+        assert cache.get("abc123") == {"items": [{"designation": "R1.003"}]}
+        assert cache.stats["hits"] == 1
+
+    def test_miss_returns_none(self, tmp_path):
+        """Test that a missing key returns None."""
+        from app.services.parse_cache import DiskCache
+
+        cache = DiskCache(str(tmp_path), max_bytes=1024 * 1024)
+
+        assert cache.get("missing") is None
+        assert cache.stats["misses"] == 1
+
+    def test_invalidate(self, tmp_path):
+        """Test that invalidated entries are gone."""
+        from app.services.parse_cache import DiskCache
+
+        cache = DiskCache(str(tmp_path), max_bytes=1024 * 1024)
+        cache.put("abc123", {"a": 1})
+        cache.invalidate("abc123")
+
+        assert cache.get("abc123") is None
+
+    def test_corrupt_entry_is_dropped(self, tmp_path):
+        """Test that unreadable files are treated as misses and removed."""
+        from app.services.parse_cache import DiskCache
+
+        cache = DiskCache(str(tmp_path), max_bytes=1024 * 1024)
+        cache.put("abc123", {"a": 1})
+        path = cache._path("abc123")
+        with open(path, "w") as f:
+            f.write("{not json")
+
+        assert cache.get("abc123") is None
+        assert not os.path.exists(path)
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test that the oldest entries are evicted when over budget."""
+        from app.services.parse_cache import DiskCache
+
+        payload = {"data": "x" * 400}
+        cache = DiskCache(str(tmp_path), max_bytes=1000)
+        cache.put("aa01", payload)
+        old = time.time() - 100
+        os.utime(cache._path("aa01"), (old, old))
+        cache.put("bb02", payload)
+        cache.put("cc03", payload)  # Over budget, should evict "aa01"
+
+        assert cache.get("aa01") is None
+        assert cache.get("bb02") == payload
+        assert cache.get("cc03") == payload
+
+
+class TestParseInvoiceCache:
+    """Tests for parse_invoice cache integration."""
+
+    @pytest.fixture
+    def pdf_file(self, tmp_path):
+        path = tmp_path / "invoice.pdf"
+        path.write_bytes(b"%PDF-1.4 fake")
+        return str(path)
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        from app.services import parse_cache as parse_cache_module
+        from app.services.parse_cache import DiskCache
+
+        cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024 * 1024)
+        monkeypatch.setattr(parse_cache_module, "parse_cache", cache)
+        return cache
+
+    def _fake_extract(self, pdf_path, use_cache=True, refresh_cache=False, on_event=None, page_semaphore=None):
+        return [{"designation": "R1.003"}], {"error": None, "page_count": 1}
+
+    def test_second_parse_is_served_from_cache(self, pdf_file, cache):
+        """Test that a repeat parse does not call the extractor again."""
+        from unittest.mock import patch
+        from app.services.parser import parse_invoice
+
+        with patch("app.services.parser._extract_items", side_effect=self._fake_extract) as extract, \
+                patch("app.services.parser.attach_images"):
+            _, first_debug = parse_invoice(pdf_file)
+            items, second_debug = parse_invoice(pdf_file)
+
+        assert extract.call_count == 1
+        assert items == [{"designation": "R1.003"}]
+        assert first_debug["cache"] == "miss"
+        assert second_debug["cache"] == "hit"
+
+    def test_bypass_and_refresh(self, pdf_file, cache):
+        """Test that use_cache=False and refresh_cache=True skip cached results."""
+        from unittest.mock import patch
+        from app.services.parser import parse_invoice
+
+        with patch("app.services.parser._extract_items", side_effect=self._fake_extract) as extract, \
+                patch("app.services.parser.attach_images"):
+            parse_invoice(pdf_file)
+            _, bypass_debug = parse_invoice(pdf_file, use_cache=False)
+            _, refresh_debug = parse_invoice(pdf_file, refresh_cache=True)
+
+        assert extract.call_count == 3
+        assert bypass_debug["cache"] == "bypass"
+        assert refresh_debug["cache"] == "refresh"
+
+    def test_failed_parse_is_not_cached(self, pdf_file, cache):
+        """Test that results with errors are not stored."""
+        from unittest.mock import patch
+        from app.services.parser import parse_invoice
+
+        failed = ([], {"error": "Page 1 failed", "page_count": 1})
+        with patch("app.services.parser._extract_items", return_value=failed) as extract, \
+                patch("app.services.parser.attach_images"):
+            parse_invoice(pdf_file)
+            parse_invoice(pdf_file)
+
+        assert extract.call_count == 2
+
+
+class TestPageCache:
+    """Tests for the per-page cache in _extract_items."""
+
+    @pytest.fixture
+    def page_cache(self, tmp_path, monkeypatch):
+        from app.services import parse_cache as parse_cache_module
+        from app.services.parse_cache import DiskCache
+
+        cache = DiskCache(str(tmp_path / "pages"), max_bytes=1024 * 1024)
+        monkeypatch.setattr(parse_cache_module, "page_cache", cache)
+        return cache
+
+    def _pages(self, colors):
+        from PIL import Image
+        return lambda pdf_path, **kwargs: iter(
+            (i, Image.new("RGB", (20, 20), color)) for i, color in enumerate(colors)
+        )
+
+    def _fake_process_pages(self, pages, models, pool, max_concurrency=1, on_result=None, semaphore=None):
+        self.sent = [i for i, _ in pages]
+        return {
+            i: ([{"designation": f"P{i}"}], {"invoice_number": f"INV-{i}"},
+                [{"page": i + 1, "status": "success", "tokens": 10}])
+            for i in self.sent
+        }
+
+    async def test_only_changed_pages_are_sent(self, page_cache):
+        """Test that a revised invoice only re-sends the changed page."""
+        from unittest.mock import patch
+        from app.services.parser import _extract_items
+
+        with patch("app.services.parser._process_pages", side_effect=self._fake_process_pages):
+            with patch("app.services.parser._iter_pages", side_effect=self._pages(["white", "red"])):
+                await _extract_items("v1.pdf")
+            with patch("app.services.parser._iter_pages", side_effect=self._pages(["white", "blue"])):
+                items, debug_info = await _extract_items("v2.pdf")
+
+        assert self.sent == [1]
+        assert debug_info["cached_pages"] == 1
+        assert [item["designation"] for item in items] == ["P0", "P1"]
+        assert debug_info["invoice_metadata"]["invoice_number"] == "INV-0"
+        assert debug_info["token_usage"]["total_tokens"] == 10
+
+    async def test_refresh_ignores_cached_pages(self, page_cache):
+        """Test that refresh_cache re-sends every page."""
+        from unittest.mock import patch
+        from app.services.parser import _extract_items
+
+        with patch("app.services.parser._process_pages", side_effect=self._fake_process_pages), \
+                patch("app.services.parser._iter_pages", side_effect=self._pages(["white"])):
+            await _extract_items("a.pdf")
+            _, debug_info = await _extract_items("a.pdf", refresh_cache=True)
+
+        assert self.sent == [0]
+        assert debug_info["cached_pages"] == 0
@@ -80,6 +80,448 @@ class TestNormalizeDate:
         assert normalize_date("  2025-10-24  ") == "24.10.2025"
 
 
+class TestIterPages:
+    """Tests for lazy page rendering in _iter_pages."""
+
+    @pytest.fixture
+    def blank_pdf(self, tmp_path):
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument.new()
+        for _ in range(3):
+            pdf.new_page(200, 300)
+        path = str(tmp_path / "blank.pdf")
+        pdf.save(path)
+        pdf.close()
+        return path
+
+    def test_yields_pages_in_order(self, blank_pdf):
+        """Test that every page is rendered at 2x scale in order."""
+        from app.services.parser import _iter_pages
+
+        pages = list(_iter_pages(blank_pdf))
+
+        assert [i for i, _ in pages] == [0, 1, 2]
+        assert pages[0][1].size == (400, 600)
+
+    def test_renders_lazily(self, blank_pdf):
+        """Test that pages are rendered on demand, not all up front."""
+        from unittest.mock import patch
+        import pypdfium2 as pdfium
+        from app.services.parser import _iter_pages
+
+        with patch.object(pdfium.PdfPage, "render", autospec=True, side_effect=pdfium.PdfPage.render) as render:
+            pages = _iter_pages(blank_pdf)
+            next(pages)
+            assert render.call_count == 1
+            pages.close()
+
+
+class TestProcessPages:
+    """Tests for concurrent page dispatch in _process_pages."""
+
+    async def _fake_process_page(self, page_index, b64_img, models, pool, max_retries=3):
+        import asyncio
+        # Later pages finish first to make ordering bugs visible
+        await asyncio.sleep(0.01 * (5 - page_index))
+        logs = [{"page": page_index + 1, "status": "success"}]
+        return [{"designation": b64_img}], {"invoice_number": f"INV-{page_index}"}, logs
+
+    async def test_preserves_page_order(self):
+        """Test that results come back in page order when run concurrently."""
+        from unittest.mock import patch
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_pages
+
+        pages = [(i, f"page-{i}") for i in range(5)]
+        with patch("app.services.parser._process_page", side_effect=self._fake_process_page):
+            results = await _process_pages(pages, ["model"], KeyPool(["k1", "k2", "k3"]), max_concurrency=4)
+
+        assert [results[i][0][0]["designation"] for i in range(5)] == [b64 for _, b64 in pages]
+        assert results[0][1]["invoice_number"] == "INV-0"
+
+    async def test_consumes_generator_with_bounded_window(self):
+        """Test that pages are pulled lazily, never more than workers + 1 ahead."""
+        import threading
+        from unittest.mock import patch
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_pages
+
+        produced = []
+        completed = []
+        max_ahead = []
+        lock = threading.Lock()
+
+        def pages():
+            for i in range(6):
+                with lock:
+                    max_ahead.append(len(produced) - len(completed))
+                produced.append(i)
+                yield i, f"page-{i}"
+
+        async def fake_page(*args, **kwargs):
+            result = await self._fake_process_page(*args, **kwargs)
+            with lock:
+                completed.append(args[0])
+            return result
+
+        with patch("app.services.parser._process_page", side_effect=fake_page):
+            results = await _process_pages(pages(), ["model"], KeyPool(["k1", "k2"]), max_concurrency=2)
+
+        assert sorted(results) == list(range(6))
+        assert max(max_ahead) <= 3
+
+    async def _track_concurrency(self, pool, max_concurrency, page_count=4):
+        import asyncio
+        from unittest.mock import patch
+        from app.services.parser import _process_pages
+
+        active = []
+        peak = []
+
+        async def fake_page(page_index, *args, **kwargs):
+            active.append(page_index)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.remove(page_index)
+            return [], {}, [{"page": page_index + 1, "status": "success"}]
+
+        pages = [(i, "b64") for i in range(page_count)]
+        with patch("app.services.parser._process_page", side_effect=fake_page):
+            results = await _process_pages(pages, ["model"], pool, max_concurrency=max_concurrency)
+        assert sorted(results) == list(range(page_count))
+        return max(peak)
+
+    async def test_concurrency_bounded_by_healthy_keys(self):
+        """Test that keys cooling down do not count towards parallelism."""
+        from app.services.key_pool import KeyPool
+
+        pool = KeyPool(["k1", "k2", "k3"])
+        pool.acquire(exclude=[1, 2])
+        pool.release(0, "rate_limit", retry_after=60)
+        pool.acquire(exclude=[0, 2])
+        pool.release(1, "rate_limit", retry_after=60)
+
+        assert await self._track_concurrency(pool, max_concurrency=4) == 1
+
+    async def test_sequential_when_concurrency_is_one(self):
+        """Test that max_concurrency=1 processes pages one at a time."""
+        from app.services.key_pool import KeyPool
+
+        assert await self._track_concurrency(KeyPool(["k1", "k2"]), max_concurrency=1) == 1
+        assert await self._track_concurrency(KeyPool(["k1", "k2", "k3"]), max_concurrency=3) == 3
+
+    async def test_cancellation_cancels_in_flight_pages(self):
+        """Test that cancelling the dispatch cancels every page request."""
+        import asyncio
+        from unittest.mock import patch
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_pages
+
+        cancelled = []
+
+        async def slow_page(page_index, *args, **kwargs):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(page_index)
+                raise
+
+        pages = [(i, "b64") for i in range(3)]
+        with patch("app.services.parser._process_page", side_effect=slow_page):
+            task = asyncio.ensure_future(_process_pages(pages, ["model"], KeyPool(["k1", "k2"]), max_concurrency=2))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        assert sorted(cancelled) == [0, 1]
+
+
+class TestProcessPage:
+    """Tests for _process_page key scheduling."""
+
+    def _client(self, responses):
+        """LLM client whose transport replays `responses` and records requests."""
+        import json
+        import httpx
+        from app.services.llm_client import LLMClient
+
+        requests = []
+        responses = list(responses)
+
+        def handler(request):
+            requests.append(request)
+            status_code, content, headers = responses.pop(0)
+            body = {
+                "choices": [{"message": {"content": json.dumps(content or {})}}],
+                "usage": {"total_tokens": 42},
+            }
+            return httpx.Response(status_code, json=body, headers=headers or {})
+
+        return LLMClient(transport=httpx.MockTransport(handler)), requests
+
+    async def test_rate_limited_key_is_skipped(self):
+        """Test that a 429 moves on to another key without sleeping."""
+        from unittest.mock import patch
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_page
+
+        pool = KeyPool(["key-a", "key-b"])
+        client, requests = self._client([
+            (429, None, {"retry-after": "30"}),
+            (200, {"items": [{"designation": "R1.003"}], "invoice_number": "42"}, None),
+        ])
+        with patch("asyncio.sleep") as sleep:
+            items, metadata, logs = await _process_page(0, "b64", ["model"], pool, client=client)
+
+        assert items == [{"designation": "R1.003"}]
+        assert metadata["invoice_number"] == "42"
+        sleep.assert_not_called()
+        used_keys = [r.headers["Authorization"] for r in requests]
+        assert used_keys == ["Bearer key-a", "Bearer key-b"]
+        assert logs[0]["retry_after"] == 30.0
+        assert logs[-1]["tokens"] == 42
+
+    async def test_invalid_key_is_parked(self):
+        """Test that a 401 key is skipped by later pages too."""
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_page
+
+        pool = KeyPool(["key-a", "key-b"])
+        client, requests = self._client([
+            (401, None, None),
+            (200, {"items": []}, None),
+            (200, {"items": []}, None),
+        ])
+        _, _, first_logs = await _process_page(0, "b64", ["model"], pool, client=client)
+        _, _, second_logs = await _process_page(1, "b64", ["model"], pool, client=client)
+
+        used_keys = [r.headers["Authorization"] for r in requests]
+        assert used_keys == ["Bearer key-a", "Bearer key-b", "Bearer key-b"]
+        assert first_logs[0]["status"] == "failed"
+        assert second_logs[-1]["status"] == "success"
+
+    async def test_cancel_releases_key(self):
+        """Test that cancelling a page mid-request frees the key without a penalty."""
+        import asyncio
+        import httpx
+        from app.services.key_pool import KeyPool
+        from app.services.llm_client import LLMClient
+        from app.services.parser import _process_page
+
+        async def hang(request):
+            await asyncio.sleep(10)
+
+        pool = KeyPool(["key-a"])
+        client = LLMClient(transport=httpx.MockTransport(hang))
+        task = asyncio.ensure_future(_process_page(0, "b64", ["model"], pool, client=client))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        stats = pool.stats[0]
+        assert stats["in_flight"] == 0
+        assert stats["failures"] == 0
+        assert stats["cooldown_seconds"] == 0
+
+
+class TestProcessPageWithMockServer:
+    """Tests for _process_page against tools/mock_groq_server.py (in-process)."""
+
+    @staticmethod
+    def _client(timeout=60, **config):
+        from app.services.llm_client import LLMClient
+        from tools.mock_groq_server import MockConfig, asgi_transport, create_app
+
+        app = create_app(MockConfig(seed=1, **config))
+        client = LLMClient(base_url="http://mock/openai/v1", timeout=timeout, transport=asgi_transport(app))
+        return client, app.state.stats
+
+    async def test_replays_recorded_fixture(self, tmp_path):
+        """Test that a fixture recorded for the page hash is returned."""
+        import json
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_page
+        from tools.mock_groq_server import page_hash
+
+        digest = page_hash({"messages": [{"content": [
+            {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,page-one"}}
+        ]}]})
+        content = json.dumps({"items": [{"designation": "R1.003", "quantity": 4}], "invoice_date": "2025-01-15"})
+        (tmp_path / f"{digest}.json").write_text(json.dumps({"content": content, "usage": {"total_tokens": 900}}))
+        client, stats = self._client(fixtures_dir=str(tmp_path))
+
+        items, metadata, logs = await _process_page(0, "page-one", ["model"], KeyPool(["key-a"]), client=client)
+
+        assert items == [{"designation": "R1.003", "quantity": 4}]
+        assert metadata["invoice_date"] == "15.01.2025"
+        assert logs[-1]["tokens"] == 900
+        assert stats["replayed"] == 1
+
+    async def test_key_rpm_limit_rotates_keys(self):
+        """Test that per-key 429s with Retry-After move pages to the other key."""
+        from unittest.mock import patch
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_page
+
+        client, stats = self._client(key_rpm=1)
+        pool = KeyPool(["key-a", "key-b"])
+        with patch("asyncio.sleep") as sleep:
+            results = [await _process_page(i, f"page-{i}", ["model"], pool, client=client) for i in range(2)]
+
+        assert all(items for items, _, _ in results)
+        assert sleep.call_count == 0
+        assert {state["successes"] for state in pool.stats} == {1}
+        assert stats["requests"] - stats["rate_limited"] == 2
+
+    async def test_server_errors_exhaust_retries(self):
+        """Test that persistent 503s give up after max_retries per key."""
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_page
+
+        client, stats = self._client(rate_5xx=1.0)
+        items, _, logs = await _process_page(0, "b64", ["model"], KeyPool(["key-a"]), max_retries=2, client=client)
+
+        assert items == []
+        assert not any(log["status"] == "success" for log in logs)
+        assert stats["server_errors"] == 2
+
+    async def test_hanging_request_times_out(self):
+        """Test that a hanging request becomes a timeout and the key is released."""
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_page
+
+        client, stats = self._client(timeout=0.1, rate_timeout=1.0, hang_seconds=5)
+        pool = KeyPool(["key-a"])
+        items, _, logs = await _process_page(0, "b64", ["model"], pool, max_retries=1, client=client)
+
+        assert items == []
+        assert [log["status"] for log in logs] == ["timeout"]
+        assert stats["timeouts"] == 1
+        assert pool.stats[0]["in_flight"] == 0
+
+    async def test_load_driver_reports_latency(self):
+        """Test the load driver's percentile and outcome accounting."""
+        import asyncio
+        from tools.load_test import percentile, run_load
+
+        async def send(i):
+            await asyncio.sleep(0.001 * i)
+            if i == 3:
+                raise RuntimeError("boom")
+            return "ok"
+
+        report = await run_load(send, requests=5, concurrency=2)
+
+        assert report["outcomes"] == {"ok": 4, "RuntimeError": 1}
+        assert report["latency_max"] >= report["latency_p50"]
+        assert percentile([1, 2, 3, 4], 50) == 2
+        assert percentile([1, 2, 3, 4], 99) == 4
+
+
+class TestBatchedPages:
+    """Tests for multi-page requests (_batch_pages, _process_batch)."""
+
+    def test_batches_by_count_and_bytes(self):
+        """Test grouping by page count and by the image byte budget."""
+        from app.services.parser import _batch_pages
+
+        pages = [(i, "x" * size) for i, size in enumerate([10, 10, 10, 30, 10])]
+
+        by_count = [[i for i, _ in batch] for batch in _batch_pages(iter(pages), max_pages=2)]
+        by_bytes = [[i for i, _ in batch] for batch in _batch_pages(iter(pages), max_pages=5, max_bytes=25)]
+
+        assert by_count == [[0, 1], [2, 3], [4]]
+        assert by_bytes == [[0, 1], [2], [3], [4]]
+
+    def test_split_requires_page_tags(self):
+        """Test that items are split by page tag and untagged output is rejected."""
+        from app.services.parser import _split_batch_items
+
+        items = [{"page": 2, "designation": "B"}, {"page": "1", "designation": "A"}]
+
+        assert _split_batch_items(items, 2) == [[{"designation": "A"}], [{"designation": "B"}]]
+        assert _split_batch_items([{"designation": "A"}], 2) is None
+        assert _split_batch_items([{"page": 3, "designation": "A"}], 2) is None
+        assert _split_batch_items(["A"], 2) is None
+
+    async def test_one_request_for_batch(self):
+        """Test that a batch costs one request and items land on their pages."""
+        from app.services.key_pool import KeyPool
+        from app.services.llm_client import LLMClient
+        from app.services.parser import _process_batch
+        from tools.mock_groq_server import MockConfig, asgi_transport, create_app
+
+        app = create_app(MockConfig(seed=1))
+        client = LLMClient(base_url="http://mock/openai/v1", transport=asgi_transport(app))
+
+        results = await _process_batch([(0, "page-a"), (2, "page-c")], ["model"], KeyPool(["key-a"]), client=client)
+
+        assert app.state.stats["requests"] == 1
+        assert sorted(results) == [0, 2]
+        assert results[0][0][0]["designation"].endswith("-p1")
+        assert results[2][0][0]["designation"].endswith("-p2")
+        assert results[0][1]["invoice_number"].startswith("MOCK-")
+        assert results[2][1] == {}
+        assert results[0][2][-1]["tokens"] > 0
+        assert results[2][2] == [{"page": 3, "status": "success", "batch": [1, 3], "tokens": 0}]
+
+    async def test_malformed_batch_falls_back(self):
+        """Test that untagged batch output is retried page by page."""
+        import json
+        import httpx
+        from app.services.key_pool import KeyPool
+        from app.services.llm_client import LLMClient
+        from app.services.parser import _process_batch
+
+        images_per_request = []
+
+        def handler(request):
+            content = json.loads(request.content)["messages"][0]["content"]
+            images = [part for part in content if part["type"] == "image_url"]
+            images_per_request.append(len(images))
+            designation = images[0]["image_url"]["url"].rsplit(",", 1)[1]
+            body = {"choices": [{"message": {"content": json.dumps({"items": [{"designation": designation}]})}}],
+                    "usage": {"total_tokens": 10}}
+            return httpx.Response(200, json=body)
+
+        client = LLMClient(transport=httpx.MockTransport(handler))
+        results = await _process_batch([(0, "A"), (1, "B")], ["model"], KeyPool(["key-a"]), client=client)
+
+        assert images_per_request == [2, 1, 1]
+        assert results[0][0] == [{"designation": "A"}]
+        assert results[1][0] == [{"designation": "B"}]
+        assert results[0][2][0]["status"] == "batch_invalid"
+        tokens = sum(log.get("tokens", 0) for _, _, logs in results.values() for log in logs
+                     if log["status"] == "success")
+        assert tokens == 20
+
+    async def test_process_pages_uses_batches(self):
+        """Test that _process_pages groups pages when PAGE_BATCH_SIZE > 1."""
+        from unittest.mock import patch
+        from app.services.key_pool import KeyPool
+        from app.services.parser import _process_pages
+
+        batches = []
+
+        async def fake_batch(batch, models, pool):
+            batches.append([i for i, _ in batch])
+            return {i: ([{"designation": b64}], {}, [{"page": i + 1, "status": "success"}]) for i, b64 in batch}
+
+        pages = [(i, f"page-{i}") for i in range(5)]
+        with patch("app.services.parser.settings.PAGE_BATCH_SIZE", 2), \
+                patch("app.services.parser._process_batch", side_effect=fake_batch), \
+                patch("app.services.parser._process_page") as single:
+            single.return_value = ([{"designation": "page-4"}], {}, [{"page": 5, "status": "success"}])
+            results = await _process_pages(pages, ["model"], KeyPool(["k1", "k2"]), max_concurrency=2)
+
+        assert batches == [[0, 1], [2, 3]]
+        assert single.call_count == 1
+        assert [results[i][0][0]["designation"] for i in range(5)] == [b64 for _, b64 in pages]
+
+
 class TestParseInvoiceIntegration:
     """Integration tests for parse_invoice (requires API keys)."""
 
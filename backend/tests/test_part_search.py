@@ -0,0 +1,171 @@
+"""Unit tests for part_search.py - pg_trgm parts search and its fallbacks."""
+
+
+class _DriverError(Exception):
+    """DBAPI error with a SQLSTATE, as raised by asyncpg."""
+
+    def __init__(self, message, sqlstate):
+        super().__init__(message)
+        self.sqlstate = sqlstate
+
+
+def _parts(*designations):
+    from app.db.models import Part
+    return [Part(designation=d, name=f"Part {d}") for d in designations]
+
+
+def _compile(statement):
+    from sqlalchemy.dialects import postgresql
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestTrigramQueries:
+    """Tests for the PostgreSQL statements."""
+
+    def test_similar_query_uses_trigram_operators(self):
+        """Test that the similar search filters with % / ILIKE and orders by similarity."""
+        from app.services.part_search import similar_query
+
+        sql = _compile(similar_query("R1.003"))
+
+        assert "parts.designation %% " in sql
+        assert "parts.name ILIKE" in sql
+        assert "ORDER BY CASE WHEN (public.parts.designation_norm = " in sql
+        assert "END, greatest(similarity(public.parts.designation" in sql
+
+    def test_nearest_query_is_knn(self):
+        """Test that nearest designations are found with the <-> distance operator."""
+        from app.services.part_search import NEAREST_SQL
+
+        sql = str(NEAREST_SQL)
+
+        assert "ORDER BY parts.designation <-> q.query" in sql
+        assert "CROSS JOIN LATERAL" in sql
+
+
+class TestTrigramSupported:
+    """Tests for dialect detection."""
+
+    def test_postgres_only(self, make_session):
+        """Test that only PostgreSQL sessions use trigram queries."""
+        from app.services.part_search import trigram_supported
+
+        assert trigram_supported(make_session([], dialect="postgresql"))
+        assert not trigram_supported(make_session([], dialect="sqlite"))
+        assert not trigram_supported(make_session([]))
+
+    def test_disabled_by_setting(self, monkeypatch, make_session):
+        """Test that PG_TRGM_ENABLED=false keeps PostgreSQL on the fallback."""
+        from app.core.config import settings
+        from app.services.part_search import trigram_supported
+
+        monkeypatch.setattr(settings, "PG_TRGM_ENABLED", False)
+
+        assert not trigram_supported(make_session([], dialect="postgresql"))
+
+
+class TestSearchParts:
+    """Tests for search_parts."""
+
+    async def test_similar_fallback_ranks_in_process(self, make_session):
+        """Test that SQLite ranks near misses by trigram similarity, best first."""
+        from app.services.part_search import search_parts
+
+        db = make_session(_parts("BOLT-M8", "BUSHING-1234", "BUSHING-1235", "NUT-12"))
+
+        results = await search_parts(db, "BUSHlNG-1234", mode="similar")
+
+        assert [part.designation for part in results[:2]] == ["BUSHING-1234", "BUSHING-1235"]
+        assert "BOLT-M8" not in [part.designation for part in results]
+
+    async def test_similar_fallback_normalized_first(self, make_session):
+        """Test that a differently spelled designation ranks its normalized match first."""
+        from app.services.part_search import search_parts
+
+        db = make_session(_parts("R1.01.00.002", "R1.01.00.001", "BOLT-M8"))
+
+        results = await search_parts(db, "r1 01 00 001", mode="similar")
+
+        assert results[0].designation == "R1.01.00.001"
+
+    async def test_similar_on_postgres(self, make_session):
+        """Test that PostgreSQL runs one ranked query with offset and limit."""
+        from app.services.part_search import search_parts
+
+        db = make_session(_parts("R1.003"), dialect="postgresql")
+
+        results = await search_parts(db, "R1.OO3", skip=10, limit=5, mode="similar")
+
+        assert [part.designation for part in results] == ["R1.003"]
+        sql = _compile(db.statements[0])
+        assert len(db.statements) == 1
+        assert "similarity" in sql and "LIMIT" in sql and "OFFSET" in sql
+
+    async def test_missing_extension_falls_back(self, make_session):
+        """Test that a missing pg_trgm switches to the in-process path for good."""
+        from sqlalchemy.exc import ProgrammingError
+        from app.services import part_search
+
+        db = make_session(_parts("R1.003"), dialect="postgresql",
+                          error=ProgrammingError("SELECT", {}, _DriverError("function similarity does not exist", "42883")))
+        try:
+            assert await part_search.nearest_parts(db, ["R1.OO3"]) is None
+            assert not part_search.trigram_supported(db)
+        finally:
+            part_search.reset_availability()
+
+    async def test_transient_error_falls_back_once(self, make_session):
+        """Test that a timeout or dropped connection does not disable trigram queries."""
+        from sqlalchemy.exc import OperationalError
+        from app.services import part_search
+
+        db = make_session(_parts("R1.003"), dialect="postgresql",
+                          error=OperationalError("SELECT", {}, _DriverError("canceling statement due to statement timeout", "57014")))
+        try:
+            assert await part_search.nearest_parts(db, ["R1.OO3"]) is None
+            assert part_search.trigram_supported(db)
+        finally:
+            part_search.reset_availability()
+
+    async def test_contains_mode(self, make_session):
+        """Test that the default mode keeps the ILIKE substring filter."""
+        from app.services.part_search import search_parts
+
+        db = make_session(_parts("R1.003"), dialect="postgresql")
+
+        await search_parts(db, "R1", limit=5)
+
+        sql = _compile(db.statements[0])
+        assert "ILIKE" in sql and "similarity" not in sql
+        assert "public.parts.designation_norm = " in sql
+
+
+class TestPartMatcherKnn:
+    """Tests for the database-side fuzzy path of PartMatcher."""
+
+    async def test_fuzzy_uses_knn_candidates(self, monkeypatch, make_session):
+        """Test that leftovers are scored on KNN candidates without loading all parts."""
+        from app.services import invoice_matcher
+        from app.services.invoice_matcher import PartMatcher
+
+        calls = []
+
+        async def fake_nearest(db, designations):
+            calls.append(sorted(designations))
+            return {d: _parts("BUSHING-1234", "BOLT-M8") for d in designations}
+
+        async def no_full_load(db):
+            raise AssertionError("parts list must not be loaded")
+
+        monkeypatch.setattr(invoice_matcher, "nearest_parts", fake_nearest)
+        monkeypatch.setattr(invoice_matcher, "load_all_parts", no_full_load)
+        db = make_session([], dialect="postgresql")
+
+        results = await PartMatcher(db).match_items([
+            {"designation": "BUSHlNG-1234", "raw_description": "", "quantity": 1},
+            {"designation": "UNKNOWN", "raw_description": "", "quantity": 1},
+        ])
+
+        assert calls == [["BUSHlNG-1234", "UNKNOWN"]]
+        assert "[Fuzzy Match: BUSHING-1234]" in results[0].description
+        assert not results[1].found_in_db
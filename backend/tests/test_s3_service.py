@@ -259,3 +259,36 @@ class TestS3Service:
         assert "ttl_seconds" in stats
         assert stats["max_size"] == 100
         assert stats["ttl_seconds"] == 3600
+
+    @patch('app.services.s3.boto3.client')
+    def test_list_objects_all_pages(self, mock_boto_client):
+        """Test that listing follows pagination and returns keys."""
+        from app.services.s3 import S3Service
+
+        mock_s3 = MagicMock()
+        mock_boto_client.return_value = mock_s3
+        mock_s3.get_paginator.return_value.paginate.return_value = [
+            {'Contents': [{'Key': 'R1.003.webp'}, {'Key': 'R1.004.webp'}]},
+            {'Contents': [{'Key': 'R1.005.jpg'}]},
+            {},
+        ]
+
+        service = S3Service()
+
+        assert service.list_objects() == ['R1.003.webp', 'R1.004.webp', 'R1.005.jpg']
+        mock_s3.get_paginator.assert_called_once_with('list_objects_v2')
+
+    @patch('app.services.s3.boto3.client')
+    def test_list_objects_error_returns_none(self, mock_boto_client):
+        """Test that listing errors return None instead of an empty listing."""
+        from app.services.s3 import S3Service
+
+        mock_s3 = MagicMock()
+        mock_boto_client.return_value = mock_s3
+        mock_s3.get_paginator.return_value.paginate.side_effect = ClientError(
+            {'Error': {'Code': 'AccessDenied', 'Message': 'Denied'}}, 'ListObjectsV2'
+        )
+
+        service = S3Service()
+
+        assert service.list_objects() is None
@@ -0,0 +1,172 @@
+"""Unit tests for text_extractor.py - Text-layer line item extraction."""
+
+COLUMNS = [50, 150, 300, 380, 470, 545]
+HEADER_LINES = [
+    (50, 800, "Seller: Ningbo Trading Co., Ltd."),
+    (50, 780, "Invoice No: PI-2025-01"),
+    (50, 765, "Date: 2025-10-24"),
+    (50, 750, "Contract No: C-77"),
+    (50, 735, "Contract Date: 2025-09-01"),
+]
+TABLE = [
+    ["Part No.", "Name", "Qty", "Unit Price", "Amount"],
+    ["R1.003", "Bushing", "10", "1.50", "15.00"],
+    ["R1.004", "Plate", "5", "2.00", "10.00"],
+    ["", "Total", "15", "", "25.00"],
+]
+
+
+class TestParseNumber:
+    """Tests for _parse_number helper."""
+
+    def test_formats(self):
+        """Test thousands separators, decimal commas and currency symbols."""
+        from app.services.text_extractor import _parse_number
+        assert _parse_number("1,234.50") == 1234.5
+        assert _parse_number("$12.00") == 12.0
+        assert _parse_number("12,5") == 12.5
+        assert _parse_number("1,234") == 1234.0
+        assert _parse_number("") is None
+        assert _parse_number("n/a") is None
+
+
+class TestExtractTableItems:
+    """Tests for extract_table_items."""
+
+    def test_maps_columns_and_skips_totals(self):
+        """Test header mapping and that total rows are ignored."""
+        from app.services.text_extractor import extract_table_items
+
+        result = extract_table_items(TABLE)
+
+        assert [item["designation"] for item in result["items"]] == ["R1.003", "R1.004"]
+        assert result["items"][0]["quantity"] == 10
+        assert result["items"][0]["unit_price"] == 1.5
+        assert result["items"][0]["total_price"] == 15.0
+        assert result["valid_rows"] == result["rows"] == 2
+
+    def test_prefers_specific_header(self):
+        """Test that 'Total Price' maps to total_price, not unit_price."""
+        from app.services.text_extractor import _match_header
+
+        columns = _match_header(["Model", "Qty", "Total Price", "Price"])
+
+        assert columns == {"designation": 0, "quantity": 1, "total_price": 2, "unit_price": 3}
+
+    def test_table_without_header(self):
+        """Test that tables without an item header are ignored."""
+        from app.services.text_extractor import extract_table_items
+
+        assert extract_table_items([["Bank", "SWIFT"], ["ICBC", "ICBKCNBJ"]]) is None
+
+    def test_low_quality_rows(self):
+        """Test that rows without code-like designations lower the valid count."""
+        from app.services.text_extractor import extract_table_items
+
+        result = extract_table_items([["Part No.", "Qty"], ["Bushing", "10"], ["R1.003", "x"]])
+
+        assert result["rows"] == 2
+        assert result["valid_rows"] == 0
+
+
+class TestExtractMetadata:
+    """Tests for extract_metadata."""
+
+    def test_invoice_number_and_date(self):
+        """Test invoice and contract metadata extraction."""
+        from app.services.text_extractor import extract_metadata
+
+        metadata = extract_metadata("PROFORMA INVOICE\nInvoice No: PI-2025-01\nDate: 2025-10-24\nContract No. C-77")
+
+        assert metadata["invoice_number"] == "PI-2025-01"
+        assert metadata["invoice_date"] == "24.10.2025"
+        assert metadata["contract_number"] == "C-77"
+        assert metadata["supplier"] is None
+
+    def test_supplier(self):
+        """Test that a labelled supplier is read up to the end of the line or the buyer."""
+        from app.services.text_extractor import extract_metadata
+
+        assert extract_metadata("Seller: Ningbo Trading Co., Ltd.  Buyer: OOO Romashka")["supplier"] == "Ningbo Trading Co., Ltd."
+        assert extract_metadata("Поставщик: ООО Ромашка\nИНН 7701")["supplier"] == "ООО Ромашка"
+        assert extract_metadata("Some supplier letterhead text\nSupplier:\nINV")["supplier"] is None
+
+
+class TestTextLayerExtractor:
+    """Tests for TextLayerExtractor on generated PDFs."""
+
+    def test_extracts_items_from_pdf(self, text_pdf):
+        """Test end-to-end extraction from a ruled table."""
+        from app.services.text_extractor import TextLayerExtractor
+
+        path = text_pdf(HEADER_LINES, TABLE, COLUMNS)
+        with TextLayerExtractor(path) as extractor:
+            result = extractor.extract_page(0)
+
+        assert result["confidence"] == 1.0
+        assert [item["designation"] for item in result["items"]] == ["R1.003", "R1.004"]
+        assert result["metadata"]["invoice_number"] == "PI-2025-01"
+        assert len(result["tables"]) == 1
+        x0, top, x1, bottom = result["tables"][0]
+        page_width, page_height = result["page_size"]
+        assert 0 <= x0 < x1 <= page_width
+        assert 0 <= top < bottom <= page_height
+
+    def test_page_without_text(self, text_pdf):
+        """Test that pages without a text layer return None."""
+        from app.services.text_extractor import TextLayerExtractor
+
+        path = text_pdf([(50, 780, "Hi")])
+        with TextLayerExtractor(path) as extractor:
+            assert extractor.extract_page(0) is None
+
+
+class TestParserTextLayer:
+    """Tests for the text-layer fast path in _extract_items."""
+
+    async def test_confident_page_skips_llm(self, text_pdf):
+        """Test that a confident text-layer page is neither rendered nor sent."""
+        from unittest.mock import patch
+        from app.services.parser import _extract_items
+
+        path = text_pdf(HEADER_LINES, TABLE, COLUMNS)
+        with patch("app.services.parser._process_page") as process_page, \
+                patch("app.services.parser._encode_image") as encode:
+            items, debug_info = await _extract_items(path, use_cache=False)
+
+        process_page.assert_not_called()
+        encode.assert_not_called()
+        assert [item["designation"] for item in items] == ["R1.003", "R1.004"]
+        assert items[0]["parsing_method"] == "Text Layer"
+        assert debug_info["method_used"] == "Text Layer"
+        assert debug_info["invoice_metadata"]["invoice_number"] == "PI-2025-01"
+        assert debug_info["invoice_metadata"]["supplier"] == "Ningbo Trading Co., Ltd."
+        assert debug_info["error"] is None
+
+    async def test_first_page_without_invoice_number_uses_llm(self, text_pdf):
+        """Test that page 1 falls back to the LLM when metadata is missing."""
+        from unittest.mock import patch
+        from app.services.parser import _extract_items
+
+        path = text_pdf([(50, 780, "Some supplier letterhead text")], TABLE, COLUMNS)
+        llm_result = ([{"designation": "R1.003"}], {"invoice_number": "X"}, [{"page": 1, "status": "success"}])
+        with patch("app.services.parser._process_page", return_value=llm_result) as process_page:
+            items, debug_info = await _extract_items(path, use_cache=False)
+
+        assert process_page.call_count == 1
+        assert items[0]["parsing_method"] == "Groq Multi-Key"
+        assert debug_info["pages"][0]["source"] == "llm"
+
+    async def test_first_page_without_supplier_uses_llm(self, text_pdf):
+        """Test that page 1 still goes to the LLM when only some metadata fields are found."""
+        from unittest.mock import patch
+        from app.services.parser import _extract_items
+
+        path = text_pdf(HEADER_LINES[1:], TABLE, COLUMNS)
+        llm_metadata = {"invoice_number": "PI-2025-01", "supplier": "Ningbo Trading Co., Ltd."}
+        llm_result = ([{"designation": "R1.003"}], llm_metadata, [{"page": 1, "status": "success"}])
+        with patch("app.services.parser._process_page", return_value=llm_result) as process_page:
+            _, debug_info = await _extract_items(path, use_cache=False)
+
+        assert process_page.call_count == 1
+        assert debug_info["invoice_metadata"]["supplier"] == "Ningbo Trading Co., Ltd."
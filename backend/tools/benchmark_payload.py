@@ -0,0 +1,156 @@
+"""
+Benchmark page payload optimizer settings on sample invoices.
+
+For every PDF and every setting, reports bytes sent, encode time and
+(with --call) LLM latency, tokens and extraction accuracy. Accuracy is
+measured against the designations extracted with the baseline setting,
+or against an expected-results JSON file ({"file.pdf": ["R1.003", ...]}).
+
+Usage:
+    python tools/benchmark_payload.py tests/fixtures
+    python tools/benchmark_payload.py invoice.pdf --call --expected expected.json
+    python tools/benchmark_payload.py tests/fixtures --crop  # Pages cropped to the item table
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.key_pool import key_pool
+from app.services.llm_client import llm_client
+from app.services.page_layout import crop_to_items
+from app.services.page_optimizer import PayloadOptions, optimize_page
+from app.services.parser import GROQ_MODELS, _iter_pages, _process_page
+
+# Candidate settings: name -> options
+SETTINGS = {
+    "baseline": PayloadOptions(),
+    "trim": PayloadOptions(trim_margins=True),
+    "gray": PayloadOptions(grayscale=True),
+    "edge2000": PayloadOptions(max_long_edge=2000),
+    "edge1600_gray_trim": PayloadOptions(max_long_edge=1600, grayscale=True, trim_margins=True),
+    "budget400k": PayloadOptions(trim_margins=True, byte_budget=400 * 1024),
+    "budget250k_gray": PayloadOptions(trim_margins=True, grayscale=True, byte_budget=250 * 1024),
+}
+
+
+async def _send_page(page_index, b64_img):
+    """One page request; closes the pooled client before asyncio.run closes its loop."""
+    try:
+        return await _process_page(page_index, b64_img, GROQ_MODELS, key_pool)
+    finally:
+        await llm_client.aclose()
+
+
+def find_pdfs(paths):
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdfs.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(".pdf")
+            )
+        else:
+            pdfs.append(path)
+    return pdfs
+
+
+def score(found, expected):
+    """Precision / recall / F1 of extracted designations against expected ones."""
+    found, expected = set(found), set(expected)
+    if not found and not expected:
+        return 1.0, 1.0, 1.0
+    hits = len(found & expected)
+    precision = hits / len(found) if found else 0.0
+    recall = hits / len(expected) if expected else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def run_setting(pages, options, call_llm, crop=False):
+    """Encode (and optionally parse) all pages with one setting."""
+    import base64
+
+    result = {"bytes": 0, "encode_s": 0.0, "llm_s": 0.0, "tokens": 0, "designations": []}
+    for i, image in pages:
+        start = time.perf_counter()
+        if crop:
+            image, _ = crop_to_items(image, keep_header=i == 0)
+        data, _ = optimize_page(image, options)
+        result["encode_s"] += time.perf_counter() - start
+        result["bytes"] += len(data)
+
+        if call_llm:
+            b64_img = base64.b64encode(data).decode("utf-8")
+            start = time.perf_counter()
+            items, _, logs = asyncio.run(_send_page(i, b64_img))
+            result["llm_s"] += time.perf_counter() - start
+            result["tokens"] += sum(log.get("tokens", 0) for log in logs if log["status"] == "success")
+            result["designations"].extend(
+                (item.get("designation") or "").replace(" ", "") for item in items
+            )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="PDF files or directories with PDFs")
+    parser.add_argument("--call", action="store_true", help="Send pages to Groq (uses real quota)")
+    parser.add_argument("--expected", help="JSON file with expected designations per PDF")
+    parser.add_argument("--settings", nargs="*", choices=list(SETTINGS), help="Only run these settings")
+    parser.add_argument("--crop", action="store_true", help="Crop pages to the item table first (PAGE_LAYOUT_CROP)")
+    args = parser.parse_args()
+
+    expected = {}
+    if args.expected:
+        with open(args.expected, "r", encoding="utf-8") as f:
+            expected = json.load(f)
+
+    names = args.settings or list(SETTINGS)
+    if args.call and "baseline" not in names and not expected:
+        names.insert(0, "baseline")  # Needed as the accuracy reference
+
+    totals = {name: {"bytes": 0, "encode_s": 0.0, "llm_s": 0.0, "tokens": 0, "f1": []} for name in names}
+
+    for pdf_path in find_pdfs(args.paths):
+        print(f"\n=== {os.path.basename(pdf_path)} ===")
+        pages = list(_iter_pages(pdf_path))
+        reference = expected.get(os.path.basename(pdf_path))
+
+        for name in names:
+            result = run_setting(pages, SETTINGS[name], args.call, crop=args.crop)
+            if args.call and name == "baseline" and reference is None:
+                reference = result["designations"]
+
+            line = f"{name:<22} {result['bytes'] / 1024:>9.0f} KB  encode {result['encode_s']:.2f}s"
+            if args.call:
+                precision, recall, f1 = score(result["designations"], reference or [])
+                totals[name]["f1"].append(f1)
+                line += (
+                    f"  llm {result['llm_s']:.1f}s  tokens {result['tokens']:>6}"
+                    f"  P {precision:.2f} R {recall:.2f} F1 {f1:.2f}"
+                )
+            print(line)
+
+            for key in ("bytes", "encode_s", "llm_s", "tokens"):
+                totals[name][key] += result[key]
+
+        for _, image in pages:
+            image.close()
+
+    print("\n=== Totals ===")
+    for name in names:
+        total = totals[name]
+        line = f"{name:<22} {total['bytes'] / 1024:>9.0f} KB  encode {total['encode_s']:.2f}s"
+        if args.call:
+            mean_f1 = sum(total["f1"]) / len(total["f1"]) if total["f1"] else 0.0
+            line += f"  llm {total['llm_s']:.1f}s  tokens {total['tokens']:>6}  mean F1 {mean_f1:.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
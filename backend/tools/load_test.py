@@ -0,0 +1,164 @@
+"""
+Load test for invoice parsing: N concurrent uploads, throughput and tail latency.
+
+Modes:
+- --url: POST to a running backend (start it with GROQ_BASE_URL pointing at
+  tools/mock_groq_server.py to avoid spending Groq quota)
+- --in-process: call the real FastAPI app through an ASGI transport
+  (needs the database for item matching)
+- --parser-only: call parse_invoice_async directly (no HTTP, no database)
+
+With --in-process/--parser-only, --mock routes LLM calls to an in-process
+mock server; the fault flags of tools/mock_groq_server.py apply.
+
+Usage:
+    python tools/load_test.py invoice.pdf --parser-only --mock --latency 1 --rate-429 0.1 -n 40 -c 8
+    python tools/load_test.py invoice.pdf --url http://127.0.0.1:8000 -n 20 -c 5
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.mock_groq_server import add_mock_arguments, asgi_transport, config_from_args, create_app
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def run_load(send, requests: int, concurrency: int):
+    """Run `send(i)` `requests` times with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    outcomes = Counter()
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                outcome = await send(i)
+            except Exception as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            outcomes[outcome] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_rps": round(requests / elapsed, 3) if elapsed else 0.0,
+        "latency_p50": round(percentile(latencies, 50), 3),
+        "latency_p90": round(percentile(latencies, 90), 3),
+        "latency_p99": round(percentile(latencies, 99), 3),
+        "latency_max": round(max(latencies, default=0.0), 3),
+        "outcomes": dict(outcomes),
+    }
+
+
+def http_sender(client: httpx.AsyncClient, pdf_bytes: bytes, filename: str, use_cache: bool):
+    async def send(i):
+        response = await client.post(
+            "/api/v1/invoices/upload",
+            files={"file": (filename, pdf_bytes, "application/pdf")},
+            data={"method": "groq", "use_cache": str(use_cache).lower()},
+        )
+        return f"http_{response.status_code}"
+    return send
+
+
+def parser_sender(pdf_path: str, use_cache: bool):
+    from app.services.parser import parse_invoice_async
+
+    async def send(i):
+        items, debug_info = await parse_invoice_async(pdf_path, use_cache=use_cache)
+        return "error" if debug_info.get("error") else "ok"
+    return send
+
+
+def print_report(report: dict, key_stats=None, mock_stats=None):
+    print("\n=== Load test ===")
+    for name, value in report.items():
+        print(f"{name:>18}: {value}")
+    if key_stats:
+        print("\n=== Key pool ===")
+        for state in key_stats:
+            print(f"  ...{state['key']}: successes={state['successes']} failures={state['failures']} "
+                  f"cooldown={state['cooldown_seconds']}s")
+    if mock_stats:
+        print("\n=== Mock server ===")
+        for name, value in sorted(mock_stats.items()):
+            print(f"{name:>18}: {value}")
+
+
+async def main_async(args):
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+    filename = os.path.basename(args.pdf)
+
+    mock_app = None
+    if args.mock:
+        from app.services.llm_client import llm_client
+
+        mock_app = create_app(config_from_args(args))
+        llm_client._transport = asgi_transport(mock_app)
+        await llm_client.aclose()  # Rebuild the pooled client with the mock transport
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+            report = await run_load(http_sender(client, pdf_bytes, filename, args.use_cache), args.requests, args.concurrency)
+            key_stats = (await client.get("/api/key-pool-stats")).json()
+        print_report(report, key_stats)
+        return
+
+    from app.services.key_pool import key_pool
+
+    if args.in_process:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            report = await run_load(http_sender(client, pdf_bytes, filename, args.use_cache), args.requests, args.concurrency)
+    else:
+        report = await run_load(parser_sender(args.pdf, args.use_cache), args.requests, args.concurrency)
+
+    print_report(report, key_pool.stats, dict(mock_app.state.stats) if mock_app else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent invoice upload load test")
+    parser.add_argument("pdf", help="Invoice PDF to upload")
+    parser.add_argument("-n", "--requests", type=int, default=20)
+    parser.add_argument("-c", "--concurrency", type=int, default=5)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running backend")
+    target.add_argument("--in-process", action="store_true", help="Call the FastAPI app in-process")
+    target.add_argument("--parser-only", action="store_true", help="Call parse_invoice_async directly")
+    parser.add_argument("--use-cache", action="store_true", help="Allow parse cache hits (off by default)")
+    parser.add_argument("--timeout", type=float, default=600, help="Per-upload timeout in seconds")
+    parser.add_argument("--mock", action="store_true", help="Route LLM calls to an in-process mock server")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    if args.mock and args.url:
+        parser.error("--mock works with --in-process/--parser-only; for --url start tools/mock_groq_server.py")
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Local stand-in for the Groq (OpenAI-compatible) chat completions API.
+
+Replays recorded responses per page image hash and injects latency,
+429s with Retry-After, 5xx errors and hanging requests, so the parser can
+be load-tested and regression-tested without spending real Groq quota.
+
+Fixtures are JSON files <page hash>.json in the fixtures directory:
+    {"content": "<model message content>", "usage": {"total_tokens": 1234}}
+Pages without a fixture get a synthetic response with --default-items
+items ("MOCK-<hash>-1", ...); multi-page requests get them for every page,
+tagged with "page".
+
+Usage:
+    # Record real responses once (needs a Groq key in the request)
+    python tools/mock_groq_server.py --record --fixtures tests/fixtures/groq
+
+    # Replay with faults, then point the backend at it
+    python tools/mock_groq_server.py --fixtures tests/fixtures/groq --latency 1.5 --jitter 0.5 \\
+        --rate-429 0.1 --rate-5xx 0.02 --rate-timeout 0.01 --key-rpm 30
+    GROQ_BASE_URL=http://127.0.0.1:8100/openai/v1 uvicorn app.main:app
+
+Statistics: GET /stats
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.llm_client import GROQ_BASE_URL
+
+
+@dataclass
+class MockConfig:
+    """Behavior of the mock server (probabilities are per request)."""
+    fixtures_dir: Optional[str] = None
+    latency: float = 0.0  # Base response time in seconds
+    jitter: float = 0.0  # Uniform +/- jitter added to latency
+    rate_429: float = 0.0
+    retry_after: float = 5.0  # Retry-After header sent with random 429s
+    rate_5xx: float = 0.0
+    rate_timeout: float = 0.0
+    hang_seconds: float = 300.0  # How long "timeout" requests hang
+    key_rpm: int = 0  # Emulated per-key requests per minute (0 = unlimited)
+    default_items: int = 1
+    record: bool = False  # Forward to the real API and save fixtures
+    upstream: str = GROQ_BASE_URL
+    seed: Optional[int] = None
+
+
+def page_hash(payload: Dict) -> str:
+    """Hash of the page image(s) in a chat completions payload (model and prompt excluded)."""
+    digest = hashlib.sha256()
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if part.get("type") == "image_url":
+                digest.update(part["image_url"]["url"].encode())
+    return digest.hexdigest()[:16]
+
+
+def image_count(payload: Dict) -> int:
+    """Number of page images in a chat completions payload."""
+    return sum(
+        1
+        for message in payload.get("messages", []) if isinstance(message.get("content"), list)
+        for part in message["content"] if part.get("type") == "image_url"
+    )
+
+
+def _completion(content: str, usage: Dict, model: str) -> Dict:
+    return {
+        "id": f"mock-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    """Build the mock API app (served by uvicorn or mounted via asgi_transport)."""
+    app = FastAPI(title="Mock Groq API")
+    rng = random.Random(config.seed)
+    key_windows = defaultdict(deque)
+    stats = defaultdict(int)
+    app.state.config = config
+    app.state.stats = stats
+
+    def load_fixture(digest: str) -> Optional[Dict]:
+        if not config.fixtures_dir:
+            return None
+        path = os.path.join(config.fixtures_dir, f"{digest}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_fixture(digest: str, fixture: Dict) -> None:
+        os.makedirs(config.fixtures_dir, exist_ok=True)
+        path = os.path.join(config.fixtures_dir, f"{digest}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=2)
+
+    def synthetic(digest: str, pages: int) -> Dict:
+        items = [
+            {"designation": f"MOCK-{digest[:6]}-{n}", "name": "Mock part", "quantity": n}
+            for n in range(1, config.default_items + 1)
+        ]
+        if pages > 1:
+            # Multi-page request: items for every page, tagged like BATCH_PROMPT asks
+            items = [
+                {**item, "designation": f"{item['designation']}-p{page}", "page": page}
+                for page in range(1, pages + 1) for item in items
+            ]
+        content = json.dumps({"items": items, "invoice_number": f"MOCK-{digest[:8]}"})
+        return {"content": content, "usage": {"total_tokens": 1000 + 50 * len(items)}}
+
+    def key_limited(api_key: str) -> Optional[float]:
+        """Seconds until the key has quota again, None if the request is allowed."""
+        if not config.key_rpm:
+            return None
+        now = time.monotonic()
+        window = key_windows[api_key]
+        while window and now - window[0] >= 60:
+            window.popleft()
+        if len(window) >= config.key_rpm:
+            return 60 - (now - window[0])
+        window.append(now)
+        return None
+
+    async def chat_completions(request: Request):
+        stats["requests"] += 1
+        payload = await request.json()
+        api_key = request.headers.get("authorization", "").removeprefix("Bearer ")
+        digest = page_hash(payload)
+
+        wait = key_limited(api_key)
+        if wait is not None:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                status_code=429, headers={"retry-after": f"{wait:.0f}"}
+            )
+
+        roll = rng.random()
+        if roll < config.rate_timeout:
+            stats["timeouts"] += 1
+            await asyncio.sleep(config.hang_seconds)
+        roll -= config.rate_timeout
+        if 0 <= roll < config.rate_429:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                status_code=429, headers={"retry-after": f"{config.retry_after:g}"}
+            )
+        roll -= config.rate_429
+        if 0 <= roll < config.rate_5xx:
+            stats["server_errors"] += 1
+            return JSONResponse({"error": {"message": "Service unavailable"}}, status_code=503)
+
+        if config.record:
+            async with httpx.AsyncClient(base_url=config.upstream, timeout=120) as client:
+                upstream = await client.post(
+                    "/chat/completions", json=payload,
+                    headers={"Authorization": request.headers.get("authorization", "")}
+                )
+            if upstream.status_code == 200:
+                data = upstream.json()
+                save_fixture(digest, {
+                    "content": data["choices"][0]["message"]["content"],
+                    "usage": data.get("usage", {}),
+                })
+                stats["recorded"] += 1
+            return JSONResponse(upstream.json(), status_code=upstream.status_code,
+                                headers={k: v for k, v in upstream.headers.items() if k == "retry-after"})
+
+        delay = config.latency + rng.uniform(-config.jitter, config.jitter) if config.jitter else config.latency
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        fixture = load_fixture(digest)
+        stats["replayed" if fixture else "synthetic"] += 1
+        fixture = fixture or synthetic(digest, image_count(payload))
+        return _completion(fixture["content"], fixture.get("usage", {}), payload.get("model", ""))
+
+    app.add_api_route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/stats", lambda: dict(stats), methods=["GET"])
+    return app
+
+
+class TimeoutASGITransport(httpx.ASGITransport):
+    """
+    ASGI transport that honors the client's read timeout.
+
+    httpx.ASGITransport ignores timeouts, so in-process load tests would never
+    see hanging requests as httpx.ReadTimeout like a real network client does.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        timeout = (request.extensions.get("timeout") or {}).get("read")
+        try:
+            return await asyncio.wait_for(super().handle_async_request(request), timeout)
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout("Mock request timed out", request=request) from None
+
+
+def asgi_transport(app: FastAPI) -> httpx.AsyncBaseTransport:
+    """Transport for LLMClient(transport=...) that calls the mock app in-process."""
+    return TimeoutASGITransport(app=app)
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    """Fault injection flags, shared with tools/load_test.py."""
+    parser.add_argument("--fixtures", help="Directory with <page hash>.json fixtures")
+    parser.add_argument("--latency", type=float, default=0.0, help="Base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform latency jitter in seconds")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probability of a 429 response")
+    parser.add_argument("--retry-after", type=float, default=5.0, help="Retry-After for random 429s")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Probability of a 503 response")
+    parser.add_argument("--rate-timeout", type=float, default=0.0, help="Probability of a hanging request")
+    parser.add_argument("--hang-seconds", type=float, default=300.0, help="How long hanging requests hang")
+    parser.add_argument("--key-rpm", type=int, default=0, help="Emulated requests per minute per key")
+    parser.add_argument("--default-items", type=int, default=1, help="Items in synthetic responses")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible fault sequences")
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        fixtures_dir=args.fixtures,
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        rate_5xx=args.rate_5xx,
+        rate_timeout=args.rate_timeout,
+        hang_seconds=args.hang_seconds,
+        key_rpm=args.key_rpm,
+        default_items=args.default_items,
+        record=getattr(args, "record", False),
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Groq chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--record", action="store_true", help="Proxy to the real API and save fixtures")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    if args.record and not args.fixtures:
+        parser.error("--record needs --fixtures")
+
+    import uvicorn
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
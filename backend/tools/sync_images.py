@@ -8,6 +8,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.db.session import SessionLocal
 from app.db.models import Part
+from app.services.image_index import ImageIndex
 
 def sync_images():
     # Define paths
@@ -49,40 +50,21 @@ def sync_images():
         # Get all parts
         parts = db.query(Part).all()
         
-        # Build map of available WebP images
-        # Key: designation (or filename without ext), Value: filename
-        image_map = {}
-        for filename in os.listdir(images_dir):
-            if filename.lower().endswith('.webp'):
-                name_part = os.path.splitext(filename)[0]
-                image_map[name_part] = filename
-                # Also split by space for "R1.05... Name" style
-                parts_split = name_part.split(' ')
-                if parts_split:
-                    image_map[parts_split[0]] = filename
+        # Index of the local WebP images only (no S3 keys or other formats)
+        index = ImageIndex(local_dir=images_dir, extensions=('.webp',))
+        index.refresh()
 
         for part in parts:
-            # If part has no image, or image doesn't exist, or image is not webp
-            update_needed = False
-            
             current_image = part.image_path
-            
+
             # Check if current image is valid WebP
             if current_image and current_image.lower().endswith('.webp'):
                 if os.path.exists(os.path.join(images_dir, current_image)):
                     continue # All good
-            
-            # Try to find a match
-            # 1. Exact match on designation
-            candidate = image_map.get(part.designation)
-            
-            # 2. Prefix match if not found
-            if not candidate:
-                 for key, val in image_map.items():
-                     if key.startswith(part.designation):
-                         candidate = val
-                         break
-            
+
+            # Exact -> designation token -> normalized; no loose prefix matches
+            candidate = index.lookup(part.designation, strict=True)
+
             if candidate:
                 if part.image_path != candidate:
                     print(f"Updating {part.designation}: {part.image_path} -> {candidate}")